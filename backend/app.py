@@ -1,11 +1,15 @@
-from flask import Flask, jsonify, send_from_directory, request
+from flask import Flask, Response, abort, jsonify, send_from_directory, request, g, has_request_context, make_response
 from flask_cors import CORS
 import sqlite3
-import bcrypt
+import csv
+import functools
+import hashlib
+import hmac
+import io
+import json
 import os
+import sys
 import random
-import smtplib
-from email.message import EmailMessage
 from datetime import datetime, timedelta
 from pathlib import Path
 
@@ -16,40 +20,290 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 DB_PATH = BASE_DIR / "database" / "ruet.db"
 FRONTEND_DIR = BASE_DIR / "frontend"
 
+# Shared helpers live in the top-level database/ package
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+from database.db_pool import get_pool, all_pool_stats
+from database.entity_directory import HallDirectory, DepartmentDirectory
+from database import accounts_manager
+from compression import compression_stats, init_compression
+from metrics import init_metrics, register_collector, render_metrics, request_query_counter, reset_metrics
+from mailer import OutboxSender, enqueue_email
+from hashing import HashPoolBusy, check_otp, check_password, hash_password, hashing_stats, otp_digest
+from session_tokens import InvalidToken, issue_token, verify_token
+from sql_profiler import (ProfiledConnection, configure_profiler, finish_request_profile, profiler_settings,
+                          profiler_stats, request_profile)
+
+init_metrics(app)  # first, so its after_request sees the compressed body
+init_compression(app)
+
 # Save uploaded student photos here (optional)
 STUDENT_PHOTO_DIR = FRONTEND_DIR / "media" / "students"
 STUDENT_PHOTO_DIR.mkdir(parents=True, exist_ok=True)
 
-EMAIL_USER = os.getenv("EMAIL_USER")
-EMAIL_PASS = os.getenv("EMAIL_PASS")
+# Rows of feeDetails per /api/dept/render page
+DEPT_FEE_PAGE_SIZE = 200
+DEPT_FEE_PAGE_MAX = 1000
+
+# Rows per /api/hall/dues and /api/hall/dues/search page
+HALL_DUES_PAGE_SIZE = 200
+HALL_DUES_PAGE_MAX = 1000
 
+# Rows fetched from SQLite per chunk of a CSV/NDJSON export
+EXPORT_BATCH_SIZE = 500
+
+# Accept requests without a session token (identified by ?id= / hall_name /
+# dept_name as before) while clients move to Authorization: Bearer tokens
+AUTH_LEGACY_PARAMS = os.getenv("AUTH_LEGACY_PARAMS", "1") == "1"
+
+# Changing runtime settings through /api/debug/* (GETs stay open): send
+# X-Debug-Token: <DEBUG_ADMIN_TOKEN>, or call from the server itself. Set
+# DEBUG_ALLOW_LOOPBACK=0 behind a reverse proxy on the same host, where
+# every request arrives from loopback.
+DEBUG_ADMIN_TOKEN = os.getenv("DEBUG_ADMIN_TOKEN", "")
+DEBUG_ALLOW_LOOPBACK = os.getenv("DEBUG_ALLOW_LOOPBACK", "1") == "1"
+
+def get_db(readonly=None):
+    """
+    Lease a pooled connection; con.close() hands it back to the pool.
 
-def get_db():
-    con = sqlite3.connect(DB_PATH)
-    con.row_factory = sqlite3.Row
+    GET/HEAD requests get a read-only connection by default; everything
+    else goes through the single serialized writer connection.
+    """
+    if readonly is None:
+        readonly = has_request_context() and request.method in ("GET", "HEAD")
+    con = get_pool(DB_PATH).connection(readonly=readonly)
+    if has_request_context():
+        # the pool drops the callback when the lease is returned
+        con.set_trace_callback(request_query_counter())
+        if profiler_settings["enabled"]:
+            con = ProfiledConnection(con, request_profile())
+        g.setdefault("db_connections", []).append(con)
     return con
 
 
-def send_otp_email(to_email: str, otp: str):
-    """Send OTP email via Gmail SMTP."""
-    if not EMAIL_USER or not EMAIL_PASS:
-        raise RuntimeError("EMAIL_USER / EMAIL_PASS not set in environment variables")
+@app.teardown_request
+def release_db(exc):
+    """Return any connection a handler forgot to close (e.g. on an exception)."""
+    for con in g.pop("db_connections", []):
+        con.close()
+    finish_request_profile()
+
+
+@app.errorhandler(HashPoolBusy)
+def hash_pool_busy(e):
+    """Shed load when the bcrypt pool is full instead of queueing behind it."""
+    res = jsonify({"message": "Server is busy, please try again shortly."})
+    res.status_code = 503
+    res.headers["Retry-After"] = str(e.retry_after)
+    return res
+
+
+# hall / department id, name, code and email lookups, served from memory
+hall_directory = HallDirectory(lambda: get_db(readonly=True))
+department_directory = DepartmentDirectory(lambda: get_db(readonly=True))
+
+# delivers email_outbox rows in the background (see backend/mailer.py)
+outbox = OutboxSender(lambda: get_db(readonly=False))
+
+
+@app.before_request
+def start_outbox():
+    """
+    Start the sender in whichever process serves requests (the dev server,
+    each WSGI worker), once, to send what was queued before a restart.
+    Not at import, so scripts importing the app don't touch database/ruet.db.
+    """
+    outbox.start()
+
+
+# -------------------------
+# Session tokens (see backend/session_tokens.py)
+# -------------------------
+def with_principal(*roles):
+    """
+    Verify the request's bearer token and pass its claims to the view as
+    principal= (also kept in g.principal for the resolvers below), without
+    touching the database. `roles` limits which roles may call the view.
+
+    Without a token the view gets principal=None and identifies the caller
+    from its parameters as before, unless AUTH_LEGACY_PARAMS=0.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            scheme, _, token = (request.headers.get("Authorization") or "").partition(" ")
+            principal = None
+            if scheme.lower() == "bearer" and token.strip():
+                try:
+                    principal = verify_token(token.strip())
+                except InvalidToken as e:
+                    return jsonify({"message": f"Invalid session ({e}). Please log in again."}), 401
+            elif not AUTH_LEGACY_PARAMS:
+                return jsonify({"message": "Login required"}), 401
+
+            if principal and roles and principal["role"] not in roles:
+                return jsonify({"message": "Not allowed for your role"}), 403
+
+            g.principal = principal
+            return view(*args, principal=principal, **kwargs)
+        return wrapper
+    return decorator
+
+
+def forbid(message: str):
+    abort(make_response(jsonify({"message": message}), 403))
+
+
+def debug_writes_guarded(view):
+    """
+    Let a /api/debug/* view change settings only for an admin: a matching
+    X-Debug-Token header, or (DEBUG_ALLOW_LOOPBACK) a loopback client.
+    GET/HEAD are read-only and pass through.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            token = request.headers.get("X-Debug-Token") or ""
+            admin = bool(DEBUG_ADMIN_TOKEN) and hmac.compare_digest(token.encode(), DEBUG_ADMIN_TOKEN.encode())
+            loopback = DEBUG_ALLOW_LOOPBACK and request.remote_addr in ("127.0.0.1", "::1")
+            if not (admin or loopback):
+                forbid("Debug settings can only be changed by an admin")
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def own_student_id():
+    """The caller's students.id when they hold a student token, else None."""
+    principal = g.get("principal")
+    return principal["sub"] if principal and principal["role"] == "student" else None
+
+
+def own_hall_id():
+    """The caller's hall id when they hold a hall manager token, else None."""
+    principal = g.get("principal")
+    return principal["hall_id"] if principal and principal["role"] == "hall_manager" else None
+
+
+def request_hall(hall_name: str = "", first_if_empty: bool = True):
+    """
+    Hall the request acts on: a hall manager's own hall, straight from the
+    token (403 if hall_name names another one); otherwise looked up by name,
+    falling back to the first hall when the name is empty.
+    """
+    principal = g.get("principal")
+    if principal and principal["role"] == "hall_manager":
+        if hall_name and hall_name != principal["hall_name"]:
+            forbid("You can only manage your own hall")
+        return {"id": principal["hall_id"], "hall_name": principal["hall_name"], "email": principal["sub"]}
+    if not hall_name and not first_if_empty:
+        return None
+    return hall_directory.resolve(hall_name)
+
+
+def request_department(dept_name: str = ""):
+    """Department the request acts on: a department officer's own, from the token; otherwise by name."""
+    principal = g.get("principal")
+    if principal and principal["role"] == "department_officer":
+        if dept_name and dept_name != principal["dept_name"]:
+            forbid("You can only manage your own department")
+        return {
+            "id": principal["dept_id"],
+            "dept_code": principal["dept_code"],
+            "dept_name": principal["dept_name"],
+            "email": principal["sub"],
+        }
+    return department_directory.by_name(dept_name) if dept_name else None
+
+
+# -------------------------
+# Conditional GETs (ETag / If-None-Match)
+# -------------------------
+def entity_etag(entity_type: str, entity_id) -> str:
+    """
+    ETag for the current request's view of one student or hall.
+
+    Built from the entity's change counter and the global counter in
+    entity_versions (bumped by triggers, see database/migrate_entity_versions.py)
+    plus the request path and query string, so different pages or filters
+    never share a tag.
+    """
+    con = get_db(readonly=True)
+    row = con.execute("""
+        SELECT
+            COALESCE((SELECT version FROM entity_versions WHERE entity_type = ? AND entity_id = ?), 0) AS version,
+            COALESCE((SELECT version FROM entity_versions WHERE entity_type = 'global' AND entity_id = ''), 0) AS global_version
+    """, (entity_type, str(entity_id))).fetchone()
+    con.close()
+    key = f"{entity_type}:{entity_id}:{row['version']}:{row['global_version']}:{request.full_path}"
+    return hashlib.sha1(key.encode()).hexdigest()[:20]
+
+
+def conditional_get(entity_type: str, resolve_id):
+    """
+    Answer 304 Not Modified when the client's If-None-Match still matches
+    the entity's version, without running the view's queries.
+
+    resolve_id(**view_kwargs) returns the student / hall id the response is
+    built from, or None to skip (the view then handles the bad request).
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            entity_id = resolve_id(**kwargs)
+            if entity_id is None:
+                return view(*args, **kwargs)
+
+            etag = entity_etag(entity_type, entity_id)
+            if request.if_none_match.contains_weak(etag):
+                res = app.response_class(status=304)
+            else:
+                res = make_response(view(*args, **kwargs))
+                if res.status_code != 200:
+                    return res
+            res.set_etag(etag, weak=True)
+            res.headers["Cache-Control"] = "no-cache"
+            res.vary.add("Authorization")
+            return res
+        return wrapper
+    return decorator
+
+
+def student_id_arg(student_id=None, **_):
+    """
+    Student id from the URL, ?id= or the X-Student-Id header. With a
+    student token it is the caller's own id (403 for anyone else's).
+    """
+    requested = student_id or request.args.get("id") or request.headers.get("X-Student-Id") or None
+    own = own_student_id()
+    if own:
+        if requested and requested != own:
+            forbid("You can only view your own records")
+        return own
+    return requested
 
-    msg = EmailMessage()
-    msg["Subject"] = "RUET Portal OTP Verification"
-    msg["From"] = EMAIL_USER
-    msg["To"] = to_email
-    msg.set_content(
+
+def hall_id_arg(**_):
+    """Hall id for ?hall_name= (first hall when empty), as the hall views resolve it."""
+    hall = request_hall((request.args.get("hall_name") or "").strip())
+    return hall["id"] if hall else None
+
+
+def queue_otp_email(cur, to_email: str, otp: str):
+    """
+    Queue the OTP email in the caller's transaction; the outbox sender
+    delivers it once the caller commits (then call outbox.wake()).
+    """
+    enqueue_email(
+        cur,
+        to_email,
+        "RUET Portal OTP Verification",
         f"Your OTP is: {otp}\n"
         f"It will expire in 10 minutes.\n\n"
-        f"If you didn't request this, ignore the email."
+        f"If you didn't request this, ignore the email.",
     )
 
-    with smtplib.SMTP("smtp.gmail.com", 587) as smtp:
-        smtp.starttls()
-        smtp.login(EMAIL_USER, EMAIL_PASS)
-        smtp.send_message(msg)
-
 
 def generate_otp():
     return str(random.randint(100000, 999999))
@@ -67,6 +321,15 @@ def is_student_email(email: str):
     return isinstance(email, str) and email.lower().endswith("@student.ruet.ac.bd")
 
 
+def student_id_prefix_range(prefix: str):
+    """
+    [low, high) bounds matching every student_id that starts with `prefix`,
+    as `student_id >= ? AND student_id < ?` so an index on student_id still
+    seeks instead of scanning (LIKE 'x%' can't, student_id is case-sensitive).
+    """
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
 # -------------------------
 # Serve frontend
 # -------------------------
@@ -76,13 +339,12 @@ def frontend_files(filename):
 
 
 # -------------------------
-# Student APIs
+# STUDENT: Shared loaders
 # -------------------------
-@app.route("/api/student/<student_id>")
-def student(student_id):
-    con = get_db()
-    cur = con.cursor()
-
+# Each takes a cursor so /api/student/<id>/summary can run them all inside
+# one read transaction; the single-purpose endpoints below are thin views.
+def load_student_profile(cur, student_id):
+    """Profile row plus the fee counters as a due breakdown, or None."""
     cur.execute("""
         SELECT
             id AS studentId,
@@ -99,10 +361,8 @@ def student(student_id):
     """, (student_id,))
 
     row = cur.fetchone()
-    con.close()
-
     if not row:
-        return jsonify({"message": "Student not found"}), 404
+        return None
 
     data = dict(row)
 
@@ -119,62 +379,200 @@ def student(student_id):
             {"title": "Department Fee", "amount": dept_fee},
         ]
     }
+    return data
+
+
+def load_student_hall_fees(cur, student_id):
+    """Monthly hall dues, newest first; hall and account come from the in-memory directories."""
+    cur.execute("""
+        SELECT 
+            hd.id,
+            hd.hall_id,
+            hd.month,
+            hd.amount,
+            hd.status,
+            hd.paid_date
+        FROM hall_dues hd
+        WHERE hd.student_id = ?
+        ORDER BY hd.month DESC
+    """, (student_id,))
+    
+    items = []
+    for row in cur.fetchall():
+        hall = hall_directory.by_id(row["hall_id"])
+        hall_name = hall["hall_name"] if hall else None
+        account = accounts_manager.get_hall_account(hall_name) if hall_name else None
+        items.append({
+            "id": row["id"],
+            "month": row["month"],
+            "amount": int(row["amount"] or 0),
+            "status": row["status"],
+            "paid_date": row["paid_date"],
+            "hall_name": hall_name,
+            "account_name": account["account_name"] if account else None
+        })
+    return items
+
+
+def load_student_department_dues(cur, student_id):
+    """Department dues, newest first; the department account comes from the in-memory directory."""
+    cur.execute("""
+        SELECT 
+            dd.fee_id,
+            dd.due_type,
+            dd.amount,
+            dd.status,
+            dd.deadline,
+            dd.created_at,
+            d.dept_code,
+            d.dept_name
+        FROM department_dues dd
+        JOIN departments d ON dd.dept_id = d.id
+        WHERE dd.student_id = ?
+        ORDER BY dd.created_at DESC
+    """, (student_id,))
+    
+    items = []
+    for row in cur.fetchall():
+        account = accounts_manager.get_account_for_student(row["dept_code"])
+        items.append({
+            "fee_id": row["fee_id"],
+            "fee_type": row["due_type"],
+            "amount": int(row["amount"] or 0),
+            "status": row["status"],
+            "deadline": row["deadline"],
+            "created_at": row["created_at"],
+            "dept_name": row["dept_name"],
+            "account_name": account["account_name"] if account else None
+        })
+    return items
+
+
+def load_student_library_fines(cur, student_id):
+    """Library fines, newest first."""
+    cur.execute("""
+        SELECT 
+            id,
+            student_id,
+            fine_description,
+            amount,
+            fine_date,
+            status,
+            created_at
+        FROM library_fines
+        WHERE student_id = ?
+        ORDER BY created_at DESC
+    """, (student_id,))
+    
+    return [
+        {
+            "id": row["id"],
+            "student_id": row["student_id"],
+            "description": row["fine_description"],
+            "amount": int(row["amount"] or 0),
+            "fine_date": row["fine_date"],
+            "status": row["status"],
+            "created_at": row["created_at"]
+        }
+        for row in cur.fetchall()
+    ]
+
+
+def load_student_summary(con, student_id):
+    """
+    Everything the student dashboard and payment page show, or None if the
+    student doesn't exist. All reads run in one transaction, so the profile
+    counters and the due lists come from the same snapshot.
+    """
+    cur = con.cursor()
+    cur.execute("BEGIN")
+    try:
+        profile = load_student_profile(cur, student_id)
+        if profile is None:
+            return None
+        hall_fees = load_student_hall_fees(cur, student_id)
+        department_dues = load_student_department_dues(cur, student_id)
+        library_fines = load_student_library_fines(cur, student_id)
+    finally:
+        con.rollback()
+
+    def unpaid(items):
+        return sum(i["amount"] for i in items if (i["status"] or "").lower() != "paid")
+
+    totals = {
+        "hall": unpaid(hall_fees),
+        "department": unpaid(department_dues),
+        "library": unpaid(library_fines),
+    }
+    totals["total"] = sum(totals.values())
+
+    return {
+        "profile": profile,
+        "hall_fees": hall_fees,
+        "department_dues": department_dues,
+        "library_fines": library_fines,
+        "accounts": {"library": accounts_manager.get_library_account()},
+        "totals": totals,
+    }
+
+
+# -------------------------
+# Student APIs
+# -------------------------
+@app.route("/api/student/<student_id>")
+@with_principal()
+@conditional_get("student", student_id_arg)
+def student(student_id, principal=None):
+    student_id = student_id_arg(student_id)
+    con = get_db()
+    data = load_student_profile(con.cursor(), student_id)
+    con.close()
+
+    if not data:
+        return jsonify({"message": "Student not found"}), 404
 
     return jsonify(data)
 
 
+# -------------------------
+# STUDENT: Dashboard summary (profile + all dues in one request)
+# -------------------------
+@app.route("/api/student/<student_id>/summary")
+@with_principal()
+@conditional_get("student", student_id_arg)
+def student_summary(student_id, principal=None):
+    student_id = student_id_arg(student_id)
+    con = get_db()
+    summary = load_student_summary(con, student_id)
+    con.close()
+
+    if not summary:
+        return jsonify({"message": "Student not found"}), 404
+
+    return jsonify(summary)
+
+
 # -------------------------
 # STUDENT: Get current student profile
 # -------------------------
 @app.route("/api/student/me")
-def student_me():
+@with_principal()
+@conditional_get("student", student_id_arg)
+def student_me(principal=None):
     """Get profile of currently logged-in student (requires studentId in query or sessionStorage)"""
-    # Get from query parameter (sent from frontend)
-    student_id = request.args.get("id") or request.headers.get("X-Student-Id")
+    # From the session token, or the query parameter / header
+    student_id = student_id_arg()
     
     if not student_id:
         return jsonify({"message": "Student ID not provided. Use ?id=<studentId> or pass X-Student-Id header"}), 400
     
     con = get_db()
-    cur = con.cursor()
-
-    cur.execute("""
-        SELECT
-            id AS studentId,
-            name,
-            dept,
-            hall,
-            room,
-            email,
-            hall_fee,
-            library_fee,
-            dept_fee
-        FROM students
-        WHERE id = ?
-    """, (student_id,))
-
-    row = cur.fetchone()
+    data = load_student_profile(con.cursor(), student_id)
     con.close()
 
-    if not row:
+    if not data:
         return jsonify({"message": "Student not found"}), 404
 
-    data = dict(row)
-
-    hall_fee = int(data.get("hall_fee") or 0)
-    library_fee = int(data.get("library_fee") or 0)
-    dept_fee = int(data.get("dept_fee") or 0)
-
-    total_due = hall_fee + library_fee + dept_fee
-    data["due"] = {
-        "total": total_due,
-        "items": [
-            {"title": "Hall Fee", "amount": hall_fee},
-            {"title": "Library Fine", "amount": library_fee},
-            {"title": "Department Fee", "amount": dept_fee},
-        ]
-    }
-
     return jsonify(data)
 
 
@@ -182,9 +580,11 @@ def student_me():
 # STUDENT: Get Student Dues
 # -------------------------
 @app.route("/api/student/dues")
-def student_dues():
+@with_principal()
+@conditional_get("student", student_id_arg)
+def student_dues(principal=None):
     """Get dues for currently logged-in student"""
-    student_id = request.args.get("id") or request.headers.get("X-Student-Id")
+    student_id = student_id_arg()
     
     if not student_id:
         return jsonify({"message": "Student ID not provided"}), 400
@@ -212,52 +612,19 @@ def student_dues():
 # STUDENT: Get Monthly Hall Fees
 # -------------------------
 @app.route("/api/student/hall-fees")
-def student_hall_fees():
+@with_principal()
+@conditional_get("student", student_id_arg)
+def student_hall_fees(principal=None):
     """Get monthly hall fees for currently logged-in student with hall and account info"""
-    student_id = request.args.get("id") or request.headers.get("X-Student-Id")
+    student_id = student_id_arg()
     
     if not student_id:
         return jsonify({"message": "Student ID not provided"}), 400
     
     con = get_db()
-    cur = con.cursor()
-    
-    # Fetch monthly fees from hall_dues with hall and account info
-    cur.execute("""
-        SELECT 
-            hd.id,
-            hd.month,
-            hd.amount,
-            hd.status,
-            hd.paid_date,
-            h.hall_name,
-            pa.account_name
-        FROM hall_dues hd
-        LEFT JOIN halls h ON hd.hall_id = h.id
-        LEFT JOIN payment_accounts pa ON pa.account_type = 'hall' AND pa.entity_identifier = h.hall_name AND pa.is_active = 1
-        WHERE hd.student_id = ?
-        ORDER BY hd.month DESC
-    """, (student_id,))
-    
-    rows = cur.fetchall()
+    items = load_student_hall_fees(con.cursor(), student_id)
     con.close()
     
-    if not rows:
-        return jsonify({"items": []}), 200
-    
-    items = [
-        {
-            "id": row["id"],
-            "month": row["month"],
-            "amount": int(row["amount"] or 0),
-            "status": row["status"],
-            "paid_date": row["paid_date"],
-            "hall_name": row["hall_name"],
-            "account_name": row["account_name"]
-        }
-        for row in rows
-    ]
-    
     return jsonify({"items": items}), 200
 
 
@@ -265,54 +632,19 @@ def student_hall_fees():
 # STUDENT: Get Department Dues
 # -------------------------
 @app.route("/api/student/department-dues")
-def student_department_dues():
+@with_principal()
+@conditional_get("student", student_id_arg)
+def student_department_dues(principal=None):
     """Get all department dues for a student"""
-    student_id = request.args.get("id") or request.headers.get("X-Student-Id")
+    student_id = student_id_arg()
     
     if not student_id:
         return jsonify({"message": "Student ID not provided"}), 400
     
     con = get_db()
-    cur = con.cursor()
-    
-    # Fetch department dues with department account info
-    cur.execute("""
-        SELECT 
-            dd.fee_id,
-            dd.due_type,
-            dd.amount,
-            dd.status,
-            dd.deadline,
-            dd.created_at,
-            d.dept_name,
-            pa.account_name
-        FROM department_dues dd
-        JOIN departments d ON dd.dept_id = d.id
-        LEFT JOIN payment_accounts pa ON pa.account_type = 'department' AND pa.entity_identifier = d.dept_code AND pa.is_active = 1
-        WHERE dd.student_id = ?
-        ORDER BY dd.created_at DESC
-    """, (student_id,))
-    
-    rows = cur.fetchall()
+    items = load_student_department_dues(con.cursor(), student_id)
     con.close()
     
-    if not rows:
-        return jsonify({"items": []}), 200
-    
-    items = [
-        {
-            "fee_id": row["fee_id"],
-            "fee_type": row["due_type"],
-            "amount": int(row["amount"] or 0),
-            "status": row["status"],
-            "deadline": row["deadline"],
-            "created_at": row["created_at"],
-            "dept_name": row["dept_name"],
-            "account_name": row["account_name"]
-        }
-        for row in rows
-    ]
-    
     return jsonify({"items": items}), 200
 
 
@@ -320,49 +652,19 @@ def student_department_dues():
 # STUDENT: Get Library Fines
 # -------------------------
 @app.route("/api/student/library-fines")
-def student_library_fines():
+@with_principal()
+@conditional_get("student", student_id_arg)
+def student_library_fines(principal=None):
     """Get library fines for a student"""
-    student_id = request.args.get("id")
+    student_id = student_id_arg()
     
     if not student_id:
         return jsonify({"message": "Student ID not provided"}), 400
     
     con = get_db()
-    cur = con.cursor()
-    
-    cur.execute("""
-        SELECT 
-            id,
-            student_id,
-            fine_description,
-            amount,
-            fine_date,
-            status,
-            created_at
-        FROM library_fines
-        WHERE student_id = ?
-        ORDER BY created_at DESC
-    """, (student_id,))
-    
-    rows = cur.fetchall()
+    items = load_student_library_fines(con.cursor(), student_id)
     con.close()
     
-    if not rows:
-        return jsonify({"items": []}), 200
-    
-    items = [
-        {
-            "id": row["id"],
-            "student_id": row["student_id"],
-            "description": row["fine_description"],
-            "amount": int(row["amount"] or 0),
-            "fine_date": row["fine_date"],
-            "status": row["status"],
-            "created_at": row["created_at"]
-        }
-        for row in rows
-    ]
-    
     return jsonify({"items": items}), 200
 
 
@@ -370,9 +672,10 @@ def student_library_fines():
 # STUDENT: Get Payment History
 # -------------------------
 @app.route("/api/student/payments")
-def student_payments():
+@with_principal()
+def student_payments(principal=None):
     """Get payment history for currently logged-in student"""
-    student_id = request.args.get("id") or request.headers.get("X-Student-Id")
+    student_id = student_id_arg()
     
     if not student_id:
         return jsonify({"message": "Student ID not provided"}), 400
@@ -426,10 +729,18 @@ def register():
     }
     dept = allDept[student_id[2:4]]
 
-    # Hash password
-    password_hash = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    # Optional photo upload: JPG <= 500KB
+    photo = request.files.get("photo")
+    photo_bytes = None
+    if photo and photo.filename:
+        if not photo.filename.lower().endswith((".jpg", ".jpeg")):
+            return jsonify({"message": "Photo must be JPG/JPEG"}), 400
+        photo_bytes = photo.read()
+        if len(photo_bytes) > 500 * 1024:
+            return jsonify({"message": "Photo must be 500KB or smaller"}), 400
 
-    con = get_db()
+    # Refuse duplicates on a read lease, before paying for a bcrypt hash
+    con = get_db(readonly=True)
     cur = con.cursor()
 
     # Check if email already exists
@@ -443,43 +754,40 @@ def register():
     if cur.fetchone():
         con.close()
         return jsonify({"message": "Student ID already registered"}), 409
+    con.close()
 
-    # Generate OTP + store hash + expiry
+    # Hash the password on the hashing pool before taking the writer
+    password_hash = hash_password(password, "student")
     otp = generate_otp()
-    otp_hash = bcrypt.hashpw(otp.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    otp_hash = otp_digest(student_id, otp)
     otp_expires_at = iso_in_minutes(10)
 
-    # Optional photo upload: JPG <= 500KB
-    photo = request.files.get("photo")
-    if photo and photo.filename:
-        if not photo.filename.lower().endswith((".jpg", ".jpeg")):
-            con.close()
-            return jsonify({"message": "Photo must be JPG/JPEG"}), 400
-        photo_bytes = photo.read()
-        if len(photo_bytes) > 500 * 1024:
-            con.close()
-            return jsonify({"message": "Photo must be 500KB or smaller"}), 400
-
-        # Save as <roll>.jpg
-        out_path = STUDENT_PHOTO_DIR / f"{student_id}.jpg"
-        with open(out_path, "wb") as f:
-            f.write(photo_bytes)
+    con = get_db(readonly=False)
+    cur = con.cursor()
 
-    # Insert as unverified
-    cur.execute("""
-        INSERT INTO students
-          (id, name, email, password_hash, verified, otp_hash, otp_expires_at, otp_attempts_left, dept)
-        VALUES (?, ?, ?, ?, 0, ?, ?, 5, ?)
-    """, (student_id, name, email, password_hash, otp_hash, otp_expires_at, dept))
+    # Insert as unverified; the UNIQUE email / id constraints catch a
+    # registration that raced this one past the checks above
+    try:
+        cur.execute("""
+            INSERT INTO students
+              (id, name, email, password_hash, verified, otp_hash, otp_expires_at, otp_attempts_left, dept)
+            VALUES (?, ?, ?, ?, 0, ?, ?, 5, ?)
+        """, (student_id, name, email, password_hash, otp_hash, otp_expires_at, dept))
+    except sqlite3.IntegrityError:
+        con.rollback()
+        con.close()
+        return jsonify({"message": "Email or Student ID already registered"}), 409
+    queue_otp_email(cur, email, otp)
 
     con.commit()
     con.close()
+    outbox.wake()
 
-    # Send email
-    try:
-        send_otp_email(email, otp)
-    except Exception as e:
-        return jsonify({"message": f"Registered but OTP email failed: {str(e)}"}), 500
+    # Save as <roll>.jpg
+    if photo_bytes is not None:
+        out_path = STUDENT_PHOTO_DIR / f"{student_id}.jpg"
+        with open(out_path, "wb") as f:
+            f.write(photo_bytes)
 
     return jsonify({"message": "Registered. OTP sent to email."}), 200
 
@@ -496,7 +804,9 @@ def verify_otp():
     if not email or not otp:
         return jsonify({"message": "email and otp required"}), 400
 
-    con = get_db()
+    # Read first and compare outside the writer lane (OTPs issued before
+    # the HMAC switch are still bcrypt hashes)
+    con = get_db(readonly=True)
     cur = con.cursor()
 
     cur.execute("""
@@ -524,29 +834,40 @@ def verify_otp():
         con.close()
         return jsonify({"message": "OTP expired. Please resend OTP."}), 400
 
+    con.close()
+
     stored_hash = user["otp_hash"] or ""
     ok = False
     try:
-        ok = bcrypt.checkpw(otp.encode("utf-8"), stored_hash.encode("utf-8"))
+        ok = check_otp(user["id"], otp, stored_hash)
+    except HashPoolBusy:
+        raise
     except Exception:
         ok = False
 
+    con = get_db()
+    cur = con.cursor()
+
     if not ok:
         # decrease attempts
         cur.execute("""
             UPDATE students SET otp_attempts_left = otp_attempts_left - 1
-            WHERE id = ?
+            WHERE id = ? AND otp_attempts_left > 0
         """, (user["id"],))
         con.commit()
         con.close()
         return jsonify({"message": "Invalid OTP"}), 400
 
-    # mark verified and clear otp fields
+    # mark verified and clear otp fields, unless a resend replaced the OTP meanwhile
     cur.execute("""
         UPDATE students
         SET verified=1, otp_hash=NULL, otp_expires_at=NULL, otp_attempts_left=0
-        WHERE id = ?
-    """, (user["id"],))
+        WHERE id = ? AND otp_hash = ?
+    """, (user["id"], stored_hash))
+    if cur.rowcount == 0:
+        con.rollback()
+        con.close()
+        return jsonify({"message": "OTP expired. Please resend OTP."}), 400
     con.commit()
     con.close()
 
@@ -583,7 +904,7 @@ def resend_otp():
         return jsonify({"message": "Already verified"}), 200
 
     otp = generate_otp()
-    otp_hash = bcrypt.hashpw(otp.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    otp_hash = otp_digest(user["id"], otp)
     otp_expires_at = iso_in_minutes(10)
 
     cur.execute("""
@@ -591,14 +912,11 @@ def resend_otp():
         SET otp_hash=?, otp_expires_at=?, otp_attempts_left=5
         WHERE id=?
     """, (otp_hash, otp_expires_at, user["id"]))
+    queue_otp_email(cur, email, otp)
 
     con.commit()
     con.close()
-
-    try:
-        send_otp_email(email, otp)
-    except Exception as e:
-        return jsonify({"message": f"Failed to send OTP: {str(e)}"}), 500
+    outbox.wake()
 
     return jsonify({"message": "OTP resent"}), 200
 
@@ -618,7 +936,7 @@ def login():
 
     email = identifier
 
-    con = get_db()
+    con = get_db(readonly=True)
     cur = con.cursor()
 
     user = None
@@ -647,7 +965,7 @@ def login():
     # ✅ Hall Manager login
     elif email.endswith("@hall.ruet.ac.bd"):
         cur.execute("""
-            SELECT email, hall_name, password_hash
+            SELECT id, email, hall_name, password_hash
             FROM halls
             WHERE LOWER(email) = LOWER(?)
         """, (email,))
@@ -657,7 +975,7 @@ def login():
     # ✅ Department Officer login
     elif email.endswith("@dept.ruet.ac.bd"):
         cur.execute("""
-            SELECT dept_code, dept_name, password_hash
+            SELECT id, dept_code, dept_name, password_hash
             FROM departments
             WHERE LOWER(email) = LOWER(?)
         """, (email,))
@@ -674,12 +992,22 @@ def login():
         return jsonify({"message": "Please verify your email first."}), 403
 
     stored_hash = user["password_hash"] or ""
-    if not bcrypt.checkpw(password.encode("utf-8"), stored_hash.encode("utf-8")):
+    if not check_password(password, stored_hash):
         return jsonify({"message": "Wrong password"}), 401
 
+    # ✅ Signed session token: who the caller is and what they manage
+    if role == "student":
+        token = issue_token(role, user["id"])
+    elif role == "hall_manager":
+        token = issue_token(role, email, hall_id=user["id"], hall_name=user["hall_name"])
+    elif role == "department_officer":
+        token = issue_token(role, email, dept_id=user["id"], dept_code=user["dept_code"], dept_name=user["dept_name"])
+    else:
+        token = issue_token(role, email)
+
     # ✅ Return fields based on role
     return jsonify({
-        "token": "demo-token",
+        "token": token,
         "role": role,
         "studentId": user["id"] if role == "student" else None,
         "name": user["name"] if role == "librarian" else None,
@@ -693,22 +1021,32 @@ def login():
 #          LIBRARY SUMMARY RENDR API
 #  ---------------------------------------
 @app.route("/api/library/render")
-def render():
+@with_principal("librarian")
+def render(principal=None):
     con = get_db()
     cur = con.cursor()
-    cur.execute("SELECT SUM(COALESCE(library_fee, 0)) AS total_fine FROM students")
+    # One pass over the books on loan (partial index idx_books_on_loan);
+    # the fine total is kept by triggers in library_stats
+    cur.execute("""
+        SELECT
+            COUNT(*) AS total_issued,
+            COUNT(CASE WHEN issue_duration < DATE('now') THEN 1 END) AS overdue,
+            COUNT(CASE WHEN issue_date = DATE('now') THEN 1 END) AS issue_today,
+            (SELECT total_fine FROM library_stats WHERE id = 1) AS total_fine
+        FROM books
+        WHERE status <> 'available'
+    """)
     row = cur.fetchone()
     total_fine = row["total_fine"]
-    cur.execute("SELECT COUNT(*) FROM books WHERE status is not 'available'")
-    row = cur.fetchone()
-    total_issued = row[0]
-    cur.execute("SELECT COUNT(*) FROM books WHERE issue_duration < DATE('now')")
-    row = cur.fetchone()
-    overdue = row[0]
-    cur.execute("SELECT COUNT(*) FROM books WHERE issue_date = DATE('now')")
-    row = cur.fetchone()
-    issue_today = row[0]
-    cur.execute("SELECT status, id, issue_duration from books where issue_duration < date('now') and status != 'available'")
+    total_issued = row["total_issued"]
+    overdue = row["overdue"]
+    issue_today = row["issue_today"]
+    cur.execute("""
+        SELECT status, id, issue_duration
+        FROM books
+        WHERE issue_duration < DATE('now') AND status <> 'available'
+        ORDER BY issue_duration
+    """)
     rows = cur.fetchall()
     overdue_list = [dict(r) for r in rows]
     con.close()
@@ -725,7 +1063,8 @@ def render():
 #         GENERATE NEXT BOOK ID 
 # --------------------------------------
 @app.route("/api/library/next-book-id")
-def next_book_id():
+@with_principal("librarian")
+def next_book_id(principal=None):
     con = get_db()
     cur = con.cursor()
 
@@ -754,7 +1093,8 @@ def next_book_id():
 #       ISSUE BOOK API
 # -------------------------
 @app.route("/api/library/issueBook", methods=["POST"])
-def issue_book():
+@with_principal("librarian")
+def issue_book(principal=None):
     data = request.json or {}
     studentId = (data.get("studentId") or "").strip()
     bookId = (data.get("bookId") or "").strip()
@@ -785,7 +1125,8 @@ def issue_book():
 #       RETURN BOOK API
 # ---------------------------
 @app.route("/api/library/returnBook", methods=["POST"])
-def return_book():
+@with_principal("librarian")
+def return_book(principal=None):
     data = request.json or {}
     bookId = (data.get("bookId") or "").strip()
     returnDate = (data.get("returnDate") or "")
@@ -832,7 +1173,8 @@ def return_book():
 # -----------------------------
 from datetime import datetime
 @app.route("/api/library/books", methods=["POST"])
-def add_book():
+@with_principal("librarian")
+def add_book(principal=None):
     data = request.json or {}
     title = (data.get("title") or "").strip()
     author = (data.get("author") or "").strip()
@@ -865,7 +1207,8 @@ def add_book():
 #       REMOVE BOOK
 # -------------------------
 @app.route("/api/library/books/<book_id>", methods=["DELETE"])
-def remove_book(book_id):
+@with_principal("librarian")
+def remove_book(book_id, principal=None):
     con = get_db()
     cur = con.cursor()
 
@@ -894,59 +1237,88 @@ def remove_book(book_id):
 # -------------------------
 def get_hall_by_email(email: str):
     """Get hall_id and hall_name from email."""
-    con = get_db()
+    hall = hall_directory.by_email(email)
+    return {"id": hall["id"], "hall_name": hall["hall_name"]} if hall else None
+
+
+# -------------------------
+# HALL: Generate monthly fee + dues
+# -------------------------
+def generate_monthly_fee(con, hall_id: int, month: str, amount: int, deadline=None):
+    """
+    Create a hall's fee for `month` and an unpaid due for every allocated
+    student, in one transaction.
+
+    Returns None if the hall already has a fee for that month, otherwise
+    (created, skipped): dues inserted, and allocated students who already
+    had a due for the month.
+    """
     cur = con.cursor()
-    cur.execute("SELECT id, hall_name FROM halls WHERE LOWER(email)=LOWER(?)", (email,))
-    hall = cur.fetchone()
-    con.close()
-    return dict(hall) if hall else None
+    try:
+        cur.execute("""
+            INSERT INTO hall_monthly_fees (hall_id, month, amount, deadline)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(hall_id, month) DO NOTHING
+        """, (hall_id, month, amount, deadline))
+        if cur.rowcount == 0:
+            con.rollback()
+            return None
+
+        cur.execute("""
+            SELECT COUNT(DISTINCT student_id) FROM room_allocations WHERE hall_id=?
+        """, (hall_id,))
+        total = cur.fetchone()[0]
+
+        cur.execute("""
+            INSERT INTO hall_dues (hall_id, student_id, month, amount, status)
+            SELECT DISTINCT ?, student_id, ?, ?, 'unpaid'
+            FROM room_allocations
+            WHERE hall_id=?
+            ON CONFLICT(student_id, month) DO NOTHING
+        """, (hall_id, month, amount, hall_id))
+        created = cur.rowcount
+
+        con.commit()
+    except Exception:
+        con.rollback()
+        raise
+    return created, total - created
 
 
 # -------------------------
 # HALL: Dashboard Summary
 # -------------------------
 @app.route("/api/hall/render")
-def hall_render():
+@with_principal("hall_manager")
+@conditional_get("hall", hall_id_arg)
+def hall_render(principal=None):
     # Get hall from token/email (in real app, verify JWT)
     # For now, get hall_name from query parameter
-    con = get_db()
-    cur = con.cursor()
-    
     # Get hall by name (or fallback to first hall if not provided)
     hall_name = (request.args.get("hall_name") or "").strip()
+    hall = request_hall(hall_name)
     
-    if hall_name:
-        cur.execute("SELECT id FROM halls WHERE hall_name = ?", (hall_name,))
-    else:
-        cur.execute("SELECT id FROM halls LIMIT 1")
-    
-    hall_row = cur.fetchone()
-    
-    if not hall_row:
-        con.close()
+    if not hall:
         return jsonify({"message": "No hall found"}), 404
     
-    hall_id = hall_row["id"]
-    
-    # Total rooms
-    cur.execute("SELECT COUNT(*) as count FROM rooms WHERE hall_id=?", (hall_id,))
-    total_rooms = cur.fetchone()["count"]
-    
-    # Allocated seats
-    cur.execute("SELECT COUNT(*) as count FROM room_allocations WHERE hall_id=?", (hall_id,))
-    allocated_seats = cur.fetchone()["count"]
-    
-    # Unpaid students (count distinct student IDs, not individual fees)
-    cur.execute("SELECT COUNT(DISTINCT student_id) as count FROM hall_dues WHERE hall_id=? AND status='unpaid'", (hall_id,))
-    unpaid_count = cur.fetchone()["count"]
-    
-    # Monthly fee (latest)
-    cur.execute("SELECT amount FROM hall_monthly_fees WHERE hall_id=? ORDER BY month DESC LIMIT 1", (hall_id,))
-    fee_row = cur.fetchone()
-    monthly_fee = fee_row["amount"] if fee_row else 0
+    hall_id = hall["id"]
     
+    # All four counters are kept by triggers in hall_stats (see database/migrate_hall_stats.py)
+    con = get_db()
+    cur = con.cursor()
+    cur.execute("""
+        SELECT total_rooms, allocated_seats, unpaid_students, monthly_fee
+        FROM hall_stats
+        WHERE hall_id = ?
+    """, (hall_id,))
+    stats = cur.fetchone()
     con.close()
     
+    total_rooms = stats["total_rooms"] if stats else 0
+    allocated_seats = stats["allocated_seats"] if stats else 0
+    unpaid_count = stats["unpaid_students"] if stats else 0
+    monthly_fee = stats["monthly_fee"] if stats else 0
+    
     return jsonify({
         "totalRooms": total_rooms,
         "allocatedSeats": allocated_seats,
@@ -959,12 +1331,13 @@ def hall_render():
 # HALL: Allocate Student to Room
 # -------------------------
 @app.route("/api/hall/allocate", methods=["POST"])
-def allocate_student():
+@with_principal("hall_manager")
+def allocate_student(principal=None):
     data = request.json or {}
     student_ids = data.get("studentIds") or []  # List of student IDs
     room_number = (data.get("roomNumber") or "").strip()
     alloc_type = (data.get("allocType") or "single").strip()
-    hall_name = (data.get("hallName") or "").strip()  # ✅ Get hall from request
+    hall_name = (data.get("hallName") or "").strip() or (principal or {}).get("hall_name", "")  # ✅ Get hall from request or token
     
     if not student_ids or not room_number or not hall_name:
         return jsonify({"message": "studentIds, roomNumber, and hallName required"}), 400
@@ -978,13 +1351,12 @@ def allocate_student():
     
     try:
         # Get hall by name (not just LIMIT 1!)
-        cur.execute("SELECT id FROM halls WHERE hall_name = ?", (hall_name,))
-        hall_row = cur.fetchone()
-        if not hall_row:
+        hall = request_hall(hall_name)
+        if not hall:
             con.close()
             return jsonify({"message": f"Hall '{hall_name}' not found"}), 404
         
-        hall_id = hall_row["id"]
+        hall_id = hall["id"]
         
         # Check if room exists for this hall
         cur.execute("SELECT id, capacity FROM rooms WHERE hall_id=? AND room_number=?", (hall_id, room_number))
@@ -1035,10 +1407,8 @@ def allocate_student():
             con.close()
             return jsonify({"message": "One or more students not found or not verified"}), 400
         
-        # Get hall name for updating student hall field
-        cur.execute("SELECT hall_name FROM halls WHERE id=?", (hall_id,))
-        hall_info = cur.fetchone()
-        hall_name = hall_info["hall_name"] if hall_info else "Unknown Hall"
+        # Hall name for updating student hall field
+        hall_name = hall["hall_name"]
         
         # Insert allocations and update student hall/room
         allocation_date = now_iso()
@@ -1070,73 +1440,229 @@ def allocate_student():
 # DEBUG: Check hall allocation status
 # -------------------------
 @app.route("/api/debug/hall-status")
+@debug_writes_guarded
 def debug_hall_status():
-    """Debug endpoint to check allocations for all halls"""
+    """
+    Debug endpoint to check allocations for all halls.
+
+    Without parameters: one grouped query giving every hall's allocation
+    count next to the trigger-maintained hall_stats counter.
+    With ?hall_name=...: that hall's allocations, paginated by allocation id
+    (?cursor=<next_cursor from the previous page>&limit=<1..500>).
+    """
+    hall_name = (request.args.get("hall_name") or "").strip()
+    
+    if hall_name:
+        return debug_hall_allocations(hall_name)
+    
     con = get_db()
     cur = con.cursor()
     
     try:
-        # Get all halls
-        cur.execute("SELECT id, hall_name FROM halls ORDER BY hall_name")
-        halls = cur.fetchall()
+        cur.execute("""
+            SELECT
+                h.id AS hall_id,
+                h.hall_name,
+                COALESCE(a.allocation_count, 0) AS allocation_count,
+                hs.allocated_seats AS stats_allocated_seats
+            FROM halls h
+            LEFT JOIN (
+                SELECT hall_id, COUNT(*) AS allocation_count
+                FROM room_allocations
+                GROUP BY hall_id
+            ) a ON a.hall_id = h.id
+            LEFT JOIN hall_stats hs ON hs.hall_id = h.id
+            ORDER BY h.hall_name
+        """)
+        halls = [dict(row) for row in cur.fetchall()]
+        con.close()
         
-        result = []
         for hall in halls:
-            hall_id = hall["id"]
-            hall_name = hall["hall_name"]
-            
-            # Count allocations
-            cur.execute("SELECT COUNT(*) as count FROM room_allocations WHERE hall_id=?", (hall_id,))
-            alloc_count = cur.fetchone()["count"]
-            
-            # Get details
-            cur.execute("""
-                SELECT ra.student_id, s.name, r.room_number
-                FROM room_allocations ra
-                JOIN rooms r ON ra.room_id = r.id
-                JOIN students s ON ra.student_id = s.id
-                WHERE ra.hall_id = ?
-            """, (hall_id,))
-            allocations = cur.fetchall()
-            
-            result.append({
-                "hall_id": hall_id,
-                "hall_name": hall_name,
-                "allocation_count": alloc_count,
-                "allocations": [{"student_id": a["student_id"], "name": a["name"], "room": a["room_number"]} for a in allocations]
-            })
+            hall["stats_in_sync"] = hall["stats_allocated_seats"] == hall["allocation_count"]
         
+        return jsonify({"halls": halls}), 200
+    
+    except Exception as e:
         con.close()
-        return jsonify({"halls": result}), 200
+        return jsonify({"message": str(e)}), 500
+
+
+def debug_hall_allocations(hall_name: str):
+    """One page of a hall's allocations, in allocation id order"""
+    hall = hall_directory.by_name(hall_name)
+    if not hall:
+        return jsonify({"message": f"Hall '{hall_name}' not found"}), 404
+    
+    try:
+        cursor = int(request.args.get("cursor") or 0)
+        limit = min(max(int(request.args.get("limit") or 100), 1), 500)
+    except ValueError:
+        return jsonify({"message": "cursor and limit must be integers"}), 400
+    
+    con = get_db()
+    cur = con.cursor()
+    
+    try:
+        cur.execute("""
+            SELECT ra.id, ra.student_id, s.name, r.room_number
+            FROM room_allocations ra
+            JOIN rooms r ON ra.room_id = r.id
+            JOIN students s ON ra.student_id = s.id
+            WHERE ra.hall_id = ? AND ra.id > ?
+            ORDER BY ra.id
+            LIMIT ?
+        """, (hall["id"], cursor, limit + 1))
+        rows = cur.fetchall()
+        con.close()
+        
+        page = rows[:limit]
+        next_cursor = page[-1]["id"] if len(rows) > limit else None
+        
+        return jsonify({
+            "hall_id": hall["id"],
+            "hall_name": hall["hall_name"],
+            "allocations": [{"student_id": a["student_id"], "name": a["name"], "room": a["room_number"]} for a in page],
+            "next_cursor": next_cursor
+        }), 200
     
     except Exception as e:
         con.close()
         return jsonify({"message": str(e)}), 500
 
 
+# -------------------------
+# DEBUG: Connection pool statistics
+# -------------------------
+@app.route("/api/debug/db-pool")
+@debug_writes_guarded
+def debug_db_pool():
+    """Connection pool and directory cache counters for this worker process"""
+    return jsonify({
+        "pools": all_pool_stats(),
+        "hall_directory": hall_directory.stats(),
+        "department_directory": department_directory.stats(),
+        "payment_accounts": accounts_manager.accounts_cache_stats(),
+    }), 200
+
+
+# -------------------------
+# DEBUG: Reload the directory caches
+# -------------------------
+@app.route("/api/debug/directories", methods=["POST"])
+@debug_writes_guarded
+def debug_reload_directories():
+    """
+    Drop this worker's hall, department and payment account snapshots after
+    editing those tables outside the app (e.g. setup_ruet_halls.py); they
+    reload on the next lookup. Other workers catch up within their TTL.
+    """
+    hall_directory.invalidate()
+    department_directory.invalidate()
+    accounts_manager.invalidate_accounts_cache()
+    return jsonify({"message": "Directories will reload on next use"}), 200
+
+
+# -------------------------
+# DEBUG: Password hashing pool
+# -------------------------
+@app.route("/api/debug/hashing")
+@debug_writes_guarded
+def debug_hashing():
+    """bcrypt pool latency, queue wait and rejection counters for this worker process"""
+    return jsonify(hashing_stats()), 200
+
+
+# -------------------------
+# DEBUG: Email outbox
+# -------------------------
+@app.route("/api/debug/email-outbox")
+@debug_writes_guarded
+def debug_email_outbox():
+    """Outbox sender counters for this worker process, plus the queue by status"""
+    con = get_db()
+    rows = con.execute("""
+        SELECT status, COUNT(*) AS count, MIN(next_attempt_at) AS next_attempt_at
+        FROM email_outbox
+        GROUP BY status
+    """).fetchall()
+    con.close()
+    return jsonify({
+        "sender": outbox.stats(),
+        "queue": {r["status"]: {"count": r["count"], "next_attempt_at": r["next_attempt_at"]} for r in rows},
+    }), 200
+
+
+# -------------------------
+# DEBUG: SQL profiler
+# -------------------------
+@app.route("/api/debug/sql-profiler", methods=["GET", "POST"])
+@debug_writes_guarded
+def debug_sql_profiler():
+    """
+    Profiler settings, counters and recent findings for this worker process.
+    POST a JSON object to change settings (admin only, see debug_writes_guarded), e.g.
+    {"enabled": true, "slow_ms": 20, "repeat_threshold": 5, "max_statements": 50, "explain": true}
+    """
+    if request.method == "POST":
+        changes = request.get_json(silent=True)
+        if not isinstance(changes, dict):
+            return jsonify({"message": "Send the settings to change as a JSON object"}), 400
+        try:
+            configure_profiler(**changes)
+        except ValueError as e:
+            return jsonify({"message": str(e)}), 400
+    return jsonify(profiler_stats()), 200
+
+
+# -------------------------
+# Prometheus metrics (see backend/metrics.py)
+# -------------------------
+@register_collector
+def worker_metrics():
+    """Compression, bcrypt pool, outbox and DB pool counters, summed over workers"""
+    compression = compression_stats()
+    hashing = hashing_stats()
+    sender = outbox.stats()
+    pools = all_pool_stats().values()
+    return {
+        "ruet_compression_bytes_in_total": ("counter", "Response bytes before compression", compression["bytes_in"]),
+        "ruet_compression_bytes_out_total": ("counter", "Response bytes after compression", compression["bytes_out"]),
+        "ruet_hash_rejected_total": ("counter", "bcrypt jobs shed with 503", hashing["rejected"]),
+        "ruet_hash_in_flight": ("gauge", "bcrypt jobs queued or running", hashing["in_flight"]),
+        "ruet_email_sent_total": ("counter", "Outbox emails delivered", sender["sent"]),
+        "ruet_email_failed_total": ("counter", "Outbox emails given up on", sender["failed"]),
+        "ruet_db_read_connections_in_use": ("gauge", "Read-lane connections leased", sum(p["read"]["in_use"] for p in pools)),
+        "ruet_db_write_waits_total": ("counter", "Waits for the writer connection", sum(p["write"]["waits"] for p in pools)),
+        "ruet_db_write_wait_seconds_total": ("counter", "Time spent waiting for the writer connection",
+                                             sum(p["write"]["wait_ms_total"] for p in pools) / 1000),
+    }
+
+
+@app.route("/metrics")
+def metrics():
+    """Per-endpoint latency, status, size and query histograms for every worker process"""
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
+
 # -------------------------
 # HALL: Get Allocations
 # -------------------------
 @app.route("/api/hall/allocations")
-def get_allocations():
-    con = get_db()
-    cur = con.cursor()
-    
+@with_principal("hall_manager")
+@conditional_get("hall", hall_id_arg)
+def get_allocations(principal=None):
     # Get hall_name from query parameter
-    hall_name = (request.args.get("hall_name") or "").strip()
-    
-    # Get hall by name (or fallback to first hall if not provided)
-    if hall_name:
-        cur.execute("SELECT id FROM halls WHERE hall_name = ?", (hall_name,))
-    else:
-        cur.execute("SELECT id FROM halls LIMIT 1")
+    hall_name = (request.args.get("hall_name") or "").strip()
     
-    hall_row = cur.fetchone()
-    if not hall_row:
-        con.close()
+    # Get hall by name (or fallback to first hall if not provided)
+    hall = request_hall(hall_name)
+    if not hall:
         return jsonify({"message": "Hall not found"}), 404
     
-    hall_id = hall_row["id"]
+    hall_id = hall["id"]
+    
+    con = get_db()
+    cur = con.cursor()
     
     cur.execute("""
         SELECT 
@@ -1169,72 +1695,63 @@ def get_allocations():
 # HALL: Get Room Inventory
 # -------------------------
 @app.route("/api/hall/rooms")
-def get_rooms():
-    con = get_db()
-    cur = con.cursor()
-    
+@with_principal("hall_manager")
+@conditional_get("hall", hall_id_arg)
+def get_rooms(principal=None):
     # Get hall_name from query parameter
     hall_name = (request.args.get("hall_name") or "").strip()
     
     # Get hall by name (or fallback to first hall if not provided)
-    if hall_name:
-        cur.execute("SELECT id FROM halls WHERE hall_name = ?", (hall_name,))
-    else:
-        cur.execute("SELECT id FROM halls LIMIT 1")
-    
-    hall_row = cur.fetchone()
-    if not hall_row:
-        con.close()
+    hall = request_hall(hall_name)
+    if not hall:
         return jsonify({"message": "Hall not found"}), 404
     
-    hall_id = hall_row["id"]
+    hall_id = hall["id"]
+    
+    con = get_db()
+    cur = con.cursor()
     
-    # Get all rooms with allocation details
+    # Get all rooms and their occupants in one query (rooms come back in
+    # numeric order straight from idx_rooms_hall_number, no sort step)
     cur.execute("""
         SELECT 
             r.id,
-            r.hall_id,
             r.room_number,
             r.capacity,
             r.occupied_seats,
-            CASE 
-                WHEN r.capacity = 1 THEN 'single'
-                ELSE 'shared'
-            END as type
+            ra.student_id,
+            ra.allocation_date
         FROM rooms r
+        LEFT JOIN room_allocations ra ON ra.room_id = r.id
         WHERE r.hall_id = ?
-        ORDER BY CAST(r.room_number AS INTEGER)
+        ORDER BY CAST(r.room_number AS INTEGER), r.room_number
     """, (hall_id,))
     
-    room_rows = cur.fetchall()
+    rows = cur.fetchall()
+    con.close()
     
-    rooms = []
-    for room in room_rows:
-        room_id = room["id"]
-        
-        # Get students in this room
-        cur.execute("""
-            SELECT 
-                ra.student_id,
-                s.name
-            FROM room_allocations ra
-            JOIN students s ON ra.student_id = s.id
-            WHERE ra.room_id = ?
-            ORDER BY ra.allocation_date
-        """, (room_id,))
-        
-        student_rows = cur.fetchall()
-        student_list = ", ".join([f"{s['student_id']}" for s in student_rows])
-        
-        rooms.append({
-            "room_number": room["room_number"],
-            "type": room["type"],
-            "max_capacity": room["capacity"],
-            "current_occupancy": room["occupied_seats"],
-            "student_list": student_list if student_list else ""
-        })
+    # Group occupants under their room, keeping room order
+    rooms_by_id = {}
+    occupants = {}
+    for row in rows:
+        room_id = row["id"]
+        if room_id not in rooms_by_id:
+            rooms_by_id[room_id] = {
+                "room_number": row["room_number"],
+                "type": "single" if row["capacity"] == 1 else "shared",
+                "max_capacity": row["capacity"],
+                "current_occupancy": row["occupied_seats"],
+                "student_list": ""
+            }
+            occupants[room_id] = []
+        if row["student_id"] is not None:
+            occupants[room_id].append((row["allocation_date"] or "", row["student_id"]))
     
-    con.close()
+    rooms = []
+    for room_id, room in rooms_by_id.items():
+        students = sorted(occupants[room_id], key=lambda o: o[0])
+        room["student_list"] = ", ".join(sid for _, sid in students)
+        rooms.append(room)
     
     return jsonify({"rooms": rooms}), 200
 
@@ -1243,7 +1760,8 @@ def get_rooms():
 # HALL: Deallocate Student from Room
 # -------------------------
 @app.route("/api/hall/allocate/<allocation_id>", methods=["DELETE"])
-def deallocate_student(allocation_id):
+@with_principal("hall_manager")
+def deallocate_student(allocation_id, principal=None):
     con = get_db()
     cur = con.cursor()
     
@@ -1252,8 +1770,8 @@ def deallocate_student(allocation_id):
         cur.execute("""
             SELECT ra.room_id, ra.student_id
             FROM room_allocations ra
-            WHERE ra.id=?
-        """, (allocation_id,))
+            WHERE ra.id=? AND (? IS NULL OR ra.hall_id = ?)
+        """, (allocation_id, own_hall_id(), own_hall_id()))
         alloc_row = cur.fetchone()
         
         if not alloc_row:
@@ -1286,7 +1804,8 @@ def deallocate_student(allocation_id):
 # HALL: Create/Update Monthly Fee
 # -------------------------
 @app.route("/api/hall/fees/monthly", methods=["POST"])
-def create_monthly_fee():
+@with_principal("hall_manager")
+def create_monthly_fee(principal=None):
     data = request.json or {}
     month = (data.get("month") or "").strip()  # YYYY-MM
     amount = int(data.get("amount") or 0)
@@ -1296,55 +1815,26 @@ def create_monthly_fee():
         return jsonify({"message": "month and amount required"}), 400
     
     con = get_db()
-    cur = con.cursor()
     
     try:
-        # Get hall
-        cur.execute("SELECT id FROM halls LIMIT 1")
-        hall_row = cur.fetchone()
-        if not hall_row:
+        # Get hall (the manager's own with a token, else the first hall)
+        hall = request_hall()
+        if not hall:
             con.close()
             return jsonify({"message": "Hall not found"}), 404
         
-        hall_id = hall_row["id"]
-        
-        # Check if fee already exists for this month
-        cur.execute("SELECT id FROM hall_monthly_fees WHERE hall_id=? AND month=?", (hall_id, month))
-        if cur.fetchone():
-            con.close()
-            return jsonify({"message": "Fee already exists for this month"}), 409
-        
-        # Insert monthly fee
-        cur.execute("""
-            INSERT INTO hall_monthly_fees (hall_id, month, amount, deadline)
-            VALUES (?, ?, ?, ?)
-        """, (hall_id, month, amount, deadline))
-        
-        con.commit()
-        
-        # Now create dues for all allocated students
-        cur.execute("""
-            SELECT DISTINCT student_id FROM room_allocations WHERE hall_id=?
-        """, (hall_id,))
-        students = cur.fetchall()
-        
-        for student_row in students:
-            student_id = student_row["student_id"]
-            # Check if due already exists
-            cur.execute("""
-                SELECT id FROM hall_dues WHERE student_id=? AND month=?
-            """, (student_id, month))
-            if not cur.fetchone():
-                # Insert new due
-                cur.execute("""
-                    INSERT INTO hall_dues (hall_id, student_id, month, amount, status)
-                    VALUES (?, ?, ?, ?, 'unpaid')
-                """, (hall_id, student_id, month, amount))
-        
-        con.commit()
+        result = generate_monthly_fee(con, hall["id"], month, amount, deadline)
         con.close()
+        if result is None:
+            return jsonify({"message": "Fee already exists for this month"}), 409
         
-        return jsonify({"message": f"Monthly fee created for {len(students)} student(s)"}), 200
+        created, skipped = result
+        return jsonify({
+            "message": f"Monthly fee created for {created} student(s)",
+            "created_count": created,
+            "skipped_count": skipped,
+            "total_students": created + skipped
+        }), 200
     
     except Exception as e:
         con.close()
@@ -1352,29 +1842,65 @@ def create_monthly_fee():
 
 
 # -------------------------
-# HALL: Get Hall Dues
+# HALL: Dues page (shared by /api/hall/dues and /api/hall/dues/search)
 # -------------------------
-@app.route("/api/hall/dues")
-def get_hall_dues():
-    con = get_db()
-    cur = con.cursor()
+def hall_dues_page(hall_id: int):
+    """
+    One page of a hall's dues, newest month first, then by student_id.
+
+    Query parameters:
+        cursor       next_cursor from the previous page ("<month>|<student_id>")
+        limit        page size (default HALL_DUES_PAGE_SIZE, max HALL_DUES_PAGE_MAX)
+        student_id   ids starting with it (a full roll matches just that student)
+        month, status ('paid'/'unpaid'), min_amount, max_amount
+
+    The keyset seek and the filters run in SQL on idx_dues_hall_month, so
+    a page costs the same however many dues the hall has.
+    Returns (dues, next_cursor); raises ValueError on bad parameters.
+    """
+    args = request.args
+    limit = min(max(int(args.get("limit") or HALL_DUES_PAGE_SIZE), 1), HALL_DUES_PAGE_MAX)
     
-    # Get hall by name (or fallback to first hall if not provided)
-    hall_name = (request.args.get("hall_name") or "").strip()
+    where = ["hd.hall_id = ?"]
+    params = [hall_id]
     
-    if hall_name:
-        cur.execute("SELECT id FROM halls WHERE hall_name = ?", (hall_name,))
-    else:
-        cur.execute("SELECT id FROM halls LIMIT 1")
+    cursor = (args.get("cursor") or "").strip()
+    if cursor:
+        after_month, sep, after_student = cursor.partition("|")
+        if not sep:
+            raise ValueError("cursor must be the next_cursor of the previous page")
+        # month DESC, student_id ASC: written so month <= ? bounds the index range
+        where.append("hd.month <= ? AND (hd.month < ? OR hd.student_id > ?)")
+        params += [after_month, after_month, after_student]
     
-    hall_row = cur.fetchone()
-    if not hall_row:
-        con.close()
-        return jsonify({"message": "Hall not found"}), 404
+    student_id = (args.get("student_id") or "").strip()
+    if student_id:
+        # a prefix, like the search box always matched ("2203" -> 2203xxx)
+        where.append("hd.student_id >= ? AND hd.student_id < ?")
+        params += student_id_prefix_range(student_id)
     
-    hall_id = hall_row["id"]
+    month = (args.get("month") or "").strip()
+    if month:
+        where.append("hd.month = ?")
+        params.append(month)
     
-    cur.execute("""
+    status = (args.get("status") or "").strip().lower()
+    if status:
+        if status not in ("paid", "unpaid"):
+            raise ValueError("status must be 'paid' or 'unpaid'")
+        where.append("hd.status = ?")
+        params.append(status)
+    
+    if args.get("min_amount"):
+        where.append("hd.amount >= ?")
+        params.append(int(args["min_amount"]))
+    if args.get("max_amount"):
+        where.append("hd.amount <= ?")
+        params.append(int(args["max_amount"]))
+    
+    con = get_db()
+    cur = con.cursor()
+    cur.execute(f"""
         SELECT 
             hd.id,
             hd.student_id,
@@ -1382,53 +1908,83 @@ def get_hall_dues():
             hd.month,
             hd.amount,
             hd.status,
-            hd.paid_date
+            hd.paid_date,
+            hd.created_at
         FROM hall_dues hd
         JOIN students s ON hd.student_id = s.id
-        WHERE hd.hall_id = ?
+        WHERE {" AND ".join(where)}
         ORDER BY hd.month DESC, hd.student_id
-    """, (hall_id,))
-    
+        LIMIT ?
+    """, params + [limit + 1])
     rows = cur.fetchall()
     con.close()
     
-    dues = [dict(row) for row in rows]
+    page = rows[:limit]
+    next_cursor = f"{page[-1]['month']}|{page[-1]['student_id']}" if len(rows) > limit else None
+    return [dict(row) for row in page], next_cursor
+
+
+# -------------------------
+# HALL: Get Hall Dues
+# -------------------------
+@app.route("/api/hall/dues")
+@with_principal("hall_manager")
+@conditional_get("hall", hall_id_arg)
+def get_hall_dues(principal=None):
+    """One page of the hall's dues; pass next_cursor back as ?cursor= for the next."""
+    # Get hall by name (or fallback to first hall if not provided)
+    hall_name = (request.args.get("hall_name") or "").strip()
+    hall = request_hall(hall_name)
+    if not hall:
+        return jsonify({"message": "Hall not found"}), 404
+    
+    try:
+        dues, next_cursor = hall_dues_page(hall["id"])
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
     
-    return jsonify({"dues": dues}), 200
+    return jsonify({"dues": dues, "next_cursor": next_cursor}), 200
 
 
 # -------------------------
 # HALL: Mark Due as Paid
 # -------------------------
 @app.route("/api/hall/dues/<due_id>/pay", methods=["POST"])
-def mark_due_paid(due_id):
+@with_principal("student", "hall_manager")
+def mark_due_paid(due_id, principal=None):
     data = request.json or {}
     
     con = get_db()
     cur = con.cursor()
     
     try:
-        # Check if due exists
-        cur.execute("SELECT student_id, amount FROM hall_dues WHERE id=?", (due_id,))
-        due_row = cur.fetchone()
-        
-        if not due_row:
-            con.close()
-            return jsonify({"message": "Due not found"}), 404
-        
-        # Mark as paid
-        paid_date = now_iso()
+        # Flip the due only if it is still unpaid, so a double click (or two
+        # tabs) can't subtract the same payment twice
         cur.execute("""
-            UPDATE hall_dues SET status='paid', paid_date=? WHERE id=?
-        """, (paid_date, due_id))
+            UPDATE hall_dues SET status='paid', paid_date=?
+            WHERE id=? AND status='unpaid'
+              AND (? IS NULL OR student_id = ?) AND (? IS NULL OR hall_id = ?)
+            RETURNING student_id, amount
+        """, (now_iso(), due_id, own_student_id(), own_student_id(), own_hall_id(), own_hall_id()))
+        due_rows = cur.fetchall()
+        
+        if not due_rows:
+            con.rollback()
+            cur.execute("""
+                SELECT 1 FROM hall_dues
+                WHERE id=? AND (? IS NULL OR student_id = ?) AND (? IS NULL OR hall_id = ?)
+            """, (due_id, own_student_id(), own_student_id(), own_hall_id(), own_hall_id()))
+            exists = cur.fetchone()
+            con.close()
+            if not exists:
+                return jsonify({"message": "Due not found"}), 404
+            return jsonify({"message": "Hall due is already paid"}), 409
         
         # Update student's hall_fee
-        student_id = due_row["student_id"]
-        cur.execute("SELECT hall_fee FROM students WHERE id=?", (student_id,))
-        student = cur.fetchone()
-        current_fee = int(student["hall_fee"] or 0)
-        new_fee = max(0, current_fee - int(due_row["amount"]))
-        cur.execute("UPDATE students SET hall_fee=? WHERE id=?", (new_fee, student_id))
+        due_row = due_rows[0]
+        cur.execute("""
+            UPDATE students SET hall_fee = MAX(0, COALESCE(hall_fee, 0) - ?) WHERE id=?
+        """, (int(due_row["amount"] or 0), due_row["student_id"]))
         
         con.commit()
         con.close()
@@ -1448,41 +2004,22 @@ def mark_due_paid(due_id):
 # HALL: Get all accounts
 # -------------------------
 @app.route("/api/hall/accounts")
-def get_hall_accounts():
+@with_principal("hall_manager")
+def get_hall_accounts(principal=None):
     """Get all payment accounts (halls, library, departments)"""
-    con = get_db()
-    cur = con.cursor()
-    
     # Optional filter by account type
     account_type = (request.args.get("account_type") or "").strip() or None  # 'hall', 'library', 'department'
     
-    query = """
-        SELECT 
-            id,
-            account_type,
-            entity_identifier,
-            account_name,
-            account_number,
-            bank_name,
-            account_holder,
-            is_active,
-            created_at
-        FROM payment_accounts
-        WHERE is_active = 1
-    """
-    params = []
-    
-    if account_type:
-        query += " AND account_type = ?"
-        params.append(account_type)
-    
-    query += " ORDER BY account_type, created_at DESC"
-    
-    cur.execute(query, params)
-    rows = cur.fetchall()
-    con.close()
-    
-    accounts = [dict(row) for row in rows]
+    if account_type in ("hall", "library", "department"):
+        accounts = accounts_manager.get_accounts_by_type(account_type)
+    elif account_type:
+        accounts = []
+    else:
+        accounts = [
+            a
+            for t in ("department", "hall", "library")
+            for a in accounts_manager.get_accounts_by_type(t)
+        ]
     
     return jsonify({"accounts": accounts}), 200
 
@@ -1491,7 +2028,8 @@ def get_hall_accounts():
 # HALL: Create or update payment account
 # -------------------------
 @app.route("/api/hall/accounts", methods=["POST"])
-def create_hall_account():
+@with_principal("hall_manager")
+def create_hall_account(principal=None):
     """Create or update a payment account (hall, library, or department)"""
     data = request.json or {}
     account_type = (data.get("account_type") or "").strip()  # 'hall', 'library', 'department'
@@ -1529,6 +2067,7 @@ def create_hall_account():
             """, (account_name, account_number, bank_name, account_holder, account_id))
             con.commit()
             con.close()
+            accounts_manager.invalidate_accounts_cache()
             
             return jsonify({
                 "message": "Account updated successfully",
@@ -1545,6 +2084,7 @@ def create_hall_account():
             con.commit()
             account_id = cur.lastrowid
             con.close()
+            accounts_manager.invalidate_accounts_cache()
             
             return jsonify({
                 "message": "Account created successfully",
@@ -1564,72 +2104,38 @@ def create_hall_account():
 # HALL: Create monthly fee for all students
 # -------------------------
 @app.route("/api/hall/fees/create-for-all", methods=["POST"])
-def create_fee_for_all():
+@with_principal("hall_manager")
+def create_fee_for_all(principal=None):
     """Create monthly fee for all allocated students in a hall"""
     data = request.json or {}
     month = (data.get("month") or "").strip()  # YYYY-MM
     amount = int(data.get("amount") or 0)
     deadline = (data.get("deadline") or "").strip() or None
-    hall_name = (data.get("hall_name") or "").strip()
+    hall_name = (data.get("hall_name") or "").strip() or (principal or {}).get("hall_name", "")
     
     if not month or amount <= 0 or not hall_name:
         return jsonify({"message": "month, amount, and hall_name required"}), 400
     
     con = get_db()
-    cur = con.cursor()
     
     try:
         # Get hall
-        cur.execute("SELECT id FROM halls WHERE hall_name = ?", (hall_name,))
-        hall_row = cur.fetchone()
-        if not hall_row:
+        hall = request_hall(hall_name)
+        if not hall:
             con.close()
             return jsonify({"message": f"Hall '{hall_name}' not found"}), 404
         
-        hall_id = hall_row["id"]
-        
-        # Check if fee already exists for this month
-        cur.execute("SELECT id FROM hall_monthly_fees WHERE hall_id=? AND month=?", (hall_id, month))
-        if cur.fetchone():
-            con.close()
-            return jsonify({"message": "Fee already exists for this month"}), 409
-        
-        # Insert monthly fee
-        cur.execute("""
-            INSERT INTO hall_monthly_fees (hall_id, month, amount, deadline)
-            VALUES (?, ?, ?, ?)
-        """, (hall_id, month, amount, deadline))
-        
-        con.commit()
-        
-        # Now create dues for all allocated students
-        cur.execute("""
-            SELECT DISTINCT student_id FROM room_allocations WHERE hall_id=?
-        """, (hall_id,))
-        students = cur.fetchall()
-        
-        created_count = 0
-        for student_row in students:
-            student_id = student_row["student_id"]
-            # Check if due already exists
-            cur.execute("""
-                SELECT id FROM hall_dues WHERE student_id=? AND month=?
-            """, (student_id, month))
-            if not cur.fetchone():
-                # Insert new due
-                cur.execute("""
-                    INSERT INTO hall_dues (hall_id, student_id, month, amount, status)
-                    VALUES (?, ?, ?, ?, 'unpaid')
-                """, (hall_id, student_id, month, amount))
-                created_count += 1
-        
-        con.commit()
+        result = generate_monthly_fee(con, hall["id"], month, amount, deadline)
         con.close()
+        if result is None:
+            return jsonify({"message": "Fee already exists for this month"}), 409
         
+        created, skipped = result
         return jsonify({
-            "message": f"Monthly fee created for {created_count} student(s)",
-            "created_count": created_count,
-            "total_students": len(students)
+            "message": f"Monthly fee created for {created} student(s)",
+            "created_count": created,
+            "skipped_count": skipped,
+            "total_students": created + skipped
         }), 200
     
     except Exception as e:
@@ -1641,13 +2147,14 @@ def create_fee_for_all():
 # HALL: Create monthly fee for single student
 # -------------------------
 @app.route("/api/hall/fees/create-for-student", methods=["POST"])
-def create_fee_for_student():
+@with_principal("hall_manager")
+def create_fee_for_student(principal=None):
     """Create monthly fee for a single student"""
     data = request.json or {}
     student_id = (data.get("student_id") or "").strip()
     month = (data.get("month") or "").strip()  # YYYY-MM
     amount = int(data.get("amount") or 0)
-    hall_name = (data.get("hall_name") or "").strip()
+    hall_name = (data.get("hall_name") or "").strip() or (principal or {}).get("hall_name", "")
     
     if not student_id or not month or amount <= 0 or not hall_name:
         return jsonify({"message": "student_id, month, amount, and hall_name required"}), 400
@@ -1657,13 +2164,12 @@ def create_fee_for_student():
     
     try:
         # Get hall
-        cur.execute("SELECT id FROM halls WHERE hall_name = ?", (hall_name,))
-        hall_row = cur.fetchone()
-        if not hall_row:
+        hall = request_hall(hall_name)
+        if not hall:
             con.close()
             return jsonify({"message": f"Hall '{hall_name}' not found"}), 404
         
-        hall_id = hall_row["id"]
+        hall_id = hall["id"]
         
         # Verify student exists and is allocated to this hall
         cur.execute("""
@@ -1713,14 +2219,16 @@ def create_fee_for_student():
 # HALL: Delete single due
 # -------------------------
 @app.route("/api/hall/dues/<due_id>", methods=["DELETE"])
-def delete_due(due_id):
+@with_principal("hall_manager")
+def delete_due(due_id, principal=None):
     """Delete a single due"""
     con = get_db()
     cur = con.cursor()
     
     try:
         # Check if due exists
-        cur.execute("SELECT id FROM hall_dues WHERE id=?", (due_id,))
+        cur.execute("SELECT id FROM hall_dues WHERE id=? AND (? IS NULL OR hall_id = ?)",
+                    (due_id, own_hall_id(), own_hall_id()))
         if not cur.fetchone():
             con.close()
             return jsonify({"message": "Due not found"}), 404
@@ -1742,12 +2250,13 @@ def delete_due(due_id):
 # HALL: Delete all dues for student or by month
 # -------------------------
 @app.route("/api/hall/dues/delete-all", methods=["POST"])
-def delete_all_dues():
+@with_principal("hall_manager")
+def delete_all_dues(principal=None):
     """Delete all dues by student or by month"""
     data = request.json or {}
     student_id = (data.get("student_id") or "").strip() or None
     month = (data.get("month") or "").strip() or None
-    hall_name = (data.get("hall_name") or "").strip()
+    hall_name = (data.get("hall_name") or "").strip() or (principal or {}).get("hall_name", "")
     
     if not hall_name:
         return jsonify({"message": "hall_name required"}), 400
@@ -1760,13 +2269,12 @@ def delete_all_dues():
     
     try:
         # Get hall
-        cur.execute("SELECT id FROM halls WHERE hall_name = ?", (hall_name,))
-        hall_row = cur.fetchone()
-        if not hall_row:
+        hall = request_hall(hall_name)
+        if not hall:
             con.close()
             return jsonify({"message": f"Hall '{hall_name}' not found"}), 404
         
-        hall_id = hall_row["id"]
+        hall_id = hall["id"]
         
         # Delete dues based on criteria
         if student_id and month:
@@ -1806,64 +2314,29 @@ def delete_all_dues():
 # HALL: Search dues
 # -------------------------
 @app.route("/api/hall/dues/search")
-def search_hall_dues():
-    """Search dues by student ID or date (month)"""
-    con = get_db()
-    cur = con.cursor()
-    
-    hall_name = (request.args.get("hall_name") or "").strip()
-    student_id = (request.args.get("student_id") or "").strip() or None
-    month = (request.args.get("month") or "").strip() or None  # Format: YYYY-MM
+@with_principal("hall_manager")
+@conditional_get("hall", hall_id_arg)
+def search_hall_dues(principal=None):
+    """Search dues by student ID or date (month); paged like /api/hall/dues"""
+    hall_name = (request.args.get("hall_name") or "").strip() or (principal or {}).get("hall_name", "")
     
     if not hall_name:
-        con.close()
         return jsonify({"message": "hall_name required"}), 400
     
     # Get hall
-    cur.execute("SELECT id FROM halls WHERE hall_name = ?", (hall_name,))
-    hall_row = cur.fetchone()
-    if not hall_row:
-        con.close()
+    hall = request_hall(hall_name)
+    if not hall:
         return jsonify({"message": f"Hall '{hall_name}' not found"}), 404
     
-    hall_id = hall_row["id"]
-    
-    # Build query based on filters
-    query = """
-        SELECT 
-            hd.id,
-            hd.student_id,
-            s.name as student_name,
-            hd.month,
-            hd.amount,
-            hd.status,
-            hd.paid_date,
-            hd.created_at
-        FROM hall_dues hd
-        JOIN students s ON hd.student_id = s.id
-        WHERE hd.hall_id = ?
-    """
-    params = [hall_id]
-    
-    if student_id:
-        query += " AND hd.student_id = ?"
-        params.append(student_id)
-    
-    if month:
-        query += " AND hd.month = ?"
-        params.append(month)
-    
-    query += " ORDER BY hd.month DESC, hd.student_id"
-    
-    cur.execute(query, params)
-    rows = cur.fetchall()
-    con.close()
-    
-    dues = [dict(row) for row in rows]
+    try:
+        dues, next_cursor = hall_dues_page(hall["id"])
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
     
     return jsonify({
-        "total": len(dues),
-        "dues": dues
+        "total": len(dues),  # rows in this page
+        "dues": dues,
+        "next_cursor": next_cursor
     }), 200
 
 
@@ -1875,38 +2348,46 @@ def search_hall_dues():
 # DEPT: Mark Due as Paid
 # -------------------------
 @app.route("/api/dept/dues/<fee_id>/pay", methods=["POST"])
-def mark_dept_due_paid(fee_id):
+@with_principal("student", "department_officer")
+def mark_dept_due_paid(fee_id, principal=None):
     data = request.json or {}
     
     con = get_db()
     cur = con.cursor()
     
+    # fee_id is shared by every student the fee was assigned to
+    student_id = (data.get("student_id") or "").strip() or own_student_id() or ""
+    if own_student_id() and student_id != own_student_id():
+        con.close()
+        return jsonify({"message": "You can only pay your own dues"}), 403
+    if not student_id:
+        con.close()
+        return jsonify({"message": "student_id required"}), 400
+    
     try:
-        # Get the department due
+        # Flip the due only if it is still unpaid, so a double click (or two
+        # tabs) can't subtract the same payment twice
         cur.execute("""
-            SELECT student_id, amount, dept_id FROM department_dues WHERE fee_id=?
-        """, (fee_id,))
-        due_row = cur.fetchone()
+            UPDATE department_dues SET status='paid', paid_date=?
+            WHERE fee_id=? AND student_id=? AND status='unpaid'
+            RETURNING amount
+        """, (now_iso(), fee_id, student_id))
+        due_rows = cur.fetchall()
         
-        if not due_row:
+        if not due_rows:
+            con.rollback()
+            cur.execute("SELECT 1 FROM department_dues WHERE fee_id=? AND student_id=?", (fee_id, student_id))
+            exists = cur.fetchone()
             con.close()
-            return jsonify({"message": "Due not found"}), 404
-        
-        student_id = due_row["student_id"]
-        amount = int(due_row["amount"] or 0)
-        
-        # Mark as paid
-        paid_date = now_iso()
-        cur.execute("""
-            UPDATE department_dues SET status='paid', paid_date=? WHERE fee_id=?
-        """, (paid_date, fee_id))
+            if not exists:
+                return jsonify({"message": "Due not found"}), 404
+            return jsonify({"message": "Department due is already paid"}), 409
         
         # Update student's dept_fee (subtract from total)
-        cur.execute("SELECT dept_fee FROM students WHERE id=?", (student_id,))
-        student = cur.fetchone()
-        current_fee = int(student["dept_fee"] or 0)
-        new_fee = max(0, current_fee - amount)
-        cur.execute("UPDATE students SET dept_fee=? WHERE id=?", (new_fee, student_id))
+        amount = sum(int(row["amount"] or 0) for row in due_rows)
+        cur.execute("""
+            UPDATE students SET dept_fee = MAX(0, COALESCE(dept_fee, 0) - ?) WHERE id=?
+        """, (amount, student_id))
         
         con.commit()
         con.close()
@@ -1922,7 +2403,8 @@ def mark_dept_due_paid(fee_id):
 # LIBRARY: Pay Library Fine
 # -------------------------
 @app.route("/api/library/fines/<fine_id>/pay", methods=["POST"])
-def mark_library_fine_paid(fine_id):
+@with_principal("student", "librarian")
+def mark_library_fine_paid(fine_id, principal=None):
     """Mark a library fine as paid and update student's library_fee"""
     data = request.json or {}
     
@@ -1930,31 +2412,30 @@ def mark_library_fine_paid(fine_id):
     cur = con.cursor()
     
     try:
-        # Get the library fine
+        # Flip the fine only if it is still unpaid, so a double click (or two
+        # tabs) can't subtract the same payment twice
         cur.execute("""
-            SELECT student_id, amount FROM library_fines WHERE id=?
-        """, (fine_id,))
-        fine_row = cur.fetchone()
+            UPDATE library_fines SET status='paid', paid_date=?
+            WHERE id=? AND status='unpaid' AND (? IS NULL OR student_id = ?)
+            RETURNING student_id, amount
+        """, (now_iso(), fine_id, own_student_id(), own_student_id()))
+        fine_rows = cur.fetchall()
         
-        if not fine_row:
+        if not fine_rows:
+            con.rollback()
+            cur.execute("SELECT 1 FROM library_fines WHERE id=? AND (? IS NULL OR student_id = ?)",
+                        (fine_id, own_student_id(), own_student_id()))
+            exists = cur.fetchone()
             con.close()
-            return jsonify({"message": "Library fine not found"}), 404
-        
-        student_id = fine_row["student_id"]
-        amount = int(fine_row["amount"] or 0)
-        
-        # Mark as paid
-        paid_date = now_iso()
-        cur.execute("""
-            UPDATE library_fines SET status='paid', paid_date=? WHERE id=?
-        """, (paid_date, fine_id))
+            if not exists:
+                return jsonify({"message": "Library fine not found"}), 404
+            return jsonify({"message": "Library fine is already paid"}), 409
         
         # Update student's library_fee (subtract from total)
-        cur.execute("SELECT library_fee FROM students WHERE id=?", (student_id,))
-        student = cur.fetchone()
-        current_fee = int(student["library_fee"] or 0)
-        new_fee = max(0, current_fee - amount)
-        cur.execute("UPDATE students SET library_fee=? WHERE id=?", (new_fee, student_id))
+        fine_row = fine_rows[0]
+        cur.execute("""
+            UPDATE students SET library_fee = MAX(0, COALESCE(library_fee, 0) - ?) WHERE id=?
+        """, (int(fine_row["amount"] or 0), fine_row["student_id"]))
         
         con.commit()
         con.close()
@@ -1970,34 +2451,63 @@ def mark_library_fine_paid(fine_id):
 #         Department SUMMARY RENDR API
 #  ------------------------------------------
 @app.route("/api/dept/render", methods=['POST'])
-def dept_render():
-    data = request.get_json()
+@with_principal("department_officer")
+def dept_render(principal=None):
+    """
+    Department dashboard: counters from one aggregate query plus one page
+    of feeDetails. Send back feeNextCursor as feeCursor to get the next page;
+    studentId limits feeDetails to student ids starting with it.
+    """
+    data = request.get_json() or {}
     dept_name = data.get('deptName')
+    fee_cursor = data.get('feeCursor') or ["", ""]   # [student_id, fee_id] of the last row seen
+    student_id = str(data.get('studentId') or "").strip()  # optional: only ids starting with this
+    try:
+        fee_limit = min(max(int(data.get('feeLimit') or DEPT_FEE_PAGE_SIZE), 1), DEPT_FEE_PAGE_MAX)
+    except (TypeError, ValueError):
+        return jsonify({"status": "error", "message": "feeLimit must be a number"}), 400
     
-    con = get_db()
+    dept = request_department(dept_name)
+    if not dept:
+        return jsonify({"status": "error", "message": f"Department '{dept_name}' not found"}), 404
+    
+    # Only reads: a POST for the JSON body, but it must not queue for the writer
+    con = get_db(readonly=True)
     cur = con.cursor()
     
-    cur.execute("SELECT COUNT(id) AS total FROM students WHERE dept=?", (dept_name,))
-    result = cur.fetchone() 
-    totalStudents = result[0]
-    cur.execute("select count(status) from department_dues where status='unpaid' and dept_id=(select id from departments where dept_name = ?)",(dept_name,))
-    result = cur.fetchone()
-    totalUnpaidRecord = result[0]
-    cur.execute("select sum(amount) from department_dues where status='unpaid' and dept_id=(select id from departments where dept_name = ?)",(dept_name,))
-    result = cur.fetchone()
-    totalDues = result[0]
-    cur.execute("select count(distinct fee_id) from department_dues where dept_id=(select id from departments where dept_name = ?)",(dept_name,))
-    result = cur.fetchone()
-    totaFeeCreated = result[0]
-    query = """
+    cur.execute("""
+        SELECT
+            (SELECT COUNT(*) FROM students WHERE dept = ?) AS student_count,
+            COUNT(CASE WHEN status = 'unpaid' THEN 1 END) AS unpaid_records,
+            SUM(CASE WHEN status = 'unpaid' THEN amount END) AS total_dues,
+            COUNT(DISTINCT fee_id) AS fee_count
+        FROM department_dues
+        WHERE dept_id = ?
+    """, (dept["dept_name"], dept["id"]))
+    summary = cur.fetchone()
+    
+    # Keyset page over the (dept_id, student_id, fee_id) primary key; the
+    # studentId search narrows the same student_id range
+    where = ["dept_id = ?", "(student_id, fee_id) > (?, ?)"]
+    params = [dept["id"], str(fee_cursor[0]), str(fee_cursor[1])]
+    if student_id:
+        where.append("student_id >= ? AND student_id < ?")
+        params += student_id_prefix_range(student_id)
+    cur.execute(f"""
         SELECT fee_id, due_type, created_at, amount, status, student_id
         FROM department_dues 
-        WHERE dept_id = (select id from departments where dept_name = ?)
-    """
-    cur.execute(query, (dept_name,))
+        WHERE {" AND ".join(where)}
+        ORDER BY student_id, fee_id
+        LIMIT ?
+    """, (*params, fee_limit + 1))
     result = cur.fetchall()
+    con.close()
+    
+    page = result[:fee_limit]
+    fee_next_cursor = [page[-1]["student_id"], page[-1]["fee_id"]] if len(result) > fee_limit else None
+    
     info_of_department_dues = []
-    for info in result:
+    for info in page:
         info_of_department_dues.append({
             "fee_id": info[0],
             "type": info[1],
@@ -2006,15 +2516,15 @@ def dept_render():
             "status": str(info[4]),
             "student_id": str(info[5])
         })
-    con.close()
 
     return jsonify({
         "status": "success",
-        "studentCount": str(totalStudents),
-        "unpaidRecords": str(totalUnpaidRecord),
-        "totalDues": str(totalDues),
-        "totaFeeCreated": str(totaFeeCreated),
-        "feeDetails": info_of_department_dues
+        "studentCount": str(summary["student_count"]),
+        "unpaidRecords": str(summary["unpaid_records"]),
+        "totalDues": str(summary["total_dues"] or 0),
+        "totaFeeCreated": str(summary["fee_count"]),
+        "feeDetails": info_of_department_dues,
+        "feeNextCursor": fee_next_cursor
     })
 
 
@@ -2022,7 +2532,8 @@ def dept_render():
 #         Department Fee  API
 #  ---------------------------------------
 @app.route("/api/deptfee", methods=['POST'])
-def dept_fee():
+@with_principal("department_officer")
+def dept_fee(principal=None):
     data = request.get_json()
     dept_name = data.get('deptName')
     mode = data.get('mode')
@@ -2033,34 +2544,71 @@ def dept_fee():
     deadline = data.get('deadline')
     session = data.get('session')
 
+    dept = request_department(dept_name)
+    if not dept:
+        return jsonify({"status": "error", "message": f"Department '{dept_name}' not found"}), 404
+    dept_id = dept["id"]
+
     con = get_db()
     cur = con.cursor()
 
-    cur.execute("""select id from departments where dept_name = ?""",(dept_name,))
-    dept_id = cur.fetchone()[0]
-
     if mode == "ids":
         try:
-            student_ids = data.get('ids', [])
-            placeholders = ','.join(['?' for _ in student_ids])
-            cur.execute(f"SELECT student_id FROM students WHERE dept = ? AND student_id IN ({placeholders})", 
-                        [dept_name] + student_ids)
-            found_rows = cur.fetchall()
-            found_ids = [row[0] for row in found_rows]
-            not_found = set(student_ids) - set(found_ids)
+            student_ids = [str(s_id).strip() for s_id in data.get('ids') or [] if str(s_id).strip()]
+            if not student_ids:
+                return jsonify({"status": "error", "message": "No student IDs given"}), 400
+
+            # Stage the pasted IDs in a temp table (duplicates collapse on the
+            # primary key), so validation and the insert are single joins
+            # however many IDs there are.
+            cur.execute("CREATE TEMP TABLE IF NOT EXISTS fee_assign_ids (student_id TEXT PRIMARY KEY)")
+            cur.execute("DELETE FROM temp.fee_assign_ids")
+            cur.executemany("INSERT OR IGNORE INTO temp.fee_assign_ids (student_id) VALUES (?)",
+                            [(s_id,) for s_id in student_ids])
+
+            cur.execute("""
+                SELECT f.student_id
+                FROM temp.fee_assign_ids f
+                LEFT JOIN students s ON s.id = f.student_id AND s.dept = ?
+                WHERE s.id IS NULL
+                ORDER BY f.student_id
+            """, (dept["dept_name"],))
+            not_found = [row[0] for row in cur.fetchall()]
             if not_found:
+                con.rollback()
                 return jsonify({
                     "status": "error",
-                    "message": f"These IDs are invalid or not in {dept_name}: {list(not_found)}"
+                    "message": f"These IDs are invalid or not in {dept['dept_name']}: {not_found}",
+                    "failed": [{"id": s_id, "reason": "invalid"} for s_id in not_found]
                 }), 400
-            sql = """
+
+            cur.execute("""
+                SELECT f.student_id
+                FROM temp.fee_assign_ids f
+                JOIN department_dues d
+                  ON d.dept_id = ? AND d.student_id = f.student_id AND d.fee_id = ?
+                ORDER BY f.student_id
+            """, (dept_id, fee_id))
+            already = [row[0] for row in cur.fetchall()]
+
+            cur.execute("""
                 INSERT INTO department_dues (dept_id, student_id, fee_id, amount, status, created_at, due_type, deadline)
-                VALUES (?, ?, ?, ?, 'unpaid', CURRENT_TIMESTAMP, ?, ?)
-            """
-            for s_id in student_ids:
-                cur.execute(sql, (dept_id, s_id, fee_id, amount, type, deadline))
+                SELECT ?, student_id, ?, ?, 'unpaid', CURRENT_TIMESTAMP, ?, ?
+                FROM temp.fee_assign_ids
+                WHERE true
+                ON CONFLICT(dept_id, student_id, fee_id) DO NOTHING
+            """, (dept_id, fee_id, amount, type, deadline))
+            created = cur.rowcount
+
+            cur.execute("DELETE FROM temp.fee_assign_ids")
+            con.commit()
 
-            return jsonify({"status": "success", "message": "Fees assigned successfully!"})
+            return jsonify({
+                "status": "success",
+                "message": "Fees assigned successfully!",
+                "created_count": created,
+                "failed": [{"id": s_id, "reason": "already assigned"} for s_id in already]
+            })
         except Exception as e:
             con.rollback()
             return jsonify({"status": "error", "message": str(e)}), 500
@@ -2077,7 +2625,7 @@ def dept_fee():
             FROM students
             WHERE dept = ? AND student_id LIKE ?
         """
-        values = (dept_id, fee_id, amount, type, deadline, dept_name, session_pattern)
+        values = (dept_id, fee_id, amount, type, deadline, dept["dept_name"], session_pattern)
         cur.execute(sql, values)
         con.commit()
         con.close()
@@ -2091,13 +2639,187 @@ def dept_fee():
             select ?, id, ?, ?, 'unpaid', CURRENT_TIMESTAMP, ?, ?
             from students where dept = ?
         '''
-        values = (dept_id, fee_id, amount, type, deadline, dept_name)
+        values = (dept_id, fee_id, amount, type, deadline, dept["dept_name"])
         cur.execute(sql, values)
         con.commit()
         con.close()
         return jsonify({"status": "success", "message": "Fees assigned successfully!"})
 
 
+# =========================================
+#     EXPORTS (CSV / NDJSON, streamed)
+# =========================================
+
+def stream_export(sql: str, params, columns, fmt: str, filename: str):
+    """
+    Stream the rows of `sql` as CSV (with a header row) or NDJSON.
+
+    Rows are pulled with fetchmany(EXPORT_BATCH_SIZE) and written out batch
+    by batch, so memory stays flat however many rows there are. The
+    connection is leased inside the generator (not through get_db), because
+    request teardown runs before a streamed body has finished; so the
+    export's statements are not counted or profiled with the request.
+    """
+    def generate():
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        if fmt == "csv":
+            writer.writerow(columns)
+            yield buf.getvalue()  # first byte goes out before the query runs
+            buf.seek(0)
+            buf.truncate()
+
+        con = get_pool(DB_PATH).connection(readonly=True)
+        try:
+            cur = con.cursor()
+            cur.execute(sql, params)
+            while True:
+                rows = cur.fetchmany(EXPORT_BATCH_SIZE)
+                if not rows:
+                    break
+                if fmt == "csv":
+                    writer.writerows(tuple(row) for row in rows)
+                else:
+                    for row in rows:
+                        buf.write(json.dumps(dict(zip(columns, row))))
+                        buf.write("\n")
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+        finally:
+            con.close()
+
+    mimetype = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    return Response(generate(), mimetype=mimetype, headers={
+        "Content-Disposition": f'attachment; filename="{filename}.{fmt}"',
+        "Cache-Control": "no-store",
+    })
+
+
+def export_format():
+    """?format=csv (default) or ndjson; None if unsupported."""
+    fmt = (request.args.get("format") or "csv").strip().lower()
+    return fmt if fmt in ("csv", "ndjson") else None
+
+
+# -------------------------
+# HALL: Export dues
+# -------------------------
+@app.route("/api/hall/dues/export")
+@with_principal("hall_manager")
+def export_hall_dues(principal=None):
+    """Hall dues as CSV/NDJSON. Filters: hall_name, month, status, student_id."""
+    fmt = export_format()
+    if not fmt:
+        return jsonify({"message": "format must be csv or ndjson"}), 400
+    
+    hall = request_hall((request.args.get("hall_name") or "").strip())
+    if not hall:
+        return jsonify({"message": "Hall not found"}), 404
+    
+    where = ["hd.hall_id = ?"]
+    params = [hall["id"]]
+    month = (request.args.get("month") or "").strip()
+    if month:
+        where.append("hd.month = ?")
+        params.append(month)
+    status = (request.args.get("status") or "").strip().lower()
+    if status:
+        where.append("hd.status = ?")
+        params.append(status)
+    student_id = (request.args.get("student_id") or "").strip()
+    if student_id:
+        where.append("hd.student_id = ?")
+        params.append(student_id)
+    
+    sql = f"""
+        SELECT hd.id, hd.student_id, s.name, hd.month, hd.amount, hd.status, hd.paid_date, hd.created_at
+        FROM hall_dues hd
+        JOIN students s ON hd.student_id = s.id
+        WHERE {" AND ".join(where)}
+        ORDER BY hd.month DESC, hd.student_id
+    """
+    columns = ["id", "student_id", "student_name", "month", "amount", "status", "paid_date", "created_at"]
+    filename = f"hall_dues_{hall['id']}" + (f"_{month}" if month else "")
+    return stream_export(sql, params, columns, fmt, filename)
+
+
+# -------------------------
+# HALL: Export allocations
+# -------------------------
+@app.route("/api/hall/allocations/export")
+@with_principal("hall_manager")
+def export_hall_allocations(principal=None):
+    """Room allocations of a hall as CSV/NDJSON. Filter: hall_name."""
+    fmt = export_format()
+    if not fmt:
+        return jsonify({"message": "format must be csv or ndjson"}), 400
+    
+    hall = request_hall((request.args.get("hall_name") or "").strip())
+    if not hall:
+        return jsonify({"message": "Hall not found"}), 404
+    
+    sql = """
+        SELECT ra.id, ra.student_id, s.name, s.dept, r.room_number, ra.allocation_type, ra.allocation_date
+        FROM room_allocations ra
+        JOIN rooms r ON ra.room_id = r.id
+        JOIN students s ON ra.student_id = s.id
+        WHERE ra.hall_id = ?
+        ORDER BY CAST(r.room_number AS INTEGER), r.room_number, ra.allocation_date
+    """
+    columns = ["id", "student_id", "student_name", "dept", "room_number", "allocation_type", "allocation_date"]
+    return stream_export(sql, [hall["id"]], columns, fmt, f"hall_allocations_{hall['id']}")
+
+
+# -------------------------
+# DEPT: Export department dues
+# -------------------------
+@app.route("/api/dept/dues/export")
+@with_principal("department_officer")
+def export_dept_dues(principal=None):
+    """Department dues as CSV/NDJSON. Filters: dept_name, fee_id, status, month (YYYY-MM of created_at)."""
+    fmt = export_format()
+    if not fmt:
+        return jsonify({"message": "format must be csv or ndjson"}), 400
+    
+    dept_name = (request.args.get("dept_name") or "").strip()
+    dept = request_department(dept_name)
+    if not dept:
+        return jsonify({"message": f"Department '{dept_name}' not found"}), 404
+    
+    where = ["dd.dept_id = ?"]
+    params = [dept["id"]]
+    fee_id = (request.args.get("fee_id") or "").strip()
+    if fee_id:
+        where.append("dd.fee_id = ?")
+        params.append(fee_id)
+    status = (request.args.get("status") or "").strip().lower()
+    if status:
+        where.append("dd.status = ?")
+        params.append(status)
+    month = (request.args.get("month") or "").strip()
+    if month:
+        where.append("substr(dd.created_at, 1, 7) = ?")
+        params.append(month)
+    
+    sql = f"""
+        SELECT dd.student_id, s.name, dd.fee_id, dd.due_type, dd.amount, dd.status, dd.deadline, dd.created_at, dd.paid_date
+        FROM department_dues dd
+        LEFT JOIN students s ON dd.student_id = s.id
+        WHERE {" AND ".join(where)}
+        ORDER BY dd.student_id, dd.fee_id
+    """
+    columns = ["student_id", "student_name", "fee_id", "fee_type", "amount", "status", "deadline", "created_at", "paid_date"]
+    return stream_export(sql, params, columns, fmt, f"dept_dues_{dept['dept_code']}")
+
+
 if __name__ == "__main__":
+    hall_directory.load()
+    department_directory.load()
+    accounts_manager.get_accounts_stats()  # warm the payment_accounts cache
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":  # the reloader's serving process
+        outbox.start()  # don't wait for the first request
+    else:
+        reset_metrics()  # once per server start, not on every code reload
     app.run(host="127.0.0.1", port=5000,debug=True)
     
\ No newline at end of file
@@ -0,0 +1,178 @@
+"""
+Response Compression
+
+Compresses JSON/CSV/text responses with gzip, or brotli when the optional
+`brotli` package is installed and the client prefers it. The encoding is
+negotiated from Accept-Encoding (q-values respected), and responses smaller
+than COMPRESS_MIN_SIZE are sent as they are.
+
+Streamed responses (generators) are compressed chunk by chunk with a sync
+flush after each chunk, so rows reach the client as they are produced and
+nothing is buffered in memory. Files served with send_from_directory are
+left alone (they carry their own length/range handling).
+
+Usage in your app:
+    from compression import init_compression
+
+    init_compression(app)
+
+Tuning (environment variables):
+    COMPRESS_MIN_SIZE     smallest body compressed, in bytes   (default 1024)
+    COMPRESS_LEVEL        gzip level 1-9                      (default 6)
+    COMPRESS_BR_QUALITY   brotli quality 0-11                 (default 4)
+"""
+
+import os
+import threading
+import time
+import zlib
+from typing import Dict
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+COMPRESS_LEVEL = int(os.getenv("COMPRESS_LEVEL", "6"))
+COMPRESS_BR_QUALITY = int(os.getenv("COMPRESS_BR_QUALITY", "4"))
+
+COMPRESSIBLE_MIMETYPES = {
+    "application/json",
+    "application/x-ndjson",
+    "text/csv",
+    "text/plain",
+    "text/html",
+    "text/css",
+    "application/javascript",
+}
+
+_stats_lock = threading.Lock()
+_stats = {"compressed": 0, "skipped_small": 0, "streamed": 0, "bytes_in": 0, "bytes_out": 0, "cpu_ms": 0.0}
+
+
+class _Encoder:
+    """Incremental gzip / brotli compressor with one interface."""
+
+    def __init__(self, encoding: str, level: int, br_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._c = brotli.Compressor(quality=br_quality)
+        else:
+            self._c = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31: gzip container
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._c.process(data)
+        return self._c.compress(data)
+
+    def flush(self) -> bytes:
+        """Emit everything buffered so far without ending the stream."""
+        if self.encoding == "br":
+            return self._c.flush()
+        return self._c.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._c.finish()
+        return self._c.flush(zlib.Z_FINISH)
+
+
+def _negotiate() -> str:
+    """Best encoding the client accepts, or '' for identity."""
+    offered = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best = request.accept_encodings.best_match(offered)
+    return best or ""
+
+
+def _record(**counts):
+    with _stats_lock:
+        for key, value in counts.items():
+            _stats[key] += value
+
+
+def _stream(body, encoder: _Encoder):
+    try:
+        for chunk in body:
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            if not chunk:
+                continue
+            started = time.process_time()
+            out = encoder.compress(chunk) + encoder.flush()
+            _record(bytes_in=len(chunk), bytes_out=len(out), cpu_ms=(time.process_time() - started) * 1000)
+            yield out
+        yield encoder.finish()
+    finally:
+        # The server closes this generator when the client goes away; pass
+        # that on, so e.g. an export hands its pooled connection back now.
+        close = getattr(body, "close", None)
+        if close is not None:
+            close()
+
+
+def init_compression(app):
+    """Register the after_request hook that compresses eligible responses."""
+
+    @app.after_request
+    def compress_response(response):
+        if (
+            response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or response.status_code < 200
+            or response.status_code in (204, 206, 304)
+            or response.direct_passthrough
+            or "Content-Encoding" in response.headers
+            or request.method == "HEAD"
+        ):
+            return response
+
+        response.vary.add("Accept-Encoding")
+        if "no-transform" in (response.headers.get("Cache-Control") or ""):
+            return response
+
+        encoding = _negotiate()
+        if not encoding:
+            return response
+
+        encoder = _Encoder(encoding, COMPRESS_LEVEL, COMPRESS_BR_QUALITY)
+
+        if response.is_streamed:
+            response.response = _stream(response.response, encoder)
+            response.headers.pop("Content-Length", None)
+            response.headers["Content-Encoding"] = encoding
+            _record(streamed=1)
+            return response
+
+        body = response.get_data()
+        if len(body) < COMPRESS_MIN_SIZE:
+            _record(skipped_small=1)
+            return response
+
+        started = time.process_time()
+        compressed = encoder.compress(body) + encoder.finish()
+        _record(
+            compressed=1,
+            bytes_in=len(body),
+            bytes_out=len(compressed),
+            cpu_ms=(time.process_time() - started) * 1000,
+        )
+
+        response.set_data(compressed)
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+    return app
+
+
+def compression_stats() -> Dict:
+    """Counters since the worker started, for monitoring."""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["cpu_ms"] = round(stats["cpu_ms"], 2)
+    stats["ratio"] = round(stats["bytes_out"] / stats["bytes_in"], 3) if stats["bytes_in"] else None
+    stats["brotli_available"] = brotli is not None
+    stats["settings"] = {"min_size": COMPRESS_MIN_SIZE, "level": COMPRESS_LEVEL, "br_quality": COMPRESS_BR_QUALITY}
+    return stats
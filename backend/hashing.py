@@ -0,0 +1,248 @@
+"""
+Password Hashing Pool
+
+Runs bcrypt on a small, bounded pool of worker threads instead of on the
+request thread. bcrypt releases the GIL while it works, so the threads
+hash in parallel (up to one per core) while the rest of the app keeps
+serving; and because the pool only admits HASH_QUEUE_MAX jobs beyond the
+ones running, a burst of logins gets a fast 503 + Retry-After
+(HashPoolBusy) instead of piling up behind each other and stalling every
+worker thread.
+
+The bcrypt cost (work factor) is set per role; checkpw always uses the
+cost stored in the hash, so changing a role's cost only affects hashes
+made from then on.
+
+One-time codes are not bcrypted: a 6-digit OTP already lives only 10
+minutes behind a 5-attempt counter, so it is stored as an HMAC-SHA256
+keyed with a server secret (otp_digest / check_otp), which takes
+microseconds. OTP hashes written by bcrypt before the switch still verify
+(on the pool) until they expire.
+
+Usage in your app:
+    from hashing import HashPoolBusy, check_otp, check_password, hash_password, otp_digest
+
+    password_hash = hash_password(password, "student")
+    ok = check_password(password, stored_hash)
+
+    otp_hash = otp_digest(student_id, otp)
+    ok = check_otp(student_id, otp, stored_otp_hash)
+
+Tuning (environment variables):
+    HASH_WORKERS                 hashing threads              (default: CPU count)
+    HASH_QUEUE_MAX               jobs waiting beyond those    (default 4 x HASH_WORKERS)
+    BCRYPT_ROUNDS                default cost                 (default 12)
+    BCRYPT_ROUNDS_<ROLE>         cost for one role, e.g. BCRYPT_ROUNDS_STUDENT,
+                                 BCRYPT_ROUNDS_HALL_MANAGER
+    OTP_SECRET                   HMAC key for OTPs; shared by every process.
+                                 When unset, a random key is created once in
+                                 OTP_SECRET_FILE (default database/otp_secret.key)
+"""
+
+import hashlib
+import hmac
+import math
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict
+
+import bcrypt
+
+
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(os.cpu_count() or 1)))
+HASH_QUEUE_MAX = int(os.getenv("HASH_QUEUE_MAX", str(4 * HASH_WORKERS)))
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+OTP_SECRET_FILE = Path(os.getenv(
+    "OTP_SECRET_FILE", Path(__file__).resolve().parent.parent / "database" / "otp_secret.key"
+))
+
+ROLES = ("student", "librarian", "hall_manager", "department_officer")
+
+# otp_hash prefix for HMAC digests; bcrypt hashes start with "$2"
+OTP_HMAC_PREFIX = "hmac-sha256$"
+
+
+def rounds_for(role: str) -> int:
+    """bcrypt cost for new hashes made for `role`."""
+    return int(os.getenv(f"BCRYPT_ROUNDS_{role.upper()}", str(BCRYPT_ROUNDS)))
+
+
+class HashPoolBusy(Exception):
+    """Raised instead of queueing when the pool is full."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"password hashing pool is busy, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class HashPool:
+    """Bounded thread pool for bcrypt, with latency and queue-wait accounting."""
+
+    def __init__(self, workers: int = HASH_WORKERS, queue_max: int = HASH_QUEUE_MAX):
+        self.workers = workers
+        self.queue_max = queue_max
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._lock = threading.Lock()
+        self._pending = 0  # running + waiting
+        self._stats = {
+            op: {"calls": 0, "hash_ms_total": 0.0, "hash_ms_max": 0.0, "cpu_ms_total": 0.0,
+                 "wait_ms_total": 0.0, "wait_ms_max": 0.0}
+            for op in ("hash", "check")
+        }
+        self._stats_rejected = 0
+        self._peak_pending = 0
+
+    def _admit(self):
+        with self._lock:
+            if self._pending >= self.workers + self.queue_max:
+                self._stats_rejected += 1
+                raise HashPoolBusy(self._retry_after())
+            self._pending += 1
+            self._peak_pending = max(self._peak_pending, self._pending)
+
+    def _retry_after(self) -> int:
+        """Seconds until the current backlog should have drained."""
+        calls = sum(s["calls"] for s in self._stats.values())
+        avg_ms = sum(s["hash_ms_total"] for s in self._stats.values()) / calls if calls else 250.0
+        return max(1, math.ceil(self._pending / self.workers * avg_ms / 1000))
+
+    def run(self, op: str, fn, *args):
+        """Run fn(*args) on the pool and wait for its result."""
+        self._admit()
+        submitted = time.perf_counter()
+
+        def job():
+            started = time.perf_counter()
+            cpu_started = time.thread_time()
+            try:
+                return fn(*args)
+            finally:
+                finished = time.perf_counter()
+                self._record(
+                    op,
+                    wait_ms=(started - submitted) * 1000,
+                    hash_ms=(finished - started) * 1000,
+                    cpu_ms=(time.thread_time() - cpu_started) * 1000,
+                )
+
+        try:
+            return self._executor.submit(job).result()
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def _record(self, op: str, wait_ms: float, hash_ms: float, cpu_ms: float):
+        with self._lock:
+            s = self._stats[op]
+            s["calls"] += 1
+            s["hash_ms_total"] += hash_ms
+            s["hash_ms_max"] = max(s["hash_ms_max"], hash_ms)
+            s["cpu_ms_total"] += cpu_ms
+            s["wait_ms_total"] += wait_ms
+            s["wait_ms_max"] = max(s["wait_ms_max"], wait_ms)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            ops = {op: dict(s) for op, s in self._stats.items()}
+            pending, peak, rejected = self._pending, self._peak_pending, self._stats_rejected
+        for s in ops.values():
+            calls = s["calls"] or 1
+            s["hash_ms_avg"] = round(s["hash_ms_total"] / calls, 2)
+            s["wait_ms_avg"] = round(s["wait_ms_total"] / calls, 2)
+            for key in ("hash_ms_total", "hash_ms_max", "cpu_ms_total", "wait_ms_total", "wait_ms_max"):
+                s[key] = round(s[key], 2)
+        return {
+            **ops,
+            "workers": self.workers,
+            "queue_max": self.queue_max,
+            "in_flight": pending,
+            "peak_in_flight": peak,
+            "rejected": rejected,
+            "rounds": {role: rounds_for(role) for role in ROLES},
+        }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_hash_pool() -> HashPool:
+    """The process-wide pool, created on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = HashPool()
+    return _pool
+
+
+def _hashpw(secret: bytes, rounds: int) -> str:
+    return bcrypt.hashpw(secret, bcrypt.gensalt(rounds)).decode("utf-8")
+
+
+def hash_password(secret: str, role: str) -> str:
+    """bcrypt hash of `secret` at `role`'s cost. Raises HashPoolBusy when saturated."""
+    return get_hash_pool().run("hash", _hashpw, secret.encode("utf-8"), rounds_for(role))
+
+
+def check_password(secret: str, stored_hash: str) -> bool:
+    """bcrypt.checkpw on the pool. Raises HashPoolBusy when saturated."""
+    return get_hash_pool().run("check", bcrypt.checkpw, secret.encode("utf-8"), stored_hash.encode("utf-8"))
+
+
+def hashing_stats() -> Dict:
+    """Counters since the worker started, for monitoring."""
+    return get_hash_pool().stats()
+
+
+_secrets: Dict[str, bytes] = {}
+
+
+def load_secret(env_var: str, path: Path) -> bytes:
+    """
+    Server-side key from the environment variable `env_var`, or else from
+    `path`, which is created with a random key on first use. Every process
+    of the app must see the same key.
+    """
+    if env_var not in _secrets:
+        secret = os.getenv(env_var)
+        if not secret:
+            if not path.exists():
+                # Write a temp file and link it into place: when several
+                # processes start at once, exactly one key wins and no one
+                # reads a half-written file.
+                tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+                fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+                with os.fdopen(fd, "w") as f:
+                    f.write(secrets.token_hex(32))
+                try:
+                    os.link(tmp, path)
+                except FileExistsError:
+                    pass
+                finally:
+                    os.unlink(tmp)
+            secret = path.read_text().strip()
+        _secrets[env_var] = secret.encode("utf-8")
+    return _secrets[env_var]
+
+
+def otp_digest(student_id: str, otp: str) -> str:
+    """Value stored in students.otp_hash: HMAC-SHA256 of the code, bound to the student."""
+    mac = hmac.new(load_secret("OTP_SECRET", OTP_SECRET_FILE), f"{student_id}:{otp}".encode("utf-8"), hashlib.sha256)
+    return OTP_HMAC_PREFIX + mac.hexdigest()
+
+
+def check_otp(student_id: str, otp: str, stored_hash: str) -> bool:
+    """
+    Constant-time comparison against otp_digest(); bcrypt OTP hashes made
+    before the switch are still checked (on the pool) until they expire.
+    """
+    if stored_hash.startswith(OTP_HMAC_PREFIX):
+        return hmac.compare_digest(otp_digest(student_id, otp), stored_hash)
+    if stored_hash.startswith("$2"):
+        return check_password(otp, stored_hash)
+    return False
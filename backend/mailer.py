@@ -0,0 +1,364 @@
+"""
+Email Outbox Sender
+
+Delivers the rows queued in email_outbox (see database/migrate_email_outbox.py)
+from a background thread, so handlers only insert a row in their own
+transaction and return.
+
+The sender keeps one SMTP connection open and reuses it for every message
+(reconnecting when the server drops it or it has been idle too long).
+A message that fails with a transient error is retried with exponential
+backoff; permanent (5xx) rejections and messages out of attempts are marked
+'failed'. Once a row is 'sent' or 'failed' its body is cleared, so no OTP
+stays readable in the table. Repeated connection-level failures open a circuit breaker: the
+sender stops trying for MAIL_BREAKER_COOLDOWN_SECONDS, then sends a single
+message to probe the server before resuming full batches.
+
+Rows are claimed with one UPDATE ... RETURNING, so several worker
+processes can share the outbox; a claim left behind by a crashed process
+expires after MAIL_CLAIM_SECONDS and the row is picked up again.
+
+Usage in your app:
+    from mailer import OutboxSender, enqueue_email
+
+    outbox = OutboxSender(lambda: get_db(readonly=False))
+    outbox.start()                               # in a before_request hook: once per serving process
+
+    enqueue_email(cur, to_addr, subject, body)   # inside the handler's transaction
+    con.commit()
+    outbox.wake()                                # starts the thread if needed
+
+Tuning (environment variables):
+    SMTP_HOST                      mail server              (default smtp.gmail.com)
+    SMTP_PORT                      port                     (default 587)
+    SMTP_STARTTLS                  1 to upgrade with STARTTLS (default 1)
+    SMTP_TIMEOUT                   socket timeout, seconds  (default 10)
+    SMTP_IDLE_SECONDS              close an idle connection after (default 60)
+    EMAIL_USER / EMAIL_PASS        login; skipped when unset
+    MAIL_FROM                      From address             (default EMAIL_USER)
+    MAIL_BATCH_SIZE                rows claimed per round   (default 20)
+    MAIL_POLL_SECONDS              idle poll interval       (default 5)
+    MAIL_MAX_ATTEMPTS              attempts before 'failed' (default 8)
+    MAIL_BACKOFF_BASE_SECONDS      first retry delay        (default 5)
+    MAIL_BACKOFF_MAX_SECONDS       longest retry delay      (default 900)
+    MAIL_CLAIM_SECONDS             claim lifetime           (default 300)
+    MAIL_BREAKER_THRESHOLD         failures that open the breaker (default 5)
+    MAIL_BREAKER_COOLDOWN_SECONDS  open breaker wait        (default 60)
+"""
+
+import logging
+import os
+import random
+import smtplib
+import threading
+import time
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from typing import Callable, Dict, Optional
+
+
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "1") == "1"
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "10"))
+SMTP_IDLE_SECONDS = float(os.getenv("SMTP_IDLE_SECONDS", "60"))
+EMAIL_USER = os.getenv("EMAIL_USER")
+EMAIL_PASS = os.getenv("EMAIL_PASS")
+MAIL_FROM = os.getenv("MAIL_FROM") or EMAIL_USER or "noreply@ruet.ac.bd"
+
+MAIL_BATCH_SIZE = int(os.getenv("MAIL_BATCH_SIZE", "20"))
+MAIL_POLL_SECONDS = float(os.getenv("MAIL_POLL_SECONDS", "5"))
+MAIL_MAX_ATTEMPTS = int(os.getenv("MAIL_MAX_ATTEMPTS", "8"))
+MAIL_BACKOFF_BASE_SECONDS = float(os.getenv("MAIL_BACKOFF_BASE_SECONDS", "5"))
+MAIL_BACKOFF_MAX_SECONDS = float(os.getenv("MAIL_BACKOFF_MAX_SECONDS", "900"))
+MAIL_CLAIM_SECONDS = float(os.getenv("MAIL_CLAIM_SECONDS", "300"))
+MAIL_BREAKER_THRESHOLD = int(os.getenv("MAIL_BREAKER_THRESHOLD", "5"))
+MAIL_BREAKER_COOLDOWN_SECONDS = float(os.getenv("MAIL_BREAKER_COOLDOWN_SECONDS", "60"))
+
+log = logging.getLogger(__name__)
+
+
+def _iso(seconds_from_now: float = 0) -> str:
+    """UTC ISO timestamp, the format the rest of the schema uses."""
+    return (datetime.utcnow() + timedelta(seconds=seconds_from_now)).isoformat()
+
+
+def enqueue_email(cur, to_addr: str, subject: str, body: str) -> int:
+    """
+    Queue a message on the caller's cursor; it is sent once the caller
+    commits. Returns the outbox row id.
+    """
+    now = _iso()
+    cur.execute("""
+        INSERT INTO email_outbox (to_addr, subject, body, status, attempts, next_attempt_at, created_at)
+        VALUES (?, ?, ?, 'pending', 0, ?, ?)
+    """, (to_addr, subject, body, now, now))
+    return cur.lastrowid
+
+
+def backoff_seconds(attempts: int) -> float:
+    """Delay before retry number `attempts`: doubling, capped, with jitter."""
+    delay = min(MAIL_BACKOFF_MAX_SECONDS, MAIL_BACKOFF_BASE_SECONDS * 2 ** max(attempts - 1, 0))
+    return delay * random.uniform(0.5, 1.0)
+
+
+class CircuitBreaker:
+    """
+    closed     send normally, counting consecutive connection failures
+    open       send nothing until the cooldown has passed
+    half_open  send one message; success closes, failure re-opens
+    """
+
+    def __init__(self, threshold: int = MAIL_BREAKER_THRESHOLD, cooldown: float = MAIL_BREAKER_COOLDOWN_SECONDS):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opens = 0
+
+    def allowance(self, batch_size: int) -> int:
+        """How many messages may be attempted right now."""
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.cooldown:
+                return 0
+            self.state = "half_open"
+        return 1 if self.state == "half_open" else batch_size
+
+    def retry_after(self) -> float:
+        """Seconds until an open breaker lets a probe through."""
+        if self.state != "open":
+            return 0.0
+        return max(0.0, self.cooldown - (time.monotonic() - self.opened_at))
+
+    def success(self):
+        self.state = "closed"
+        self.failures = 0
+
+    def failure(self):
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.threshold:
+            self.state = "open"
+            self.opened_at = time.monotonic()
+            self.opens += 1
+
+
+class OutboxSender:
+    """Background thread draining email_outbox over a reused SMTP connection."""
+
+    def __init__(self, connect: Callable, batch_size: int = MAIL_BATCH_SIZE):
+        self._connect = connect
+        self.batch_size = batch_size
+        self.breaker = CircuitBreaker()
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._smtp_used_at = 0.0
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._stats = {
+            "sent": 0, "retried": 0, "failed": 0,
+            "connections_opened": 0, "connection_errors": 0, "rounds": 0,
+        }
+
+    # ----- thread control -----
+    def start(self):
+        """Start the sender thread (once per process)."""
+        if self._thread is not None and self._thread.is_alive():
+            return  # fast path: called on every request
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="email-outbox", daemon=True)
+            self._thread.start()
+
+    def wake(self):
+        """Tell the sender new mail was committed (starting it if needed)."""
+        self.start()
+        self._wake.set()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._close_smtp()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                busy = self.run_once() >= self.batch_size
+            except Exception:
+                log.exception("email outbox round failed")
+                busy = False
+
+            if busy:
+                continue
+            wait = MAIL_POLL_SECONDS
+            if self.breaker.state == "open":
+                wait = min(wait, self.breaker.retry_after()) or MAIL_POLL_SECONDS
+            self._wake.wait(wait)
+            self._wake.clear()
+            if time.monotonic() - self._smtp_used_at > SMTP_IDLE_SECONDS:
+                self._close_smtp()
+
+    # ----- one round -----
+    def run_once(self) -> int:
+        """Claim due rows and try to send them. Returns how many were claimed."""
+        allowance = self.breaker.allowance(self.batch_size)
+        if allowance == 0:
+            return 0
+
+        rows = self._claim(allowance)
+        self._stats["rounds"] += 1
+        for n, row in enumerate(rows):
+            if self.breaker.state == "open":
+                # The server went away mid-batch: hand the rest back untouched.
+                self._release(rows[n:])
+                break
+            self._deliver(row)
+        return len(rows)
+
+    def _claim(self, limit: int):
+        now = _iso()
+        con = self._connect()
+        try:
+            rows = con.execute("""
+                UPDATE email_outbox
+                SET status = 'sending', attempts = attempts + 1, next_attempt_at = ?
+                WHERE id IN (
+                    SELECT id FROM email_outbox
+                    WHERE status IN ('pending', 'sending') AND next_attempt_at <= ?
+                    ORDER BY next_attempt_at
+                    LIMIT ?
+                )
+                RETURNING id, to_addr, subject, body, attempts
+            """, (_iso(MAIL_CLAIM_SECONDS), now, limit)).fetchall()
+            con.commit()
+            return [dict(r) for r in rows]
+        finally:
+            con.close()
+
+    def _release(self, rows):
+        retry_at = _iso(self.breaker.retry_after())
+        con = self._connect()
+        try:
+            con.executemany("""
+                UPDATE email_outbox
+                SET status = 'pending', attempts = attempts - 1, next_attempt_at = ?
+                WHERE id = ? AND status = 'sending'
+            """, [(retry_at, r["id"]) for r in rows])
+            con.commit()
+        finally:
+            con.close()
+
+    def _finish(self, row_id: int, status: str, error: Optional[str] = None, retry_in: float = 0):
+        # A row that is done with ('sent' or 'failed') drops its body: OTP
+        # mails carry the plaintext code, which must not outlive delivery.
+        con = self._connect()
+        try:
+            if status == "sent":
+                con.execute("""
+                    UPDATE email_outbox SET status = 'sent', sent_at = ?, last_error = NULL, body = ''
+                    WHERE id = ?
+                """, (_iso(), row_id))
+            else:
+                con.execute("""
+                    UPDATE email_outbox SET status = ?, next_attempt_at = ?, last_error = ?,
+                        body = CASE WHEN ? = 'failed' THEN '' ELSE body END
+                    WHERE id = ?
+                """, (status, _iso(retry_in), (error or "")[:500], status, row_id))
+            con.commit()
+        finally:
+            con.close()
+
+    # ----- SMTP -----
+    def _open_smtp(self) -> smtplib.SMTP:
+        smtp = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
+        try:
+            if SMTP_STARTTLS:
+                smtp.starttls()
+            if EMAIL_USER and EMAIL_PASS:
+                smtp.login(EMAIL_USER, EMAIL_PASS)
+        except Exception:
+            smtp.close()
+            raise
+        self._stats["connections_opened"] += 1
+        return smtp
+
+    def _close_smtp(self):
+        smtp, self._smtp = self._smtp, None
+        if smtp is None:
+            return
+        try:
+            smtp.quit()
+        except Exception:
+            smtp.close()
+
+    def _send(self, msg: EmailMessage):
+        reused = self._smtp is not None
+        if self._smtp is None:
+            self._smtp = self._open_smtp()
+        try:
+            self._smtp.send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            # A kept-alive connection the server has since closed: reconnect once.
+            self._close_smtp()
+            if not reused:
+                raise
+            self._smtp = self._open_smtp()
+            self._smtp.send_message(msg)
+        self._smtp_used_at = time.monotonic()
+
+    def _deliver(self, row: Dict):
+        msg = EmailMessage()
+        msg["Subject"] = row["subject"]
+        msg["From"] = MAIL_FROM
+        msg["To"] = row["to_addr"]
+        msg.set_content(row["body"])
+
+        try:
+            self._send(msg)
+        except (smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError) as e:
+            # The server answered, so it is healthy; only this message is at fault.
+            self.breaker.success()
+            code = getattr(e, "smtp_code", None)
+            if code is None and isinstance(e, smtplib.SMTPRecipientsRefused):
+                code = min(c for c, _ in e.recipients.values())
+            self._failed(row, repr(e), permanent=code is not None and code >= 500)
+            return
+        except (smtplib.SMTPException, OSError) as e:
+            # Connection, TLS, auth or timeout: the server (or our config) is the problem.
+            self._close_smtp()
+            self.breaker.failure()
+            self._stats["connection_errors"] += 1
+            self._failed(row, repr(e), permanent=False)
+            return
+
+        self.breaker.success()
+        self._stats["sent"] += 1
+        self._finish(row["id"], "sent")
+
+    def _failed(self, row: Dict, error: str, permanent: bool):
+        if permanent or row["attempts"] >= MAIL_MAX_ATTEMPTS:
+            self._stats["failed"] += 1
+            self._finish(row["id"], "failed", error)
+            log.warning("email %s to %s failed: %s", row["id"], row["to_addr"], error)
+        else:
+            self._stats["retried"] += 1
+            self._finish(row["id"], "pending", error, retry_in=backoff_seconds(row["attempts"]))
+
+    def stats(self) -> Dict:
+        """Counters since the worker started, for monitoring."""
+        return {
+            **self._stats,
+            "running": self._thread is not None and self._thread.is_alive(),
+            "connected": self._smtp is not None,
+            "breaker": {
+                "state": self.breaker.state,
+                "consecutive_failures": self.breaker.failures,
+                "opens": self.breaker.opens,
+                "retry_after_seconds": round(self.breaker.retry_after(), 1),
+            },
+        }
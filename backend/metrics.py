@@ -0,0 +1,287 @@
+"""
+Request Metrics
+
+Per-endpoint request counters and histograms (latency, response bytes,
+SQL statements) recorded by before/after request hooks, served at
+/metrics in the Prometheus text format.
+
+Recording only touches in-memory dicts under a lock (a few microseconds
+per request, see bench_metrics.py). Each worker process writes a snapshot
+of its own numbers to METRICS_DIR/<pid>.json every METRICS_FLUSH_SECONDS
+(and whenever it serves /metrics), and /metrics adds up the snapshots of
+every process, so any worker answers for the whole server. Like
+prometheus_client's multiprocess mode, clear METRICS_DIR when the server
+is (re)started. Snapshots of workers that have exited keep counting
+towards counters and histograms, but not towards gauges (connections in
+use, queue depths): only workers that are alive and flushed within the
+last METRICS_STALE_SECONDS report those.
+
+Usage in your app:
+    from metrics import init_metrics, register_collector, render_metrics, request_query_counter, reset_metrics
+
+    reset_metrics()                   # once, when the server starts
+    init_metrics(app)                 # before init_compression, to count bytes sent
+    con.set_trace_callback(request_query_counter())   # inside a request
+    register_collector(lambda: {"ruet_x_total": ("counter", "help", 42)})
+
+Tuning (environment variables):
+    METRICS_DIR             snapshot directory       (default <tmp>/ruet_metrics)
+    METRICS_FLUSH_SECONDS   snapshot interval        (default 5)
+    METRICS_STALE_SECONDS   snapshot age after which a worker's gauges
+                            are dropped              (default 3 flush intervals)
+"""
+
+import atexit
+import bisect
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from flask import g, request
+
+
+METRICS_DIR = Path(os.getenv("METRICS_DIR", Path(tempfile.gettempdir()) / "ruet_metrics"))
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+METRICS_STALE_SECONDS = float(os.getenv("METRICS_STALE_SECONDS", str(3 * METRICS_FLUSH_SECONDS)))
+
+# Upper bounds of the histogram buckets (+Inf is implied)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+HISTOGRAMS = {
+    "ruet_http_request_duration_seconds": ("Time spent in the handler, until the response is returned", LATENCY_BUCKETS),
+    "ruet_http_response_size_bytes": ("Response body size as sent (streamed exports without a length are not counted)", BYTES_BUCKETS),
+    "ruet_http_request_db_queries": ("SQL statements run per request, BEGIN/COMMIT included", QUERY_BUCKETS),
+}
+
+_lock = threading.Lock()
+_requests: Dict[tuple, int] = {}        # (endpoint, method, status) -> count
+_histograms: Dict[tuple, list] = {}     # (metric, endpoint, method) -> [bucket counts..., +Inf, sum]
+_collectors: List[Callable[[], Dict]] = []
+_flusher = None
+
+
+class QueryCounter:
+    """sqlite3 trace callback counting the statements run for one request."""
+
+    __slots__ = ("count", "last")
+
+    def __init__(self):
+        self.count = 0
+        self.last = None
+
+    def __call__(self, statement: str):
+        # SQLite reports each trigger step as the statement that fired it;
+        # don't count those again.
+        if statement != self.last:
+            self.last = statement
+            self.count += 1
+
+
+def request_query_counter() -> QueryCounter:
+    """The current request's QueryCounter, for con.set_trace_callback()."""
+    ctx_g = g._get_current_object()
+    counter = ctx_g.get("metrics_queries")
+    if counter is None:
+        counter = ctx_g.metrics_queries = QueryCounter()
+    return counter
+
+
+def register_collector(fn: Callable[[], Dict]):
+    """
+    Add process-level numbers to every snapshot. fn() returns
+    {metric_name: (type, help, value)}; values are summed over processes.
+    """
+    _collectors.append(fn)
+    return fn
+
+
+def _observe(metric: str, endpoint: str, method: str, value: float):
+    buckets = HISTOGRAMS[metric][1]
+    key = (metric, endpoint, method)
+    series = _histograms.get(key)
+    if series is None:
+        series = _histograms[key] = [0] * (len(buckets) + 2)
+    series[bisect.bisect_left(buckets, value)] += 1
+    series[-1] += value
+
+
+def init_metrics(app):
+    """Register the timing hooks and start the snapshot thread."""
+
+    @app.before_request
+    def start_timer():
+        g._get_current_object().metrics_started = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        # resolve the context-local proxies once; each lookup costs ~1.5 us
+        ctx_g, req = g._get_current_object(), request._get_current_object()
+        started = ctx_g.get("metrics_started")
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        endpoint = req.url_rule.rule if req.url_rule else "unmatched"
+        method = req.method
+        size = response.headers.get("Content-Length")
+        if size is not None:
+            size = int(size)
+        elif response.is_sequence:  # never drain a streamed body
+            size = response.calculate_content_length()
+        counter = ctx_g.get("metrics_queries")
+        queries = counter.count if counter else 0
+
+        with _lock:
+            key = (endpoint, method, response.status_code)
+            _requests[key] = _requests.get(key, 0) + 1
+            _observe("ruet_http_request_duration_seconds", endpoint, method, elapsed)
+            _observe("ruet_http_request_db_queries", endpoint, method, queries)
+            if size is not None:
+                _observe("ruet_http_response_size_bytes", endpoint, method, size)
+        return response
+
+    _start_flusher()
+    return app
+
+
+# ----- snapshots -----
+def _snapshot() -> Dict:
+    with _lock:
+        requests = [[*key, count] for key, count in _requests.items()]
+        histograms = [[*key, list(series)] for key, series in _histograms.items()]
+    extra = {}
+    for collect in _collectors:
+        try:
+            extra.update({name: list(v) for name, v in collect().items()})
+        except Exception:
+            pass  # a broken collector must not take /metrics down
+    return {"pid": os.getpid(), "requests": requests, "histograms": histograms, "extra": extra}
+
+
+def flush():
+    """Write this process's snapshot (atomically, via rename)."""
+    METRICS_DIR.mkdir(parents=True, exist_ok=True)
+    path = METRICS_DIR / f"{os.getpid()}.json"
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(_snapshot()))
+    os.replace(tmp, path)
+
+
+def _start_flusher():
+    global _flusher
+    if _flusher is not None:
+        return
+
+    def loop():
+        while True:
+            time.sleep(METRICS_FLUSH_SECONDS)
+            try:
+                flush()
+            except OSError:
+                pass
+
+    _flusher = threading.Thread(target=loop, name="metrics-flush", daemon=True)
+    _flusher.start()
+    atexit.register(flush)
+
+
+def reset_metrics():
+    """Forget the snapshots of earlier server runs; call once at startup."""
+    for path in METRICS_DIR.glob("*.json"):
+        if path.stem != str(os.getpid()):
+            path.unlink(missing_ok=True)
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # exists, owned by someone else
+    return True
+
+
+def _load_snapshots() -> List[Dict]:
+    """Every snapshot, with "live" set when its worker is still reporting."""
+    snapshots = []
+    now = time.time()
+    for path in METRICS_DIR.glob("*.json"):
+        try:
+            snap = json.loads(path.read_text())
+            age = now - path.stat().st_mtime
+        except (OSError, ValueError):
+            continue  # being replaced right now; it is picked up next scrape
+        snap["live"] = snap["pid"] == os.getpid() or (age <= METRICS_STALE_SECONDS and _alive(snap["pid"]))
+        snapshots.append(snap)
+    return snapshots
+
+
+# ----- exposition -----
+def _labels(**labels) -> str:
+    def escape(value):
+        return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_metrics() -> str:
+    """Prometheus text exposition of every process's latest snapshot."""
+    flush()
+    snapshots = _load_snapshots()
+
+    requests: Dict[tuple, int] = {}
+    histograms: Dict[tuple, list] = {}
+    extra: Dict[str, list] = {}
+    for snap in snapshots:
+        for endpoint, method, status, count in snap["requests"]:
+            key = (endpoint, method, status)
+            requests[key] = requests.get(key, 0) + count
+        for metric, endpoint, method, series in snap["histograms"]:
+            key = (metric, endpoint, method)
+            merged = histograms.setdefault(key, [0] * len(series))
+            for i, value in enumerate(series):
+                merged[i] += value
+        for name, (kind, help_text, value) in snap["extra"].items():
+            total = extra.setdefault(name, [kind, help_text, 0])
+            if kind != "gauge" or snap["live"]:  # a gone worker has nothing in use
+                total[2] += value or 0
+
+    lines = [
+        "# HELP ruet_http_requests_total Requests handled, by endpoint, method and status",
+        "# TYPE ruet_http_requests_total counter",
+    ]
+    for (endpoint, method, status), count in sorted(requests.items()):
+        lines.append(f"ruet_http_requests_total{_labels(endpoint=endpoint, method=method, status=status)} {count}")
+
+    for metric, (help_text, buckets) in HISTOGRAMS.items():
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} histogram")
+        for (name, endpoint, method), series in sorted(histograms.items()):
+            if name != metric:
+                continue
+            cumulative = 0
+            for bound, count in zip((*buckets, "+Inf"), series[:-1]):
+                cumulative += count
+                le = bound if bound == "+Inf" else _number(bound)
+                lines.append(f"{metric}_bucket{_labels(endpoint=endpoint, method=method, le=le)} {cumulative}")
+            lines.append(f"{metric}_sum{_labels(endpoint=endpoint, method=method)} {_number(series[-1])}")
+            lines.append(f"{metric}_count{_labels(endpoint=endpoint, method=method)} {cumulative}")
+
+    for name, (kind, help_text, value) in sorted(extra.items()):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.append(f"{name} {_number(value)}")
+
+    lines.append("# HELP ruet_metrics_processes Worker processes reporting now (alive, recent snapshot)")
+    lines.append("# TYPE ruet_metrics_processes gauge")
+    lines.append(f"ruet_metrics_processes {sum(1 for snap in snapshots if snap['live'])}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,96 @@
+"""
+Signed Session Tokens
+
+Stateless bearer tokens issued by /api/auth/login. A token carries who the
+caller is (role, principal id) and the hall / department they manage, plus
+an expiry, and is signed with HMAC-SHA256 under a server secret. Checking
+one is a base64 decode, one HMAC and a JSON parse: no database read.
+
+    v1.<base64url(JSON claims)>.<base64url(HMAC-SHA256("v1." + claims))>
+
+Claims:
+    role        'student', 'librarian', 'hall_manager', 'department_officer'
+    sub         students.id for students, the login email otherwise
+    hall_id, hall_name                  hall managers
+    dept_id, dept_code, dept_name       department officers
+    iat, exp    issued-at / expiry, Unix seconds
+
+Usage in your app:
+    from session_tokens import InvalidToken, issue_token, verify_token
+
+    token = issue_token("hall_manager", email, hall_id=3, hall_name="...")
+    claims = verify_token(token)      # raises InvalidToken
+
+Tuning (environment variables):
+    SESSION_SECRET        signing key; shared by every process. When unset,
+                          a random key is created once in SESSION_SECRET_FILE
+                          (default database/session_secret.key)
+    SESSION_TTL_SECONDS   token lifetime                 (default 43200, 12 h)
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict
+
+from hashing import load_secret
+
+
+SESSION_SECRET_FILE = Path(os.getenv(
+    "SESSION_SECRET_FILE", Path(__file__).resolve().parent.parent / "database" / "session_secret.key"
+))
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", str(12 * 3600)))
+
+TOKEN_VERSION = "v1"
+
+
+class InvalidToken(Exception):
+    """Malformed, tampered with or expired token."""
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _sign(signing_input: str) -> bytes:
+    key = load_secret("SESSION_SECRET", SESSION_SECRET_FILE)
+    return hmac.new(key, signing_input.encode("ascii"), hashlib.sha256).digest()
+
+
+def issue_token(role: str, sub: str, ttl: int = SESSION_TTL_SECONDS, **claims) -> str:
+    """Signed token for `role` / `sub` plus any extra claims (hall_id, dept_id, ...)."""
+    now = int(time.time())
+    payload = {"role": role, "sub": sub, **claims, "iat": now, "exp": now + ttl}
+    body = _b64encode(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+    signing_input = f"{TOKEN_VERSION}.{body}"
+    return f"{signing_input}.{_b64encode(_sign(signing_input))}"
+
+
+def verify_token(token: str) -> Dict:
+    """The token's claims, if its signature is valid and it has not expired."""
+    try:
+        version, body, signature = token.split(".")
+    except ValueError:
+        raise InvalidToken("malformed token")
+    if version != TOKEN_VERSION:
+        raise InvalidToken("unsupported token version")
+
+    try:
+        valid = hmac.compare_digest(_sign(f"{version}.{body}"), _b64decode(signature))
+    except (ValueError, UnicodeEncodeError):
+        valid = False
+    if not valid:
+        raise InvalidToken("bad signature")
+
+    claims = json.loads(_b64decode(body))
+    if claims.get("exp", 0) < time.time():
+        raise InvalidToken("token expired")
+    return claims
@@ -0,0 +1,291 @@
+"""
+SQL Profiler
+
+Opt-in profiling of the connections get_db() leases during a request.
+When enabled, each lease is wrapped so that every execute() /
+executemany(), plus the fetches that read its rows, is timed per
+statement. At the end of the request:
+
+    - a statement slower than slow_ms is logged with its EXPLAIN QUERY PLAN
+    - SQL text run repeat_threshold+ times in one request (same statement,
+      different parameters) is logged as a likely N+1 query loop
+    - a request that ran more than max_statements statements is logged
+      with its statement count and SQL time
+
+The statement count is the request's sqlite3 trace callback count (the
+one /metrics reports), so statements run by triggers and implicit
+BEGIN/COMMIT are included. Recent findings go to the "sql_profiler"
+logger and to /api/debug/sql-profiler, which also changes the settings
+at runtime (for an admin token or a loopback client only). Settings are
+per worker process. While disabled, get_db()
+returns the plain lease and nothing is timed.
+
+Usage in your app:
+    from sql_profiler import ProfiledConnection, finish_request_profile, profiler_settings, request_profile
+
+    if profiler_settings["enabled"]:
+        con = ProfiledConnection(con, request_profile())
+    ...
+    finish_request_profile()          # in teardown, after closing leases
+
+Tuning (environment variables, the defaults for configure_profiler()):
+    SQL_PROFILE                   start enabled                 (default 0)
+    SQL_PROFILE_SLOW_MS           slow statement threshold      (default 50)
+    SQL_PROFILE_REPEAT_THRESHOLD  repeats flagged as N+1        (default 10)
+    SQL_PROFILE_MAX_STATEMENTS    statements per request        (default 100)
+    SQL_PROFILE_EXPLAIN           EXPLAIN slow statements       (default 1)
+    SQL_PROFILE_HISTORY           findings kept for the API     (default 100)
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from flask import g, request
+
+
+SQL_PROFILE_HISTORY = int(os.getenv("SQL_PROFILE_HISTORY", "100"))
+
+profiler_settings = {
+    "enabled": os.getenv("SQL_PROFILE", "0") == "1",
+    "slow_ms": float(os.getenv("SQL_PROFILE_SLOW_MS", "50")),
+    "repeat_threshold": int(os.getenv("SQL_PROFILE_REPEAT_THRESHOLD", "10")),
+    "max_statements": int(os.getenv("SQL_PROFILE_MAX_STATEMENTS", "100")),
+    "explain": os.getenv("SQL_PROFILE_EXPLAIN", "1") == "1",
+}
+
+log = logging.getLogger("sql_profiler")
+
+_lock = threading.Lock()
+_findings = deque(maxlen=SQL_PROFILE_HISTORY)
+_stats = {"requests": 0, "statements": 0, "sql_ms": 0.0, "slow": 0, "n_plus_one": 0, "many_statements": 0}
+
+
+def configure_profiler(**changes) -> Dict:
+    """Change settings at runtime; raises ValueError for unknown keys or bad values."""
+    unknown = set(changes) - set(profiler_settings)
+    if unknown:
+        raise ValueError(f"unknown setting(s): {', '.join(sorted(unknown))}")
+    parsed = {}
+    for key, value in changes.items():
+        kind = type(profiler_settings[key])
+        if kind is bool:
+            if not isinstance(value, bool):
+                raise ValueError(f"{key} must be true or false")
+            parsed[key] = value
+        else:
+            try:
+                parsed[key] = kind(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"{key} must be a number")
+            if parsed[key] < 0:
+                raise ValueError(f"{key} must not be negative")
+    profiler_settings.update(parsed)
+    return dict(profiler_settings)
+
+
+def _one_line(sql: str, limit: int = 300) -> str:
+    text = " ".join(sql.split())
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+def explain(con, sql: str, params) -> List[str]:
+    """EXPLAIN QUERY PLAN rows for a statement, indented by depth."""
+    try:
+        rows = con.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+    except (sqlite3.Error, ValueError) as e:
+        return [f"(no plan: {e})"]
+    depth = {0: 0}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, 0) + 1
+        lines.append("  " * (depth[node_id] - 1) + detail)
+    return lines
+
+
+class RequestProfile:
+    """Timings of the statements one request ran."""
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.calls = 0
+        self.sql_ms = 0.0
+        self.by_sql: Dict[str, list] = {}   # sql -> [runs, ms]
+        self.slow: List[Dict] = []
+
+    def record(self, con, sql: str, params, seconds: float):
+        ms = seconds * 1000
+        self.calls += 1
+        self.sql_ms += ms
+        entry = self.by_sql.get(sql)
+        if entry is None:
+            entry = self.by_sql[sql] = [0, 0.0]
+        entry[0] += 1
+        entry[1] += ms
+
+        if ms >= profiler_settings["slow_ms"]:
+            finding = {"kind": "slow", "ms": round(ms, 2), "sql": _one_line(sql)}
+            if profiler_settings["explain"] and params is not None:
+                finding["plan"] = explain(con, sql, params)
+            self.slow.append(finding)
+
+    def finish(self, statements: Optional[int]):
+        """Log and keep this request's findings."""
+        statements = self.calls if statements is None else statements
+        found = list(self.slow)
+        for sql, (runs, ms) in self.by_sql.items():
+            if runs >= profiler_settings["repeat_threshold"]:
+                found.append({"kind": "n_plus_one", "runs": runs, "ms": round(ms, 2), "sql": _one_line(sql)})
+        if statements > profiler_settings["max_statements"]:
+            found.append({"kind": "many_statements", "statements": statements, "ms": round(self.sql_ms, 2)})
+
+        for finding in found:
+            if finding["kind"] == "slow":
+                plan = "".join(f"\n    {line}" for line in finding.get("plan", []))
+                log.warning("slow query in %s: %.1f ms: %s%s", self.endpoint, finding["ms"], finding["sql"], plan)
+            elif finding["kind"] == "n_plus_one":
+                log.warning("likely N+1 in %s: %d runs, %.1f ms: %s",
+                            self.endpoint, finding["runs"], finding["ms"], finding["sql"])
+            else:
+                log.warning("%s ran %d statements (%.1f ms of SQL)", self.endpoint, statements, self.sql_ms)
+
+        at = datetime.utcnow().isoformat(timespec="seconds")
+        with _lock:
+            _stats["requests"] += 1
+            _stats["statements"] += statements
+            _stats["sql_ms"] += self.sql_ms
+            for finding in found:
+                _stats[finding["kind"]] += 1
+                _findings.append({"at": at, "endpoint": self.endpoint, **finding})
+
+
+class ProfiledCursor:
+    """
+    sqlite3.Cursor wrapper timing each statement, from execute() through
+    the fetches that read its rows, until the next execute() or close().
+    """
+
+    def __init__(self, cursor, profile: RequestProfile, con):
+        self._cursor = cursor
+        self._profile = profile
+        self._con = con
+        self._current = None     # [sql, params, seconds]
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def _timed(self, method, *args):
+        started = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            if self._current is not None:
+                self._current[2] += time.perf_counter() - started
+
+    def execute(self, sql, params=()):
+        self.finish()
+        self._current = [sql, params, 0.0]
+        self._timed(self._cursor.execute, sql, params)
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        self.finish()
+        self._current = [sql, None, 0.0]  # one batch; not EXPLAINed
+        self._timed(self._cursor.executemany, sql, seq_of_params)
+        return self
+
+    def fetchone(self):
+        return self._timed(self._cursor.fetchone)
+
+    def fetchmany(self, size=None):
+        return self._timed(self._cursor.fetchmany, size or self._cursor.arraysize)
+
+    def fetchall(self):
+        return self._timed(self._cursor.fetchall)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self._timed(self._cursor.__next__)
+
+    def finish(self):
+        """Hand the current statement's timing to the request profile."""
+        if self._current is not None:
+            sql, params, seconds = self._current
+            self._current = None
+            self._profile.record(self._con, sql, params, seconds)
+
+    def close(self):
+        self.finish()
+        self._cursor.close()
+
+
+class ProfiledConnection:
+    """A pooled lease whose cursors are ProfiledCursors; close() still returns it to the pool."""
+
+    def __init__(self, con, profile: RequestProfile):
+        self._con = con
+        self._profile = profile
+        self._cursors: List[ProfiledCursor] = []
+
+    def __getattr__(self, name):
+        return getattr(self._con, name)
+
+    @property
+    def row_factory(self):
+        return self._con.row_factory
+
+    @row_factory.setter
+    def row_factory(self, value):
+        self._con.row_factory = value
+
+    def cursor(self):
+        cur = ProfiledCursor(self._con.cursor(), self._profile, self._con)
+        self._cursors.append(cur)
+        return cur
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self.cursor().executemany(sql, seq_of_params)
+
+    def close(self):
+        # time and EXPLAIN what is still open while the connection is ours
+        for cur in self._cursors:
+            cur.finish()
+        self._cursors.clear()
+        self._con.close()
+
+
+def request_profile() -> RequestProfile:
+    """The current request's profile, created on first use."""
+    ctx_g = g._get_current_object()
+    profile = ctx_g.get("sql_profile")
+    if profile is None:
+        endpoint = request.url_rule.rule if request.url_rule else request.path
+        profile = ctx_g.sql_profile = RequestProfile(f"{request.method} {endpoint}")
+    return profile
+
+
+def finish_request_profile():
+    """Report the current request's profile, if it was profiled."""
+    profile = g.pop("sql_profile", None)
+    if profile is not None:
+        counter = g.get("metrics_queries")
+        profile.finish(counter.count if counter else None)
+
+
+def profiler_stats() -> Dict:
+    """Settings, counters since the worker started and the latest findings."""
+    with _lock:
+        stats = dict(_stats)
+        findings = list(_findings)
+    stats["sql_ms"] = round(stats["sql_ms"], 2)
+    return {"settings": dict(profiler_settings), **stats, "recent": findings[::-1]}
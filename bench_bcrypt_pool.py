@@ -0,0 +1,116 @@
+"""
+Benchmark: login burst through the bounded bcrypt pool.
+
+Fires --logins concurrent POST /api/auth/login requests at a scratch copy
+of database/ruet.db while another thread keeps calling a cheap endpoint,
+and reports how many logins were served or shed with 503 + Retry-After,
+the cheap endpoint's latency during the burst, and the pool's hash-latency
+and queue-wait counters. Then times one hash at a few bcrypt costs, to
+help pick BCRYPT_ROUNDS_<ROLE>.
+
+Usage:
+    HASH_WORKERS=2 HASH_QUEUE_MAX=8 python bench_bcrypt_pool.py [--logins 40]
+"""
+
+import argparse
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import bcrypt
+
+BASE_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BASE_DIR / "backend"))
+sys.path.insert(0, str(BASE_DIR))
+
+import app as app_module  # noqa: E402
+import hashing  # noqa: E402
+from database import accounts_manager  # noqa: E402
+
+STUDENT_ID = "2103990"
+EMAIL = f"{STUDENT_ID}@student.ruet.ac.bd"
+PASSWORD = "bench-password"
+
+
+def add_student(db_path: Path):
+    con = sqlite3.connect(db_path)
+    con.execute(
+        "INSERT INTO students (id, name, email, password_hash, verified, dept) VALUES (?, 'Bench Login', ?, ?, 1, 'CSE')",
+        (STUDENT_ID, EMAIL, bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(hashing.rounds_for("student"))).decode()),
+    )
+    con.commit()
+    con.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=40)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "bench.db"
+        shutil.copy(BASE_DIR / "database" / "ruet.db", db_path)
+        add_student(db_path)
+        app_module.DB_PATH = db_path
+        accounts_manager.DB_PATH = db_path
+        app = app_module.app
+
+        statuses = []
+        retry_after = []
+        cheap_ms = []
+        done = threading.Event()
+
+        def login():
+            res = app.test_client().post("/api/auth/login", json={"email": EMAIL, "password": PASSWORD})
+            statuses.append(res.status_code)
+            if res.status_code == 503:
+                retry_after.append(int(res.headers["Retry-After"]))
+
+        def cheap():
+            client = app.test_client()
+            while not done.is_set():
+                started = time.perf_counter()
+                client.get("/api/debug/db-pool")
+                cheap_ms.append((time.perf_counter() - started) * 1000)
+                time.sleep(0.01)
+
+        watcher = threading.Thread(target=cheap)
+        watcher.start()
+        started = time.perf_counter()
+        threads = [threading.Thread(target=login) for _ in range(args.logins)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+        done.set()
+        watcher.join()
+
+        stats = hashing.hashing_stats()
+        print(f"pool: {stats['workers']} workers, queue {stats['queue_max']}, "
+              f"student cost {stats['rounds']['student']}")
+        print(f"{args.logins} concurrent logins in {elapsed:.2f}s: "
+              f"{statuses.count(200)} ok, {statuses.count(503)} shed (503)"
+              + (f", Retry-After {min(retry_after)}-{max(retry_after)}s" if retry_after else ""))
+        print(f"cheap endpoint during burst: median {statistics.median(cheap_ms):.1f} ms, "
+              f"max {max(cheap_ms):.1f} ms over {len(cheap_ms)} calls")
+        check = stats["check"]
+        print(f"checkpw: avg {check['hash_ms_avg']} ms (cpu {check['cpu_ms_total'] / max(check['calls'], 1):.1f} ms), "
+              f"queue wait avg {check['wait_ms_avg']} ms, max {check['wait_ms_max']} ms, "
+              f"peak in flight {stats['peak_in_flight']}")
+
+        print(f"\n{'cost':>4} | {'hash ms':>8}")
+        print("-" * 15)
+        for rounds in (10, 11, 12, 13):
+            started = time.perf_counter()
+            bcrypt.hashpw(b"x", bcrypt.gensalt(rounds))
+            print(f"{rounds:>4} | {(time.perf_counter() - started) * 1000:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
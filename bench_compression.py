@@ -0,0 +1,127 @@
+"""
+Benchmark: bytes saved and CPU cost of response compression per endpoint.
+
+Builds a synthetic hall (1,500 allocated students, 12 months of dues) and
+department fees in a scratch copy of database/ruet.db, then requests the big
+list endpoints through Flask's test client with Accept-Encoding identity,
+gzip and (if the brotli package is installed) br. CPU time is the
+compressor's own process time, taken from compression_stats().
+
+Usage:
+    python bench_compression.py [--students 1500] [--months 12]
+"""
+
+import argparse
+import shutil
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BASE_DIR / "backend"))
+sys.path.insert(0, str(BASE_DIR))
+
+import app as app_module  # noqa: E402
+import compression  # noqa: E402
+from database import accounts_manager  # noqa: E402
+
+HALL_NAME = "Bench Compression Hall"
+RUNS = 5
+
+
+def build_data(db_path: Path, students: int, months: int):
+    con = sqlite3.connect(db_path)
+    cur = con.cursor()
+    cur.execute(
+        "INSERT INTO halls (email, hall_name, password_hash) VALUES ('bench.compress@hall.ruet.ac.bd', ?, 'x')",
+        (HALL_NAME,),
+    )
+    hall_id = cur.lastrowid
+    dept_id = cur.execute("SELECT id FROM departments WHERE dept_name = 'CSE'").fetchone()[0]
+
+    for n in range(students // 4 + 1):
+        cur.execute(
+            "INSERT INTO rooms (hall_id, room_number, capacity, occupied_seats) VALUES (?, ?, 4, 0)",
+            (hall_id, str(n + 1)),
+        )
+        room_id = cur.lastrowid
+        for seat in range(4):
+            k = n * 4 + seat
+            if k >= students:
+                break
+            sid = f"7{k:07d}"
+            cur.execute("INSERT INTO students (id, name, dept, verified) VALUES (?, ?, 'CSE', 1)",
+                        (sid, f"Bench Student {k}"))
+            cur.execute(
+                "INSERT INTO room_allocations (hall_id, room_id, student_id, allocation_date, allocation_type) "
+                "VALUES (?, ?, ?, '2026-01-01T00:00:00', 'shared4')",
+                (hall_id, room_id, sid),
+            )
+            cur.execute("UPDATE rooms SET occupied_seats = occupied_seats + 1 WHERE id = ?", (room_id,))
+            cur.executemany(
+                "INSERT INTO hall_dues (hall_id, student_id, month, amount, status) VALUES (?, ?, ?, 1200, ?)",
+                [(hall_id, sid, f"2025-{m + 1:02d}", "paid" if (k + m) % 3 else "unpaid") for m in range(months)],
+            )
+            cur.execute(
+                "INSERT INTO department_dues (dept_id, student_id, fee_id, amount, status, due_type, deadline) "
+                "VALUES (?, ?, 'DF-BENCH', 500, 'unpaid', 'Exam Fee', '2026-06-30')",
+                (dept_id, sid),
+            )
+    con.commit()
+    con.close()
+
+
+def measure(client, method, url, body, encoding):
+    before = compression.compression_stats()
+    sizes = []
+    for _ in range(RUNS):
+        if method == "POST":
+            res = client.post(url, json=body, headers={"Accept-Encoding": encoding})
+        else:
+            res = client.get(url, headers={"Accept-Encoding": encoding})
+        assert res.status_code == 200, (url, res.status_code)
+        sizes.append(len(res.data))
+    after = compression.compression_stats()
+    return sizes[-1], (after["cpu_ms"] - before["cpu_ms"]) / RUNS
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--students", type=int, default=1500)
+    parser.add_argument("--months", type=int, default=12)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "bench.db"
+        shutil.copy(BASE_DIR / "database" / "ruet.db", db_path)
+        build_data(db_path, args.students, args.months)
+
+        app_module.DB_PATH = db_path
+        accounts_manager.DB_PATH = db_path
+        client = app_module.app.test_client()
+
+        endpoints = [
+            ("GET", f"/api/hall/dues?hall_name={HALL_NAME}", None),
+            ("GET", f"/api/hall/allocations?hall_name={HALL_NAME}", None),
+            ("GET", f"/api/hall/dues/search?hall_name={HALL_NAME}&month=2025-01", None),
+            ("GET", "/api/debug/hall-status", None),
+            ("POST", "/api/dept/render", {"deptName": "CSE", "feeLimit": 1000}),
+        ]
+        encodings = ["gzip"] + (["br"] if compression.brotli is not None else [])
+
+        print(f"brotli available: {compression.brotli is not None}   "
+              f"gzip level {compression.COMPRESS_LEVEL}, br quality {compression.COMPRESS_BR_QUALITY}")
+        print(f"{'endpoint':<44} | {'enc':>4} | {'raw B':>9} | {'sent B':>9} | {'saved':>6} | {'cpu ms':>7}")
+        print("-" * 93)
+        for method, url, body in endpoints:
+            raw, _ = measure(client, method, url, body, "identity")
+            label = url.split("?")[0]
+            for encoding in encodings:
+                sent, cpu_ms = measure(client, method, url, body, encoding)
+                saved = 100 * (1 - sent / raw) if raw else 0
+                print(f"{label:<44} | {encoding:>4} | {raw:>9,} | {sent:>9,} | {saved:>5.1f}% | {cpu_ms:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark: POST /api/deptfee with mode="ids" by number of pasted IDs.
+
+Adds synthetic CSE students to a scratch copy of database/ruet.db and assigns
+a fee to 1,000 / 5,000 / 20,000 / 50,000 of them through Flask's test client,
+reporting total time and time per 1,000 IDs. The old handler (one IN (...)
+placeholder per ID, then one INSERT per ID) is replayed on the same data for
+comparison; it fails outright on builds where the ID count passes
+SQLITE_MAX_VARIABLE_NUMBER (32,766 by default).
+
+Usage:
+    python bench_dept_fee_ids.py
+"""
+
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BASE_DIR / "backend"))
+sys.path.insert(0, str(BASE_DIR))
+
+import app as app_module  # noqa: E402
+from database import accounts_manager  # noqa: E402
+
+SIZES = [1000, 5000, 20000, 50000]
+DEPT_NAME = "CSE"
+
+
+def add_students(db_path: Path, count: int):
+    con = sqlite3.connect(db_path)
+    con.executemany(
+        "INSERT INTO students (id, name, dept, verified) VALUES (?, ?, ?, 1)",
+        [(f"8{n:07d}", f"Student {n}", DEPT_NAME) for n in range(count)],
+    )
+    con.commit()
+    con.close()
+    return [f"8{n:07d}" for n in range(count)]
+
+
+def legacy_assign(db_path: Path, dept_id, student_ids, fee_id):
+    """The pre-refactor handler body (with students.id as the key column)."""
+    con = sqlite3.connect(db_path)
+    cur = con.cursor()
+    placeholders = ",".join("?" for _ in student_ids)
+    cur.execute(f"SELECT id FROM students WHERE dept = ? AND id IN ({placeholders})",
+                [DEPT_NAME] + student_ids)
+    cur.fetchall()
+    for s_id in student_ids:
+        cur.execute("""
+            INSERT INTO department_dues (dept_id, student_id, fee_id, amount, status, created_at, due_type, deadline)
+            VALUES (?, ?, ?, 100, 'unpaid', CURRENT_TIMESTAMP, 'Other', NULL)
+        """, (dept_id, s_id, fee_id))
+    con.commit()
+    con.close()
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "bench.db"
+        shutil.copy(BASE_DIR / "database" / "ruet.db", db_path)
+        student_ids = add_students(db_path, max(SIZES))
+
+        app_module.DB_PATH = db_path
+        accounts_manager.DB_PATH = db_path
+        client = app_module.app.test_client()
+        dept_id = app_module.department_directory.by_name(DEPT_NAME)["id"]
+
+        print(f"{'IDs':>7} | {'endpoint ms':>11} | {'ms / 1k':>8} | {'legacy ms':>10} | {'ms / 1k':>8}")
+        print("-" * 58)
+        for size in SIZES:
+            ids = student_ids[:size]
+
+            started = time.perf_counter()
+            res = client.post("/api/deptfee", json={
+                "deptName": DEPT_NAME, "mode": "ids", "amount": 100,
+                "type": "Other", "fee_id": f"BENCH-{size}", "ids": ids,
+            })
+            endpoint_ms = (time.perf_counter() - started) * 1000
+            assert res.status_code == 200 and res.get_json()["created_count"] == size, res.get_json()
+
+            try:
+                started = time.perf_counter()
+                legacy_assign(db_path, dept_id, ids, f"LEGACY-{size}")
+                legacy_ms = (time.perf_counter() - started) * 1000
+                legacy = f"{legacy_ms:>10.1f} | {legacy_ms / size * 1000:>8.2f}"
+            except sqlite3.OperationalError as e:
+                legacy = f"{'failed':>10} | {str(e)[:20]}"
+
+            print(f"{size:>7} | {endpoint_ms:>11.1f} | {endpoint_ms / size * 1000:>8.2f} | {legacy}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark: per-request cost of the metrics hooks (backend/metrics.py).
+
+Times the before_request / after_request pair on its own, inside a pushed
+request context with a ready JSON response, plus the sqlite3 trace
+callback per statement. Then serves a trivial route through Flask's test
+client with and without init_metrics() to show the same cost end to end.
+
+Usage:
+    python bench_metrics.py [--requests 20000]
+"""
+
+import argparse
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BASE_DIR / "backend"))
+
+from flask import Flask, jsonify  # noqa: E402
+
+import metrics  # noqa: E402
+
+metrics.METRICS_DIR = Path(tempfile.mkdtemp(prefix="bench_metrics_"))
+
+
+def make_app(with_metrics: bool) -> Flask:
+    app = Flask(__name__)
+    if with_metrics:
+        metrics.init_metrics(app)
+
+    @app.route("/api/ping/<int:n>")
+    def ping(n):
+        return jsonify({"n": n})
+
+    return app
+
+
+def per_call_us(fn, runs: int) -> float:
+    started = time.perf_counter()
+    for _ in range(runs):
+        fn()
+    return (time.perf_counter() - started) * 1e6 / runs
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+    runs = args.requests
+
+    app = make_app(with_metrics=True)
+    before = app.before_request_funcs[None][0]
+    after = app.after_request_funcs[None][0]
+    with app.test_request_context("/api/ping/7"):
+        app.preprocess_request()  # match url_rule like a real request
+        response = jsonify({"n": 7})
+
+        def hooks():
+            before()
+            after(response)
+
+        hooks_us = per_call_us(hooks, runs)
+
+        con = sqlite3.connect(":memory:")
+        con.set_trace_callback(metrics.request_query_counter())
+        traced_us = per_call_us(lambda: con.execute("SELECT 1"), runs)
+        con.set_trace_callback(None)
+        plain_us = per_call_us(lambda: con.execute("SELECT 1"), runs)
+
+    print(f"before + after hooks          : {hooks_us:6.2f} us/request")
+    print(f"trace callback                : {traced_us - plain_us:6.2f} us/statement")
+
+    timings = {}
+    for label, with_metrics in (("without", False), ("with", True)):
+        client = make_app(with_metrics).test_client()
+        for n in range(1000):  # warm up
+            client.get(f"/api/ping/{n}")
+        timings[label] = per_call_us(lambda: client.get("/api/ping/7"), runs)
+        print(f"test client, {label:<7} metrics : {timings[label]:6.1f} us/request")
+    print(f"difference                    : {timings['with'] - timings['without']:6.2f} us/request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Benchmark: read latency under a concurrent write storm.
+
+Compares the old access pattern (new connection per call, rollback journal)
+against the pooled read-only lane + serialized writer from database/db_pool.py.
+Runs against a scratch copy of database/ruet.db, so the real file is untouched.
+
+Usage:
+    python bench_read_lane.py [--readers 8] [--writers 4] [--seconds 5]
+"""
+
+import argparse
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BASE_DIR))
+
+from database.db_pool import ConnectionPool  # noqa: E402
+
+READ_SQL = """
+    SELECT hd.id, hd.month, hd.amount, hd.status, hd.paid_date, h.hall_name
+    FROM hall_dues hd
+    LEFT JOIN halls h ON hd.hall_id = h.id
+    WHERE hd.student_id = ?
+    ORDER BY hd.month DESC
+"""
+
+
+def prepare_db(path: Path):
+    shutil.copy(BASE_DIR / "database" / "ruet.db", path)
+    con = sqlite3.connect(path)
+    con.execute("PRAGMA journal_mode=DELETE")
+    student_id = con.execute("SELECT id FROM students LIMIT 1").fetchone()[0]
+    hall_id = con.execute("SELECT id FROM halls LIMIT 1").fetchone()[0]
+    con.close()
+    return student_id, hall_id
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    k = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[k]
+
+
+def run(label, open_reader, open_writer, student_id, hall_id, readers, writers, seconds):
+    stop = threading.Event()
+    latencies = []
+    lat_lock = threading.Lock()
+    errors = []
+    writes = [0]
+
+    def reader():
+        local = []
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                con = open_reader()
+                con.execute(READ_SQL, (student_id,)).fetchall()
+                con.close()
+            except sqlite3.Error as e:
+                errors.append(str(e))
+                continue
+            local.append((time.perf_counter() - started) * 1000)
+        with lat_lock:
+            latencies.extend(local)
+
+    def writer(n):
+        i = 0
+        while not stop.is_set():
+            i += 1
+            try:
+                con = open_writer()
+                rows = [(hall_id, student_id, f"W{n:02d}-{i:06d}-{k:03d}", 500) for k in range(50)]
+                con.executemany(
+                    "INSERT INTO hall_dues (hall_id, student_id, month, amount, status) VALUES (?, ?, ?, ?, 'unpaid')",
+                    rows,
+                )
+                con.execute("UPDATE students SET hall_fee = hall_fee WHERE id = ?", (student_id,))
+                con.commit()
+                con.execute("DELETE FROM hall_dues WHERE month LIKE ?", (f"W{n:02d}-%",))
+                con.commit()
+                con.close()
+                writes[0] += 1
+            except sqlite3.Error as e:
+                errors.append(str(e))
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    threads += [threading.Thread(target=writer, args=(n,)) for n in range(writers)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    print(f"\n{label}")
+    print("-" * 60)
+    print(f"  reads:        {len(latencies)}")
+    print(f"  write txns:   {writes[0]}")
+    print(f"  errors:       {len(errors)}" + (f"  (e.g. {errors[0]})" if errors else ""))
+    if latencies:
+        print(f"  read p50:     {statistics.median(latencies):8.3f} ms")
+        print(f"  read p95:     {percentile(latencies, 95):8.3f} ms")
+        print(f"  read p99:     {percentile(latencies, 99):8.3f} ms")
+        print(f"  read max:     {max(latencies):8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        before_db = Path(tmp) / "before.db"
+        student_id, hall_id = prepare_db(before_db)
+
+        def connect_per_call():
+            con = sqlite3.connect(before_db)
+            con.row_factory = sqlite3.Row
+            return con
+
+        run("BEFORE: connection per call, rollback journal",
+            connect_per_call, connect_per_call, student_id, hall_id,
+            args.readers, args.writers, args.seconds)
+
+        after_db = Path(tmp) / "after.db"
+        prepare_db(after_db)
+        pool = ConnectionPool(after_db)
+
+        run("AFTER: pooled read-only lane + serialized writer (WAL)",
+            lambda: pool.connection(readonly=True), pool.connection,
+            student_id, hall_id, args.readers, args.writers, args.seconds)
+
+        print("\nPool stats:", pool.stats())
+        pool.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Benchmark: SQL statements and latency of GET /api/hall/rooms by hall size.
+
+Builds synthetic halls (10, 100 and 1,000 rooms, up to 4 occupants each) in a
+scratch copy of database/ruet.db and calls the real endpoint through Flask's
+test client, counting every statement it sends to SQLite. The old per-room
+(N+1) query pattern is replayed on the same data for comparison.
+
+Usage:
+    python bench_rooms_query_count.py
+"""
+
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BASE_DIR / "backend"))
+sys.path.insert(0, str(BASE_DIR))
+
+import app as app_module  # noqa: E402
+from database import accounts_manager  # noqa: E402
+
+SIZES = [10, 100, 1000]
+
+
+def build_hall(db_path: Path, hall_name: str, rooms: int):
+    con = sqlite3.connect(db_path)
+    cur = con.cursor()
+    cur.execute(
+        "INSERT INTO halls (email, hall_name, password_hash) VALUES (?, ?, 'x')",
+        (f"bench{rooms}@hall.ruet.ac.bd", hall_name),
+    )
+    hall_id = cur.lastrowid
+    for n in range(1, rooms + 1):
+        capacity = 1 if n % 5 == 0 else 4
+        cur.execute(
+            "INSERT INTO rooms (hall_id, room_number, capacity, occupied_seats) VALUES (?, ?, ?, 0)",
+            (hall_id, str(n), capacity),
+        )
+        room_id = cur.lastrowid
+        for seat in range(capacity if n % 3 else capacity - 1):
+            sid = f"9{rooms:04d}{n:04d}{seat}"
+            cur.execute("INSERT INTO students (id, name, dept, verified) VALUES (?, ?, 'CSE', 1)", (sid, f"Student {sid}"))
+            cur.execute(
+                "INSERT INTO room_allocations (hall_id, room_id, student_id, allocation_date, allocation_type) VALUES (?, ?, ?, ?, 'shared4')",
+                (hall_id, room_id, sid, f"2026-01-01T00:00:{seat:02d}"),
+            )
+            cur.execute("UPDATE rooms SET occupied_seats = occupied_seats + 1 WHERE id = ?", (room_id,))
+    con.commit()
+    con.close()
+    return hall_id
+
+
+def legacy_rooms(db_path: Path, hall_id: int, counter):
+    """The pre-refactor handler body: one query for rooms, then one per room."""
+    con = sqlite3.connect(db_path)
+    con.row_factory = sqlite3.Row
+    con.set_trace_callback(counter)
+    cur = con.cursor()
+    cur.execute("""
+        SELECT r.id, r.room_number, r.capacity, r.occupied_seats
+        FROM rooms r WHERE r.hall_id = ?
+        ORDER BY CAST(r.room_number AS INTEGER)
+    """, (hall_id,))
+    for room in cur.fetchall():
+        cur.execute("""
+            SELECT ra.student_id, s.name
+            FROM room_allocations ra JOIN students s ON ra.student_id = s.id
+            WHERE ra.room_id = ? ORDER BY ra.allocation_date
+        """, (room["id"],))
+        cur.fetchall()
+    con.close()
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "bench.db"
+        shutil.copy(BASE_DIR / "database" / "ruet.db", db_path)
+
+        halls = {size: (f"Bench Hall {size}", build_hall(db_path, f"Bench Hall {size}", size)) for size in SIZES}
+
+        app_module.DB_PATH = db_path
+        accounts_manager.DB_PATH = db_path
+        client = app_module.app.test_client()
+
+        statements = []
+        original_get_db = app_module.get_db
+
+        def counting_get_db(*args, **kwargs):
+            con = original_get_db(*args, **kwargs)
+            con.set_trace_callback(statements.append)
+            return con
+
+        app_module.get_db = counting_get_db
+
+        print(f"{'rooms':>6} | {'endpoint SQL':>12} | {'endpoint ms':>11} | {'legacy SQL':>10} | {'legacy ms':>9}")
+        print("-" * 62)
+        for size, (hall_name, hall_id) in halls.items():
+            client.get(f"/api/hall/rooms?hall_name={hall_name}")  # warm caches
+
+            statements.clear()
+            started = time.perf_counter()
+            res = client.get(f"/api/hall/rooms?hall_name={hall_name}")
+            endpoint_ms = (time.perf_counter() - started) * 1000
+            assert res.status_code == 200 and len(res.get_json()["rooms"]) == size
+            endpoint_sql = len(statements)
+
+            legacy = []
+            started = time.perf_counter()
+            legacy_rooms(db_path, hall_id, legacy.append)
+            legacy_ms = (time.perf_counter() - started) * 1000
+
+            print(f"{size:>6} | {endpoint_sql:>12} | {endpoint_ms:>11.2f} | {len(legacy):>10} | {legacy_ms:>9.2f}")
+
+        app_module.get_db = original_get_db
+
+
+if __name__ == "__main__":
+    main()
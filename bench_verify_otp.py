@@ -0,0 +1,87 @@
+"""
+Benchmark: POST /api/auth/verify-otp throughput per core, HMAC vs bcrypt OTPs.
+
+Creates unverified students in a scratch copy of database/ruet.db, half
+with an HMAC-SHA256 OTP (what register/resend-otp store now) and half with
+a bcrypt OTP hash (what they stored before), then verifies each one from a
+single thread through Flask's test client. One thread on one core gives
+verifications per core-second; CPU time is the process time spent.
+
+Usage:
+    python bench_verify_otp.py [--hmac 500] [--bcrypt 10]
+"""
+
+import argparse
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import bcrypt
+
+BASE_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BASE_DIR / "backend"))
+sys.path.insert(0, str(BASE_DIR))
+
+import app as app_module  # noqa: E402
+import hashing  # noqa: E402
+from database import accounts_manager  # noqa: E402
+
+OTP = "482916"
+
+
+def add_students(db_path: Path, prefix: str, count: int, make_hash):
+    expires = (datetime.utcnow() + timedelta(minutes=10)).isoformat()
+    rows = []
+    for n in range(count):
+        sid = f"{prefix}{n:04d}"
+        rows.append((sid, f"Bench OTP {sid}", f"{sid}@student.ruet.ac.bd", make_hash(sid), expires))
+    con = sqlite3.connect(db_path)
+    con.executemany("""
+        INSERT INTO students (id, name, email, password_hash, verified, otp_hash, otp_expires_at, otp_attempts_left, dept)
+        VALUES (?, ?, ?, 'x', 0, ?, ?, 5, 'CSE')
+    """, rows)
+    con.commit()
+    con.close()
+    return [r[2] for r in rows]
+
+
+def verify_all(client, emails):
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    for email in emails:
+        res = client.post("/api/auth/verify-otp", json={"email": email, "otp": OTP})
+        assert res.status_code == 200, res.get_json()
+    return time.perf_counter() - wall, time.process_time() - cpu
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hmac", type=int, default=500)
+    parser.add_argument("--bcrypt", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "bench.db"
+        shutil.copy(BASE_DIR / "database" / "ruet.db", db_path)
+        hmac_emails = add_students(db_path, "210", args.hmac, lambda sid: hashing.otp_digest(sid, OTP))
+        legacy_hash = bcrypt.hashpw(OTP.encode(), bcrypt.gensalt()).decode()
+        bcrypt_emails = add_students(db_path, "211", args.bcrypt, lambda sid: legacy_hash)
+
+        app_module.DB_PATH = db_path
+        accounts_manager.DB_PATH = db_path
+        client = app_module.app.test_client()
+
+        print(f"{'OTP hash':<8} | {'verified':>8} | {'wall s':>7} | {'cpu ms/req':>10} | {'req/core-s':>10}")
+        print("-" * 56)
+        for label, emails in (("hmac", hmac_emails), ("bcrypt", bcrypt_emails)):
+            wall, cpu = verify_all(client, emails)
+            print(f"{label:<8} | {len(emails):>8} | {wall:>7.2f} | {cpu * 1000 / len(emails):>10.2f} | "
+                  f"{len(emails) / cpu:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
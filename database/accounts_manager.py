@@ -13,6 +13,13 @@ from pathlib import Path
 from typing import Optional, Dict, List
 from datetime import datetime
 
+try:
+    from database.db_pool import get_pool
+    from database.entity_directory import AccountDirectory
+except ImportError:  # run directly as a script from database/
+    from db_pool import get_pool
+    from entity_directory import AccountDirectory
+
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 DB_PATH = BASE_DIR / "database" / "ruet.db"
@@ -24,11 +31,28 @@ DEPT_CODES = {
 }
 
 
-def _get_db():
-    """Get database connection."""
-    con = sqlite3.connect(DB_PATH)
-    con.row_factory = sqlite3.Row
-    return con
+def _get_db(readonly: bool = False):
+    """Get a pooled database connection (close() returns it to the pool)."""
+    return get_pool(DB_PATH).connection(readonly=readonly)
+
+
+# In-memory copy of payment_accounts; every read below is served from it.
+# Writers in this module (and in app.py) call invalidate_accounts_cache().
+_accounts = AccountDirectory(lambda: _get_db(readonly=True))
+
+
+def invalidate_accounts_cache():
+    """Forget the cached payment_accounts; the next read reloads them."""
+    _accounts.invalidate()
+
+
+def accounts_cache_stats() -> Dict:
+    """Hit/miss/load counters of the payment_accounts cache."""
+    return _accounts.stats()
+
+
+def _active(account: Optional[Dict]) -> Optional[Dict]:
+    return account if account and account["is_active"] == 1 else None
 
 
 def get_account_for_student(student_dept: str) -> Optional[Dict]:
@@ -47,31 +71,14 @@ def get_account_for_student(student_dept: str) -> Optional[Dict]:
         print(account['account_number'])
         print(account['bank_name'])
     """
-    con = _get_db()
-    cur = con.cursor()
-    
-    # Normalize department code
+    # Normalize department code ('03' stays '03', 'CSE' becomes '03')
     dept_code = student_dept
-    if student_dept in DEPT_CODES:
-        dept_code = [k for k, v in DEPT_CODES.items() if v.upper() == student_dept.upper()]
-        if dept_code:
-            dept_code = dept_code[0]
-    
-    cur.execute("""
-        SELECT 
-            id, account_type, entity_identifier, account_name,
-            account_number, bank_name, account_holder, is_active, created_at
-        FROM payment_accounts
-        WHERE account_type = 'department'
-        AND entity_identifier = ?
-        AND is_active = 1
-        LIMIT 1
-    """, (dept_code,))
+    if student_dept not in DEPT_CODES:
+        matches = [k for k, v in DEPT_CODES.items() if v.upper() == (student_dept or "").upper()]
+        if matches:
+            dept_code = matches[0]
     
-    row = cur.fetchone()
-    con.close()
-    
-    return dict(row) if row else None
+    return _active(_accounts.by_key('department', dept_code))
 
 
 def get_hall_account(hall_name: str) -> Optional[Dict]:
@@ -88,24 +95,7 @@ def get_hall_account(hall_name: str) -> Optional[Dict]:
         account = get_hall_account('Shahid Abdul Hamid Hall')
         print(account['account_number'])
     """
-    con = _get_db()
-    cur = con.cursor()
-    
-    cur.execute("""
-        SELECT 
-            id, account_type, entity_identifier, account_name,
-            account_number, bank_name, account_holder, is_active, created_at
-        FROM payment_accounts
-        WHERE account_type = 'hall'
-        AND entity_identifier = ?
-        AND is_active = 1
-        LIMIT 1
-    """, (hall_name,))
-    
-    row = cur.fetchone()
-    con.close()
-    
-    return dict(row) if row else None
+    return _active(_accounts.by_key('hall', hall_name))
 
 
 def get_all_hall_accounts() -> List[Dict]:
@@ -120,23 +110,8 @@ def get_all_hall_accounts() -> List[Dict]:
         for hall in halls:
             print(f"{hall['entity_identifier']}: {hall['account_number']}")
     """
-    con = _get_db()
-    cur = con.cursor()
-    
-    cur.execute("""
-        SELECT 
-            id, account_type, entity_identifier, account_name,
-            account_number, bank_name, account_holder, is_active, created_at
-        FROM payment_accounts
-        WHERE account_type = 'hall'
-        AND is_active = 1
-        ORDER BY created_at DESC
-    """)
-    
-    rows = cur.fetchall()
-    con.close()
-    
-    return [dict(row) for row in rows]
+    halls = [a for a in _accounts.of_type('hall') if a['is_active'] == 1]
+    return sorted(halls, key=lambda a: a['created_at'] or '', reverse=True)
 
 
 def get_library_account() -> Optional[Dict]:
@@ -151,23 +126,8 @@ def get_library_account() -> Optional[Dict]:
         if lib_account:
             print(f"Send to: {lib_account['account_number']}")
     """
-    con = _get_db()
-    cur = con.cursor()
-    
-    cur.execute("""
-        SELECT 
-            id, account_type, entity_identifier, account_name,
-            account_number, bank_name, account_holder, is_active, created_at
-        FROM payment_accounts
-        WHERE account_type = 'library'
-        AND is_active = 1
-        LIMIT 1
-    """)
-    
-    row = cur.fetchone()
-    con.close()
-    
-    return dict(row) if row else None
+    accounts = [a for a in _accounts.of_type('library') if a['is_active'] == 1]
+    return accounts[0] if accounts else None
 
 
 def get_all_department_accounts() -> List[Dict]:
@@ -183,23 +143,8 @@ def get_all_department_accounts() -> List[Dict]:
             dept_name = DEPT_CODES.get(dept['entity_identifier'])
             print(f"{dept_name}: {dept['account_number']}")
     """
-    con = _get_db()
-    cur = con.cursor()
-    
-    cur.execute("""
-        SELECT 
-            id, account_type, entity_identifier, account_name,
-            account_number, bank_name, account_holder, is_active, created_at
-        FROM payment_accounts
-        WHERE account_type = 'department'
-        AND is_active = 1
-        ORDER BY entity_identifier ASC
-    """)
-    
-    rows = cur.fetchall()
-    con.close()
-    
-    return [dict(row) for row in rows]
+    depts = [a for a in _accounts.of_type('department') if a['is_active'] == 1]
+    return sorted(depts, key=lambda a: a['entity_identifier'])
 
 
 def get_account_by_id(account_id: int) -> Optional[Dict]:
@@ -212,22 +157,7 @@ def get_account_by_id(account_id: int) -> Optional[Dict]:
     Returns:
         Dictionary with account details or None if not found
     """
-    con = _get_db()
-    cur = con.cursor()
-    
-    cur.execute("""
-        SELECT 
-            id, account_type, entity_identifier, account_name,
-            account_number, bank_name, account_holder, is_active, created_at
-        FROM payment_accounts
-        WHERE id = ?
-        LIMIT 1
-    """, (account_id,))
-    
-    row = cur.fetchone()
-    con.close()
-    
-    return dict(row) if row else None
+    return _accounts.by_id(account_id)
 
 
 def get_accounts_by_type(account_type: str, active_only: bool = True) -> List[Dict]:
@@ -248,28 +178,11 @@ def get_accounts_by_type(account_type: str, active_only: bool = True) -> List[Di
     if account_type not in ['hall', 'library', 'department']:
         raise ValueError("account_type must be 'hall', 'library', or 'department'")
     
-    con = _get_db()
-    cur = con.cursor()
-    
-    query = """
-        SELECT 
-            id, account_type, entity_identifier, account_name,
-            account_number, bank_name, account_holder, is_active, created_at
-        FROM payment_accounts
-        WHERE account_type = ?
-    """
-    params = [account_type]
-    
+    accounts = _accounts.of_type(account_type)
     if active_only:
-        query += " AND is_active = 1"
+        accounts = [a for a in accounts if a['is_active'] == 1]
     
-    query += " ORDER BY created_at DESC"
-    
-    cur.execute(query, params)
-    rows = cur.fetchall()
-    con.close()
-    
-    return [dict(row) for row in rows]
+    return sorted(accounts, key=lambda a: a['created_at'] or '', reverse=True)
 
 
 def create_account(
@@ -322,6 +235,7 @@ def create_account(
         con.commit()
         account_id = cur.lastrowid
         con.close()
+        invalidate_accounts_cache()
         return account_id
         
     except sqlite3.IntegrityError as e:
@@ -366,6 +280,7 @@ def update_account(account_id: int, **kwargs) -> bool:
         
         con.commit()
         con.close()
+        invalidate_accounts_cache()
         return True
         
     except Exception as e:
@@ -412,47 +327,26 @@ def get_accounts_stats() -> Dict:
         print(f"Total: {stats['total']}")
         print(f"Hall Accounts: {stats['by_type']['hall']}")
     """
-    con = _get_db()
-    cur = con.cursor()
+    accounts = _accounts.all()
+    active_accounts = [a for a in accounts if a['is_active'] == 1]
+    
+    by_type = {}
+    for a in accounts:
+        by_type[a['account_type']] = by_type.get(a['account_type'], 0) + 1
     
-    # Total accounts
-    cur.execute("SELECT COUNT(*) as count FROM payment_accounts")
-    total = cur.fetchone()['count']
-    
-    # Active accounts
-    cur.execute("SELECT COUNT(*) as count FROM payment_accounts WHERE is_active = 1")
-    active = cur.fetchone()['count']
-    
-    # By type
-    cur.execute("""
-        SELECT account_type, COUNT(*) as count
-        FROM payment_accounts
-        GROUP BY account_type
-    """)
-    by_type = {row['account_type']: row['count'] for row in cur.fetchall()}
-    
-    # Active by type
-    cur.execute("""
-        SELECT account_type, COUNT(*) as count
-        FROM payment_accounts
-        WHERE is_active = 1
-        GROUP BY account_type
-    """)
-    active_by_type = {row['account_type']: row['count'] for row in cur.fetchall()}
-    
-    con.close()
+    active_by_type = {}
+    for a in active_accounts:
+        active_by_type[a['account_type']] = active_by_type.get(a['account_type'], 0) + 1
     
     return {
-        'total': total,
-        'active': active,
-        'inactive': total - active,
+        'total': len(accounts),
+        'active': len(active_accounts),
+        'inactive': len(accounts) - len(active_accounts),
         'by_type': by_type,
         'active_by_type': active_by_type
     }
 
 
-# Convenience functions for common queries
-
 def get_student_account_info(student_dept: str) -> Optional[Dict]:
     """
     Get formatted account info for student's department fees.
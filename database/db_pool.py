@@ -0,0 +1,341 @@
+"""
+SQLite Connection Pool
+
+Keeps SQLite connections open between requests instead of connecting and
+closing on every call. Each worker process gets its own pool per database
+file; connections are tuned once when they are opened (WAL journal,
+synchronous=NORMAL, cache/mmap sizes, busy timeout, foreign keys).
+
+Reads and writes use separate lanes: read-only connections for queries,
+and one serialized writer connection for mutations.
+
+Usage in your app:
+    from database.db_pool import get_pool
+
+    con = get_pool(DB_PATH).connection(readonly=True)   # queries
+    con = get_pool(DB_PATH).connection()                # mutations
+    ...
+    con.close()   # returns the connection to the pool
+
+Tuning (environment variables):
+    DB_POOL_MAX_IDLE    idle read connections kept per pool (default 8)
+    DB_CACHE_SIZE_KB    page cache per connection, in KiB   (default 16384)
+    DB_MMAP_SIZE        memory-mapped I/O size, in bytes    (default 268435456)
+    DB_BUSY_TIMEOUT_MS  wait on a locked database, in ms    (default 5000)
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict
+
+
+POOL_MAX_IDLE = int(os.getenv("DB_POOL_MAX_IDLE", "8"))
+CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", "16384"))
+MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+
+
+class PooledConnection:
+    """
+    A lease on a pooled sqlite3 connection.
+
+    Behaves like the sqlite3.Connection it wraps, except that close() hands
+    the connection back to the pool instead of closing it. Closing a lease
+    twice is harmless, so request teardown can always close what is left.
+    """
+
+    def __init__(self, pool, raw, readonly: bool = False):
+        self._pool = pool
+        self._raw = raw
+        self._released = False
+        self.readonly = readonly
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def __enter__(self):
+        self._raw.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return self._raw.__exit__(exc_type, exc, tb)
+
+    @property
+    def row_factory(self):
+        return self._raw.row_factory
+
+    @row_factory.setter
+    def row_factory(self, value):
+        self._raw.row_factory = value
+
+    @property
+    def closed(self) -> bool:
+        return self._released
+
+    def close(self):
+        if self._released:
+            return
+        self._released = True
+        self._pool.release(self._raw, self.readonly)
+
+
+class ConnectionPool:
+    """
+    Pool of tuned sqlite3 connections for one database file, in two lanes.
+
+    Read lane: read-only connections (mode=ro URI, query_only) kept on a
+    LIFO stack so the warmest connection is handed out first. In WAL mode
+    readers work from a snapshot and never wait for the writer.
+
+    Write lane: a single read-write connection. Writers take turns on it,
+    so mutations are serialized inside the process instead of colliding on
+    SQLite's write lock. A thread that already holds the writer may lease
+    it again (nested helpers); the transaction belongs to the outer lease.
+
+    Connections are opened with check_same_thread=False because a lease
+    may be released by a different thread (e.g. request teardown) than the
+    one that opened it; a connection is only used by one lease at a time.
+    """
+
+    def __init__(
+        self,
+        db_path,
+        max_idle: int = POOL_MAX_IDLE,
+        cache_size_kb: int = CACHE_SIZE_KB,
+        mmap_size: int = MMAP_SIZE,
+        busy_timeout_ms: int = BUSY_TIMEOUT_MS,
+    ):
+        self.db_path = Path(db_path)
+        self.max_idle = max_idle
+        self.cache_size_kb = cache_size_kb
+        self.mmap_size = mmap_size
+        self.busy_timeout_ms = busy_timeout_ms
+
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+
+        self._writer = None
+        self._writer_cond = threading.Condition()
+        self._writer_owner = None
+        self._writer_depth = 0
+        self._writer_next_ticket = 0
+        self._writer_serving = 0
+
+        self._stats = {
+            "read": {"opened": 0, "closed": 0, "acquired": 0, "reused": 0, "in_use": 0, "peak_in_use": 0},
+            "write": {"opened": 0, "acquired": 0, "waits": 0, "wait_ms_total": 0.0, "wait_ms_max": 0.0},
+        }
+
+    def _tune(self, con: sqlite3.Connection):
+        con.row_factory = sqlite3.Row
+        con.execute(f"PRAGMA cache_size=-{int(self.cache_size_kb)}")
+        con.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        con.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        con.execute("PRAGMA foreign_keys=ON")
+        con.execute("PRAGMA temp_store=MEMORY")
+
+    def _open_writer(self) -> sqlite3.Connection:
+        con = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout_ms / 1000,
+            check_same_thread=False,
+        )
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute("PRAGMA synchronous=NORMAL")
+        self._tune(con)
+        self._stats["write"]["opened"] += 1
+        return con
+
+    def _open_reader(self) -> sqlite3.Connection:
+        if self._writer is None:
+            # The writer switches the file to WAL; read-only handles can't.
+            self.connection().close()
+        con = sqlite3.connect(
+            f"{self.db_path.resolve().as_uri()}?mode=ro",
+            uri=True,
+            timeout=self.busy_timeout_ms / 1000,
+            check_same_thread=False,
+        )
+        self._tune(con)
+        con.execute("PRAGMA query_only=1")
+        with self._lock:
+            self._stats["read"]["opened"] += 1
+        return con
+
+    def connection(self, readonly: bool = False) -> PooledConnection:
+        """Lease a connection; call close() on it to give it back."""
+        if readonly:
+            return self._lease_reader()
+        return self._lease_writer()
+
+    def _lease_reader(self) -> PooledConnection:
+        try:
+            raw = self._idle.get_nowait()
+            reused = True
+        except queue.Empty:
+            raw = self._open_reader()
+            reused = False
+
+        with self._lock:
+            stats = self._stats["read"]
+            stats["acquired"] += 1
+            stats["reused"] += int(reused)
+            stats["in_use"] += 1
+            stats["peak_in_use"] = max(stats["peak_in_use"], stats["in_use"])
+
+        return PooledConnection(self, raw, readonly=True)
+
+    def _lease_writer(self) -> PooledConnection:
+        me = threading.get_ident()
+        with self._writer_cond:
+            waited = None
+            if self._writer_owner != me:
+                # First come, first served: a writer that just released
+                # can't jump ahead of threads already waiting.
+                ticket = self._writer_next_ticket
+                self._writer_next_ticket += 1
+                if self._writer_owner is not None or self._writer_serving != ticket:
+                    started = time.perf_counter()
+                    while self._writer_owner is not None or self._writer_serving != ticket:
+                        self._writer_cond.wait()
+                    waited = (time.perf_counter() - started) * 1000
+
+            self._writer_owner = me
+            self._writer_depth += 1
+            if self._writer is None:
+                self._writer = self._open_writer()
+
+            stats = self._stats["write"]
+            stats["acquired"] += 1
+            if waited is not None:
+                stats["waits"] += 1
+                stats["wait_ms_total"] += waited
+                stats["wait_ms_max"] = max(stats["wait_ms_max"], waited)
+
+            return PooledConnection(self, self._writer, readonly=False)
+
+    def release(self, raw: sqlite3.Connection, readonly: bool):
+        """
+        Return a connection to its lane, discarding uncommitted work and any
+        trace callback, so the next lease (which may not set its own) doesn't
+        report into the previous holder's callback.
+        """
+        if not readonly:
+            self._release_writer(raw)
+            return
+
+        with self._lock:
+            self._stats["read"]["in_use"] -= 1
+
+        try:
+            if raw.in_transaction:
+                raw.rollback()
+            raw.row_factory = sqlite3.Row
+            raw.set_trace_callback(None)
+        except sqlite3.Error:
+            self._discard(raw)
+            return
+
+        if self._idle.qsize() >= self.max_idle:
+            self._discard(raw)
+        else:
+            self._idle.put(raw)
+
+    def _release_writer(self, raw: sqlite3.Connection):
+        with self._writer_cond:
+            self._writer_depth -= 1
+            if self._writer_depth > 0:
+                return
+            try:
+                if raw.in_transaction:
+                    raw.rollback()
+                raw.row_factory = sqlite3.Row
+                raw.set_trace_callback(None)
+            except sqlite3.Error:
+                try:
+                    raw.close()
+                except sqlite3.Error:
+                    pass
+                self._writer = None
+            self._writer_owner = None
+            self._writer_serving += 1
+            self._writer_cond.notify_all()
+
+    def _discard(self, raw: sqlite3.Connection):
+        try:
+            raw.close()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            self._stats["read"]["closed"] += 1
+
+    def close_all(self):
+        """Close idle readers and the writer if nobody is holding it."""
+        while True:
+            try:
+                raw = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(raw)
+        with self._writer_cond:
+            if self._writer is not None and self._writer_owner is None:
+                self._writer.close()
+                self._writer = None
+
+    def stats(self) -> Dict:
+        """Snapshot of pool counters for monitoring."""
+        with self._lock:
+            read = dict(self._stats["read"])
+        with self._writer_cond:
+            write = dict(self._stats["write"])
+            write["busy"] = self._writer_owner is not None
+        read["idle"] = self._idle.qsize()
+        return {
+            "pid": os.getpid(),
+            "db_path": str(self.db_path),
+            "read": read,
+            "write": write,
+            "settings": {
+                "max_idle": self.max_idle,
+                "cache_size_kb": self.cache_size_kb,
+                "mmap_size": self.mmap_size,
+                "busy_timeout_ms": self.busy_timeout_ms,
+            },
+        }
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_pid = os.getpid()
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path) -> ConnectionPool:
+    """
+    Get the pool for a database file in the current worker process.
+
+    Pools are rebuilt after a fork so that worker processes never share
+    SQLite connections with their parent.
+    """
+    global _pools_pid
+
+    key = str(Path(db_path).resolve())
+    with _pools_lock:
+        if _pools_pid != os.getpid():
+            _pools.clear()
+            _pools_pid = os.getpid()
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(key)
+            _pools[key] = pool
+        return pool
+
+
+def all_pool_stats() -> Dict[str, Dict]:
+    """Stats for every pool opened by this worker process."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return {str(p.db_path): p.stats() for p in pools}
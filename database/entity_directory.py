@@ -0,0 +1,206 @@
+"""
+Entity Directory Cache
+
+Process-wide, in-memory lookup tables for small, rarely-changing tables
+that almost every request needs to resolve (hall_name -> hall id,
+payment account for a hall/department/library, ...).
+
+The directory is loaded once (at startup or on first use) and then served
+from memory. It is refreshed when:
+    - invalidate() is called after the underlying table is changed,
+    - a lookup misses (at most once every MISS_RELOAD_SECONDS), or
+    - the snapshot is older than DIRECTORY_TTL_SECONDS, so edits made by
+      other processes (e.g. setup_ruet_halls.py) are picked up.
+
+Usage in your app:
+    from database.entity_directory import HallDirectory
+
+    halls = HallDirectory(lambda: get_db(readonly=True))
+    hall = halls.by_name("Shahid Abdul Hamid Hall")  # {'id', 'hall_name', 'email'}
+"""
+
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+
+DIRECTORY_TTL_SECONDS = float(os.getenv("DIRECTORY_TTL_SECONDS", "300"))
+MISS_RELOAD_SECONDS = float(os.getenv("DIRECTORY_MISS_RELOAD_SECONDS", "5"))
+
+
+class _SnapshotDirectory:
+    """
+    Base for a table cached as an immutable snapshot of lookup indexes.
+
+    Each load builds a fresh snapshot and swaps it in with one assignment,
+    so lookups never take a lock and never see a half-built index.
+    Subclasses provide the SELECT and turn its rows into indexes.
+    """
+
+    query = ""
+
+    def __init__(self, connect: Callable, ttl: float = DIRECTORY_TTL_SECONDS):
+        self._connect = connect
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._loaded_at = 0.0
+        self._stats = {"loads": 0, "hits": 0, "misses": 0}
+
+    def _build(self, rows: List[Dict]) -> Dict:
+        raise NotImplementedError
+
+    def load(self) -> Dict:
+        """(Re)load the whole table from the database."""
+        con = self._connect()
+        try:
+            rows = [dict(r) for r in con.execute(self.query).fetchall()]
+        finally:
+            con.close()
+
+        snapshot = self._build(rows)
+        with self._lock:
+            self._snapshot = snapshot
+            self._loaded_at = time.monotonic()
+            self._stats["loads"] += 1
+        return snapshot
+
+    def invalidate(self):
+        """Drop the snapshot; the next lookup reloads it."""
+        with self._lock:
+            self._snapshot = None
+
+    def _current(self) -> Dict:
+        snapshot = self._snapshot
+        if snapshot is None or time.monotonic() - self._loaded_at > self._ttl:
+            snapshot = self.load()
+        return snapshot
+
+    def _lookup(self, index: str, key) -> Optional[Dict]:
+        item = self._current()[index].get(key)
+        if item is None and time.monotonic() - self._loaded_at > MISS_RELOAD_SECONDS:
+            # Possibly a row added since the last load; retry once.
+            item = self.load()[index].get(key)
+        self._stats["hits" if item else "misses"] += 1
+        return dict(item) if item else None
+
+    def stats(self) -> Dict:
+        snapshot = self._snapshot
+        return {
+            **self._stats,
+            "size": len(snapshot["list"]) if snapshot else 0,
+            "age_seconds": round(time.monotonic() - self._loaded_at, 1) if snapshot else None,
+        }
+
+
+class HallDirectory(_SnapshotDirectory):
+    """
+    hall id <-> hall_name <-> email, both ways.
+
+    No request handler writes halls; they are edited offline
+    (setup_ruet_halls.py, generate_campus_data.py), so a running worker
+    learns of a change by itself, at most:
+        - MISS_RELOAD_SECONDS after the load, for a new hall looked up by
+          name or email (the miss reloads the snapshot), and
+        - DIRECTORY_TTL_SECONDS after the load, for a renamed hall or a
+          changed email (the old name keeps resolving until then).
+    POST /api/debug/directories invalidates a worker's snapshot at once.
+    """
+
+    query = "SELECT id, hall_name, email FROM halls ORDER BY id"
+
+    def _build(self, rows):
+        return {
+            "list": rows,
+            "by_id": {h["id"]: h for h in rows},
+            "by_name": {h["hall_name"]: h for h in rows},
+            "by_email": {(h["email"] or "").lower(): h for h in rows},
+        }
+
+    def by_name(self, hall_name: str) -> Optional[Dict]:
+        return self._lookup("by_name", hall_name)
+
+    def by_email(self, email: str) -> Optional[Dict]:
+        return self._lookup("by_email", (email or "").strip().lower())
+
+    def by_id(self, hall_id: int) -> Optional[Dict]:
+        return self._lookup("by_id", hall_id)
+
+    def first(self) -> Optional[Dict]:
+        """The hall handlers fall back to when no hall_name is given."""
+        halls = self._current()["list"]
+        return dict(halls[0]) if halls else None
+
+    def resolve(self, hall_name: str) -> Optional[Dict]:
+        """Hall by name, or the first hall when hall_name is empty."""
+        return self.by_name(hall_name) if hall_name else self.first()
+
+    def all(self) -> List[Dict]:
+        return [dict(h) for h in self._current()["list"]]
+
+
+class DepartmentDirectory(_SnapshotDirectory):
+    """department id <-> dept_code <-> dept_name <-> email."""
+
+    query = "SELECT id, dept_code, dept_name, email FROM departments ORDER BY id"
+
+    def _build(self, rows):
+        return {
+            "list": rows,
+            "by_id": {d["id"]: d for d in rows},
+            "by_code": {d["dept_code"]: d for d in rows},
+            "by_name": {d["dept_name"]: d for d in rows},
+            "by_email": {(d["email"] or "").lower(): d for d in rows},
+        }
+
+    def by_id(self, dept_id: int) -> Optional[Dict]:
+        return self._lookup("by_id", dept_id)
+
+    def by_code(self, dept_code: str) -> Optional[Dict]:
+        return self._lookup("by_code", dept_code)
+
+    def by_name(self, dept_name: str) -> Optional[Dict]:
+        return self._lookup("by_name", dept_name)
+
+    def by_email(self, email: str) -> Optional[Dict]:
+        return self._lookup("by_email", (email or "").strip().lower())
+
+
+class AccountDirectory(_SnapshotDirectory):
+    """
+    payment_accounts indexed by id, by (account_type, entity_identifier)
+    and by account_type. Inactive accounts are kept so admin views and
+    get_account_by_id() still see them; callers filter on is_active.
+    """
+
+    query = """
+        SELECT
+            id, account_type, entity_identifier, account_name,
+            account_number, bank_name, account_holder, is_active, created_at
+        FROM payment_accounts
+        ORDER BY id
+    """
+
+    def _build(self, rows):
+        by_type = {}
+        for a in rows:
+            by_type.setdefault(a["account_type"], []).append(a)
+        return {
+            "list": rows,
+            "by_id": {a["id"]: a for a in rows},
+            "by_key": {(a["account_type"], a["entity_identifier"]): a for a in rows},
+            "by_type": by_type,
+        }
+
+    def by_id(self, account_id: int) -> Optional[Dict]:
+        return self._lookup("by_id", account_id)
+
+    def by_key(self, account_type: str, entity_identifier: str) -> Optional[Dict]:
+        return self._lookup("by_key", (account_type, entity_identifier))
+
+    def of_type(self, account_type: str) -> List[Dict]:
+        return [dict(a) for a in self._current()["by_type"].get(account_type, [])]
+
+    def all(self) -> List[Dict]:
+        return [dict(a) for a in self._current()["list"]]
@@ -0,0 +1,453 @@
+"""
+Generate a synthetic large-campus database.
+
+The checked-in ruet.db holds a handful of demo rows. This builds a
+separate database with the same schema (indexes and triggers included)
+at a realistic size, to see how the app behaves at scale:
+
+    students          --students across the 14 DEPT_CODES, --years batches,
+                      ids derived from the roll (YY series, DD dept, NNN
+                      serial, e.g. 2203133), weighted by department intake
+    rooms             a full inventory for each of the 11 RUET_HALLS:
+                      --floors x --rooms-per-floor, single and shared4 rooms
+    room_allocations  ~92% of the seats, female halls for female students
+    hall_monthly_fees one fee per hall per month since the oldest batch
+    hall_dues         every resident, every month since their allocation
+    department_dues   semester, exam, lab and project fees per batch
+    books             --books titles; some on loan now, some overdue
+    library_fines     one per student with late returns (fine 2/day)
+
+The schema has no loan-history table, so past loans show up only as
+library fines; the current loans are set on books as the issue API
+does. Account tables (halls, departments, librarians, hall_managers,
+payment_accounts, hall_accounts) are copied from ruet.db, so every hall
+and department login keeps working. Students log in with their roll
+email and --password. students.hall_fee / dept_fee / library_fee hold
+the unpaid totals, and hall_stats / library_stats are backfilled.
+
+The same --seed and sizes always give the same data: nothing depends
+on the clock (--as-of fixes "today") and the shared password hash uses
+a salt derived from the seed. Rows are bulk-inserted into a fresh file
+with journaling and syncs off, and indexes and triggers are created
+after the load.
+
+Usage:
+    python generate_campus_data.py [--students 40000] [--books 100000] [--years 6]
+                                   [--seed 3100] [--out ruet_synthetic.db] [--force]
+"""
+
+import argparse
+import random
+import sqlite3
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import bcrypt
+
+try:
+    from database.accounts_manager import DEPT_CODES
+    from database.migrate_hall_stats import BACKFILL_SQL as HALL_STATS_BACKFILL
+    from database.migrate_library_stats import BACKFILL_SQL as LIBRARY_STATS_BACKFILL
+    from database.setup_ruet_halls import RUET_HALLS
+except ImportError:  # run directly as a script from database/
+    from accounts_manager import DEPT_CODES
+    from migrate_hall_stats import BACKFILL_SQL as HALL_STATS_BACKFILL
+    from migrate_library_stats import BACKFILL_SQL as LIBRARY_STATS_BACKFILL
+    from setup_ruet_halls import RUET_HALLS
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DB_PATH = BASE_DIR / "database" / "ruet.db"
+OUT_PATH = BASE_DIR / "database" / "ruet_synthetic.db"
+
+# Copied as they are from ruet.db
+ACCOUNT_TABLES = ["halls", "departments", "librarians", "hall_managers", "payment_accounts", "hall_accounts"]
+
+# Yearly intake per department code, used as weights
+DEPT_INTAKE = {
+    "00": 180, "01": 180, "02": 180, "03": 180, "04": 60, "05": 60, "06": 60,
+    "07": 60, "08": 60, "09": 30, "10": 60, "11": 60, "12": 60, "13": 60,
+}
+FEMALE_HALLS = {"Female Hall 1", "Female Hall 2"}
+FEMALE_SHARE = 0.22
+RESIDENT_SHARE = 0.92       # hall seats taken
+SHARED_ROOM_SHARE = 0.8     # shared4 rooms, the rest are single
+LOAN_SHARE = 0.06           # books on loan right now
+LATE_RETURNER_SHARE = 0.25  # students with fines from past late returns
+PER_DAY_FINE = 2            # same as /api/library/returnBook
+LOAN_DAYS = 14
+
+MALE_NAMES = [
+    "Abdullah", "Ahnaf", "Arif", "Ashfaq", "Fahim", "Faisal", "Habib", "Hasan", "Imran", "Istiak",
+    "Jubayer", "Kamrul", "Mahmud", "Mehedi", "Mizanur", "Nafis", "Nayeem", "Rafiq", "Rakib", "Rashed",
+    "Rifat", "Sabbir", "Sajid", "Shakil", "Shihab", "Sohel", "Tahmid", "Talha", "Tanvir", "Zahid",
+]
+FEMALE_NAMES = [
+    "Anika", "Farzana", "Fatema", "Habiba", "Jannat", "Lamia", "Maliha", "Mim", "Nabila", "Nadia",
+    "Nusrat", "Raisa", "Rumana", "Sadia", "Samia", "Sanjida", "Sharmin", "Sumaiya", "Tahsin", "Tasnim",
+]
+SURNAMES = [
+    "Ahmed", "Akter", "Alam", "Chowdhury", "Hossain", "Islam", "Kabir", "Karim", "Khan", "Mahmud",
+    "Miah", "Rahman", "Roy", "Saha", "Sarkar", "Sheikh", "Siddique", "Talukder", "Uddin", "Haque",
+]
+BOOK_CATEGORIES = {
+    "Programming": ["Data Structures", "Algorithms", "Compiler Design", "Operating Systems", "Computer Networks",
+                    "Database Systems", "Microprocessors", "Software Engineering"],
+    "Electrical": ["Circuit Analysis", "Power Systems", "Electrical Machines", "Control Systems", "Electronics"],
+    "Mechanical": ["Thermodynamics", "Fluid Mechanics", "Machine Design", "Heat Transfer", "Engineering Mechanics"],
+    "Civil": ["Structural Analysis", "Soil Mechanics", "Surveying", "Reinforced Concrete", "Transportation"],
+    "Mathematics": ["Calculus", "Linear Algebra", "Differential Equations", "Probability", "Numerical Methods"],
+    "Physics": ["Modern Physics", "Optics", "Electromagnetism", "Quantum Mechanics", "Solid State Physics"],
+    "Chemistry": ["Physical Chemistry", "Organic Chemistry", "Chemical Process Design", "Polymer Science"],
+    "Architecture": ["Architectural Design", "Building Construction", "Urban Planning", "History of Architecture"],
+}
+TITLE_FORMS = ["Introduction to {}", "Fundamentals of {}", "{}", "Principles of {}", "Applied {}", "Advanced {}"]
+SEMESTER_FEE = {"09": 6500, "07": 5500}    # others pay DEFAULT_SEMESTER_FEE
+DEFAULT_SEMESTER_FEE = 5000
+
+
+def months_between(first: date, last: date):
+    """YYYY-MM keys from first's month through last's month."""
+    y, m = first.year, first.month
+    while (y, m) <= (last.year, last.month):
+        yield f"{y:04d}-{m:02d}"
+        y, m = (y + 1, 1) if m == 12 else (y, m + 1)
+
+
+def seeded_password_hash(password: str, rng: random.Random) -> str:
+    """bcrypt hash with a salt drawn from rng, so the output is reproducible."""
+    alphabet = "./ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789"
+    salt = "$2b$12$" + "".join(rng.choice(alphabet) for _ in range(21)) + rng.choice(".Oeu")
+    return bcrypt.hashpw(password.encode("utf-8"), salt.encode("ascii")).decode("utf-8")
+
+
+def make_students(rng: random.Random, count: int, years: int, as_of: date):
+    """Student dicts for `years` batches, the newest admitted the year before as_of."""
+    newest = as_of.year - 2000 - 1          # batch admitted in the previous calendar year
+    batches = [newest - k for k in range(years)]
+    total_weight = sum(DEPT_INTAKE.values()) * len(batches)
+    students = []
+    weight = 0
+    for series in sorted(batches):
+        for code, intake in DEPT_INTAKE.items():
+            # cumulative apportioning, so the sizes add up to exactly `count`
+            size = count * (weight + intake) // total_weight - count * weight // total_weight
+            weight += intake
+            if size > 999:
+                raise ValueError(f"{size} students in batch {series} {DEPT_CODES[code]}: rolls only go to 999, "
+                                 f"use more --years")
+            start = date(2000 + series + 1, 1, 1)   # classes start the January after admission
+            for serial in range(1, size + 1):
+                female = rng.random() < FEMALE_SHARE
+                first = rng.choice(FEMALE_NAMES if female else MALE_NAMES)
+                name = f"{'' if female or rng.random() < 0.5 else 'Md '}{first} {rng.choice(SURNAMES)}"
+                students.append({
+                    "id": f"{series:02d}{code}{serial:03d}", "name": name, "dept": DEPT_CODES[code],
+                    "code": code, "series": series, "female": female, "start": start,
+                    "hall": None, "room": None, "hall_fee": 0, "dept_fee": 0, "library_fee": 0,
+                })
+    return students
+
+
+def make_rooms(rng: random.Random, halls, floors: int, rooms_per_floor: int):
+    """Room rows [(id, hall_id, room_number, capacity)] for every hall."""
+    rooms = []
+    for hall_id, _ in halls:
+        for floor in range(1, floors + 1):
+            for n in range(1, rooms_per_floor + 1):
+                capacity = 4 if rng.random() < SHARED_ROOM_SHARE else 1
+                rooms.append((len(rooms) + 1, hall_id, f"{floor}{n:02d}", capacity))
+    return rooms
+
+
+def allocate(rng: random.Random, students, halls, rooms, as_of: date):
+    """Fill ~RESIDENT_SHARE of the seats; returns allocation rows and each room's occupancy."""
+    hall_names = dict(halls)
+    seats = {"female": [], "male": []}
+    for room_id, hall_id, room_number, capacity in rooms:
+        side = "female" if hall_names[hall_id] in FEMALE_HALLS else "male"
+        seats[side].extend([(room_id, hall_id, room_number, capacity)] * capacity)
+
+    allocations = []
+    occupied = {}
+    for side, side_seats in seats.items():
+        candidates = [s for s in students if s["female"] == (side == "female")]
+        rng.shuffle(side_seats)
+        take = min(len(candidates), int(len(side_seats) * RESIDENT_SHARE))
+        for student, (room_id, hall_id, room_number, capacity) in zip(rng.sample(candidates, take), side_seats):
+            allocated = min(student["start"] + timedelta(days=rng.randint(0, 240)), as_of - timedelta(days=1))
+            at = datetime.combine(allocated, datetime.min.time()) + timedelta(seconds=rng.randint(9 * 3600, 17 * 3600))
+            allocations.append((hall_id, room_id, student["id"], at.isoformat(), "single" if capacity == 1 else "shared4",
+                                at.strftime("%Y-%m-%d %H:%M:%S")))
+            occupied[room_id] = occupied.get(room_id, 0) + 1
+            student["hall"], student["room"], student["allocated"] = hall_names[hall_id], room_number, allocated
+    allocations.sort(key=lambda a: (a[3], a[2]))
+    return allocations, occupied
+
+
+def paid_probability(months_ago: int) -> float:
+    """Older dues are almost all paid; the latest months are still coming in."""
+    return {0: 0.2, 1: 0.5, 2: 0.75}.get(months_ago, 0.97)
+
+
+def make_hall_dues(rng: random.Random, students, halls, first: date, as_of: date):
+    """hall_monthly_fees and hall_dues rows; adds unpaid amounts to students' hall_fee."""
+    months = list(months_between(first, as_of))
+    fees = {}
+    fee_rows = []
+    for hall_id, _ in halls:
+        base = rng.choice([400, 450, 500, 550, 600])
+        for month in months:
+            amount = base + 50 * (int(month[:4]) - first.year)
+            fees[(hall_id, month)] = amount
+            fee_rows.append((hall_id, month, amount, f"{month}-15", f"{month}-01 09:00:00"))
+
+    hall_ids = {name: hall_id for hall_id, name in halls}
+    dues = []
+    for student in students:
+        if not student["hall"]:
+            continue
+        hall_id = hall_ids[student["hall"]]
+        student_months = list(months_between(student["allocated"], as_of))
+        for months_ago, month in enumerate(reversed(student_months)):
+            amount = fees[(hall_id, month)]
+            if rng.random() < paid_probability(months_ago):
+                paid = f"{month}-{rng.randint(1, 20):02d}T{rng.randint(9, 20):02d}:{rng.randint(0, 59):02d}:00"
+                dues.append((hall_id, student["id"], month, amount, paid, "paid", f"{month}-01 09:00:00"))
+            else:
+                dues.append((hall_id, student["id"], month, amount, None, "unpaid", f"{month}-01 09:00:00"))
+                student["hall_fee"] += amount
+    return fee_rows, dues
+
+
+def make_department_dues(rng: random.Random, students, dept_ids, as_of: date):
+    """department_dues rows: per batch and semester, one fee_id shared by the batch."""
+    batches = {}
+    for student in students:
+        batches.setdefault((student["code"], student["series"]), []).append(student)
+
+    dues = []
+    fee_number = 1000
+    for (code, series), members in sorted(batches.items()):
+        start = members[0]["start"]
+        semesters = []
+        d = start
+        while d <= as_of:
+            semesters.append(d)
+            d = date(d.year, 7, 1) if d.month == 1 else date(d.year + 1, 1, 1)
+
+        for index, semester in enumerate(semesters):
+            current = index == len(semesters) - 1
+            fees = [("Semester Fee", SEMESTER_FEE.get(code, DEFAULT_SEMESTER_FEE)), ("Exam Fee", 1200)]
+            if index % 2 == 1:
+                fees.append(("Lab Fee", 800))
+            if index >= 6:
+                fees.append(("Project Fee", 1500))
+            for due_type, amount in fees:
+                fee_number += 1
+                fee_id = f"DF-{fee_number}"
+                created = f"{semester.isoformat()} 10:00:00"
+                deadline = (semester + timedelta(days=30)).isoformat()
+                for student in members:
+                    if rng.random() < (0.4 if current else 0.96):
+                        paid = (semester + timedelta(days=rng.randint(1, 45))).isoformat() + "T11:00:00"
+                        dues.append((str(dept_ids[code]), student["id"], fee_id, amount, "paid", created,
+                                     due_type, deadline, paid))
+                    else:
+                        dues.append((str(dept_ids[code]), student["id"], fee_id, amount, "unpaid", created,
+                                     due_type, deadline, None))
+                        student["dept_fee"] += amount
+    return dues
+
+
+def make_library(rng: random.Random, students, count: int, as_of: date):
+    """books rows (some on loan now) and library_fines rows from past late returns."""
+    titles = [(category, form.format(subject))
+              for category, subjects in BOOK_CATEGORIES.items() for subject in subjects for form in TITLE_FORMS]
+    first_added = datetime(as_of.year - 10, 1, 1)
+    span = int((datetime.combine(as_of, datetime.min.time()) - first_added).total_seconds())
+    added = sorted(first_added + timedelta(seconds=rng.randrange(span)) for _ in range(count))
+
+    # one fixed width (4 digits, like /api/library/next-book-id, or more) so
+    # that ORDER BY id, a text sort, finds the highest number
+    width = max(4, len(str(count)))
+    books = []
+    for n, added_at in enumerate(added, start=1):
+        category, title = rng.choice(titles)
+        edition = rng.randint(1, 12)
+        author = f"{rng.choice(MALE_NAMES + FEMALE_NAMES)} {rng.choice(SURNAMES)}"
+        book = [f"BK-{n:0{width}d}", f"{title} ({edition}e)", author, category, "available", added_at.isoformat(), None, None]
+        if rng.random() < LOAN_SHARE:
+            issued = as_of - timedelta(days=rng.randint(0, 40))
+            book[4] = rng.choice(students)["id"]
+            book[6] = (issued + timedelta(days=LOAN_DAYS)).isoformat()
+            book[7] = issued.isoformat()
+        books.append(tuple(book))
+
+    fines = []
+    for student in students:
+        if rng.random() >= LATE_RETURNER_SHARE:
+            continue
+        late_days = sum(rng.randint(1, 30) for _ in range(rng.randint(1, 3)))
+        amount = late_days * PER_DAY_FINE
+        fined = min(student["start"] + timedelta(days=rng.randint(30, 1500)), as_of)
+        created = datetime.combine(fined, datetime.min.time()) + timedelta(hours=rng.randint(9, 17))
+        if rng.random() < 0.7:
+            paid = (created + timedelta(days=rng.randint(0, 60))).isoformat()
+            fines.append((student["id"], "Library Fine", amount, fined.isoformat(), paid, "paid", created.isoformat()))
+        else:
+            fines.append((student["id"], "Library Fine", amount, fined.isoformat(), None, "unpaid", created.isoformat()))
+            student["library_fee"] = amount
+    return books, fines
+
+
+def generate_campus_data(out_path=OUT_PATH, students=40000, books=100000, years=6, seed=3100,
+                         as_of=date(2026, 4, 30), floors=5, rooms_per_floor=30, password="student123",
+                         source_path=DB_PATH):
+    """Build the synthetic database at out_path; returns row counts per table."""
+    started = time.perf_counter()
+    rng = random.Random(seed)
+    out_path = Path(out_path)
+    tmp_path = out_path.with_name(out_path.name + ".tmp")
+    tmp_path.unlink(missing_ok=True)
+
+    src = sqlite3.connect(source_path)
+    schema = src.execute("""
+        SELECT type, sql FROM sqlite_master
+        WHERE sql IS NOT NULL AND name NOT LIKE 'sqlite_%'
+        ORDER BY rowid
+    """).fetchall()
+    halls = src.execute(
+        f"SELECT id, hall_name FROM halls WHERE hall_name IN ({','.join('?' * len(RUET_HALLS))}) ORDER BY id",
+        [name for name, _ in RUET_HALLS],
+    ).fetchall()
+    dept_ids = dict(src.execute("SELECT dept_code, id FROM departments").fetchall())
+    src.close()
+
+    # ----- rows -----
+    student_rows = make_students(rng, students, years, as_of)
+    password_hash = seeded_password_hash(password, rng)
+    room_rows = make_rooms(rng, halls, floors, rooms_per_floor)
+    allocation_rows, occupied = allocate(rng, student_rows, halls, room_rows, as_of)
+    first_start = min(s["start"] for s in student_rows)
+    fee_rows, hall_due_rows = make_hall_dues(rng, student_rows, halls, first_start, as_of)
+    dept_due_rows = make_department_dues(rng, student_rows, dept_ids, as_of)
+    book_rows, fine_rows = make_library(rng, student_rows, books, as_of)
+
+    # ----- load -----
+    con = sqlite3.connect(tmp_path, isolation_level=None)
+    for pragma in ("journal_mode=OFF", "synchronous=OFF", "locking_mode=EXCLUSIVE",
+                   "temp_store=MEMORY", "cache_size=-262144"):
+        con.execute(f"PRAGMA {pragma}")
+    con.execute("BEGIN")
+    for kind, sql in schema:
+        if kind == "table":
+            con.execute(sql)
+
+    con.execute("ATTACH DATABASE ? AS src", (str(source_path),))
+    for table in ACCOUNT_TABLES:
+        con.execute(f"INSERT INTO main.{table} SELECT * FROM src.{table}")
+    con.execute("COMMIT")
+    con.execute("DETACH DATABASE src")
+
+    con.execute("BEGIN")
+    con.executemany("""
+        INSERT INTO students (id, name, dept, hall, room, email, password_hash,
+                              hall_fee, library_fee, dept_fee, verified, otp_attempts_left)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1, 5)
+    """, ((s["id"], s["name"], s["dept"], s["hall"], s["room"], f"{s['id']}@student.ruet.ac.bd", password_hash,
+           s["hall_fee"], s["library_fee"], s["dept_fee"]) for s in student_rows))
+    con.executemany("""
+        INSERT INTO rooms (id, hall_id, room_number, capacity, occupied_seats, created_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, ((room_id, hall_id, number, capacity, occupied.get(room_id, 0), f"{first_start.isoformat()} 08:00:00")
+          for room_id, hall_id, number, capacity in room_rows))
+    con.executemany("""
+        INSERT INTO room_allocations (hall_id, room_id, student_id, allocation_date, allocation_type, created_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, allocation_rows)
+    con.executemany("""
+        INSERT INTO hall_monthly_fees (hall_id, month, amount, deadline, created_at) VALUES (?, ?, ?, ?, ?)
+    """, fee_rows)
+    con.executemany("""
+        INSERT INTO hall_dues (hall_id, student_id, month, amount, paid_date, status, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, hall_due_rows)
+    con.executemany("""
+        INSERT INTO department_dues (dept_id, student_id, fee_id, amount, status, created_at, due_type, deadline, paid_date)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, dept_due_rows)
+    con.executemany("""
+        INSERT INTO books (id, title, author, category, status, added_at, issue_duration, issue_date)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, book_rows)
+    con.executemany("""
+        INSERT INTO library_fines (student_id, fine_description, amount, fine_date, paid_date, status, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, fine_rows)
+    con.execute("""
+        UPDATE halls SET total_rooms = (SELECT COUNT(*) FROM rooms WHERE rooms.hall_id = halls.id)
+    """)
+
+    # indexes and triggers after the rows are in; the trigger-kept tables are backfilled
+    for kind, sql in schema:
+        if kind == "index":
+            con.execute(sql)
+    con.execute(HALL_STATS_BACKFILL)
+    con.execute(LIBRARY_STATS_BACKFILL)
+    for kind, sql in schema:
+        if kind == "trigger":
+            con.execute(sql)
+    con.execute("COMMIT")
+
+    counts = {table: con.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+              for table in ("students", "rooms", "room_allocations", "hall_monthly_fees", "hall_dues",
+                            "department_dues", "books", "library_fines")}
+    con.execute("PRAGMA journal_mode=DELETE")
+    con.close()
+    tmp_path.replace(out_path)
+    counts["seconds"] = round(time.perf_counter() - started, 1)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic large-campus copy of ruet.db")
+    parser.add_argument("--students", type=int, default=40000)
+    parser.add_argument("--books", type=int, default=100000)
+    parser.add_argument("--years", type=int, default=6, help="batches on campus (and years of dues)")
+    parser.add_argument("--floors", type=int, default=5)
+    parser.add_argument("--rooms-per-floor", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=3100)
+    parser.add_argument("--as-of", default="2026-04-30", help="the generated data's today (YYYY-MM-DD)")
+    parser.add_argument("--password", default="student123", help="every generated student's password")
+    parser.add_argument("--out", type=Path, default=OUT_PATH)
+    parser.add_argument("--force", action="store_true", help="replace --out if it exists")
+    args = parser.parse_args()
+
+    out = args.out.resolve()
+    if out == DB_PATH.resolve():
+        print("❌ --out must not be ruet.db itself; generate elsewhere and copy it over")
+        return 1
+    if out.exists() and not args.force:
+        print(f"❌ {out} exists (use --force to replace it)")
+        return 1
+
+    try:
+        counts = generate_campus_data(
+            out, students=args.students, books=args.books, years=args.years, seed=args.seed,
+            as_of=date.fromisoformat(args.as_of), floors=args.floors, rooms_per_floor=args.rooms_per_floor,
+            password=args.password,
+        )
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+
+    seconds = counts.pop("seconds")
+    for table, count in counts.items():
+        print(f"✅ {table:<18} {count:>10,}")
+    print(f"\n✅ Wrote {out} in {seconds} s (seed {args.seed})")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,47 @@
+"""
+Migration script to add paid_date to department_dues.
+
+hall_dues and library_fines record when a due was paid; department_dues
+never had the column, so marking a department due as paid
+(/api/dept/dues/<fee_id>/pay) failed with "no such column: paid_date".
+
+Safe to run more than once.
+
+Usage:
+    python migrate_dept_dues_paid_date.py
+"""
+
+import sqlite3
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DB_PATH = BASE_DIR / "database" / "ruet.db"
+
+
+def migrate_dept_dues_paid_date(db_path=DB_PATH):
+    """Add department_dues.paid_date if it is missing."""
+    con = sqlite3.connect(db_path)
+    cur = con.cursor()
+
+    try:
+        cur.execute("PRAGMA table_info(department_dues)")
+        columns = [row[1] for row in cur.fetchall()]
+
+        if "paid_date" in columns:
+            print("⚠️ department_dues.paid_date already exists")
+        else:
+            cur.execute("ALTER TABLE department_dues ADD COLUMN paid_date TEXT")
+            print("✅ Added department_dues.paid_date")
+
+        con.commit()
+        print("\n✅ Migration completed successfully!")
+
+    except Exception as e:
+        print(f"❌ Error during migration: {e}")
+        con.rollback()
+    finally:
+        con.close()
+
+
+if __name__ == "__main__":
+    migrate_dept_dues_paid_date()
@@ -0,0 +1,43 @@
+"""
+Migration script to index students by department.
+
+    idx_students_dept   students(dept)
+        The department dashboard counts a department's students on every
+        refresh; without this index that count scans the whole students table.
+        (department_dues is already keyed by (dept_id, student_id, fee_id),
+        which covers the per-department aggregates and fee pagination.)
+
+Safe to run more than once.
+
+Usage:
+    python migrate_dept_indexes.py
+"""
+
+import sqlite3
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DB_PATH = BASE_DIR / "database" / "ruet.db"
+
+
+def migrate_dept_indexes(db_path=DB_PATH):
+    """Create the department dashboard indexes."""
+    con = sqlite3.connect(db_path)
+    cur = con.cursor()
+
+    try:
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_students_dept ON students(dept)")
+        print("✅ Created idx_students_dept")
+
+        con.commit()
+        print("\n✅ Migration completed successfully!")
+
+    except Exception as e:
+        print(f"❌ Error during migration: {e}")
+        con.rollback()
+    finally:
+        con.close()
+
+
+if __name__ == "__main__":
+    migrate_dept_indexes()
@@ -0,0 +1,69 @@
+"""
+Migration script to add LOWER(email) expression indexes for the login lookups.
+
+Every auth path matches emails case-insensitively with
+`WHERE LOWER(email) = LOWER(?)`. The UNIQUE indexes on the plain email
+columns can't serve that, so each lookup scanned the whole table. An index
+on the expression itself turns it into an index seek, with no change to
+the stored emails or the queries:
+
+    idx_students_email_lower      students(LOWER(email))
+    idx_halls_email_lower         halls(LOWER(email))
+    idx_departments_email_lower   departments(LOWER(email))
+    idx_librarians_email_lower    librarians(LOWER(email))
+
+The indexes are UNIQUE, so two accounts can no longer differ only by the
+case of their email. If a table already has such duplicates, it gets a
+plain index instead and the duplicates are listed so they can be merged.
+
+Building the index reads every existing row, so existing accounts are
+covered as soon as this runs. Safe to run more than once.
+
+Usage:
+    python migrate_email_indexes.py
+"""
+
+import sqlite3
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DB_PATH = BASE_DIR / "database" / "ruet.db"
+
+EMAIL_TABLES = ["students", "halls", "departments", "librarians"]
+
+
+def migrate_email_indexes(db_path=DB_PATH):
+    """Create the LOWER(email) indexes."""
+    con = sqlite3.connect(db_path)
+    cur = con.cursor()
+
+    try:
+        for table in EMAIL_TABLES:
+            index = f"idx_{table}_email_lower"
+            duplicates = cur.execute(f"""
+                SELECT LOWER(email), COUNT(*) FROM {table}
+                WHERE email IS NOT NULL
+                GROUP BY LOWER(email) HAVING COUNT(*) > 1
+            """).fetchall()
+
+            if duplicates:
+                cur.execute(f"CREATE INDEX IF NOT EXISTS {index} ON {table}(LOWER(email))")
+                print(f"⚠️ {table}: {len(duplicates)} email(s) differ only by case, created non-unique {index}")
+                for email, count in duplicates:
+                    print(f"     {email} ({count} rows)")
+            else:
+                cur.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {index} ON {table}(LOWER(email))")
+                print(f"✅ Created {index}")
+
+        con.commit()
+        print("\n✅ Migration completed successfully!")
+
+    except Exception as e:
+        print(f"❌ Error during migration: {e}")
+        con.rollback()
+    finally:
+        con.close()
+
+
+if __name__ == "__main__":
+    migrate_email_indexes()
@@ -0,0 +1,68 @@
+"""
+Migration script to create the email_outbox table.
+
+Outgoing mail (OTP emails) is written to email_outbox in the same
+transaction as the change that needs it, and a background sender
+(backend/mailer.py) delivers it. A request never waits on SMTP, and a
+message is never lost because the mail server was down when it was queued.
+
+    status          'pending' -> 'sending' -> 'sent'
+                    'pending' <- 'sending'  (retry after a transient error)
+                    'failed'                (permanent error or out of attempts)
+    next_attempt_at when the row is next due; for 'sending' rows, when the
+                    claim expires and another sender may pick it up again
+    body            cleared ('') once the row is 'sent' or 'failed'; OTP
+                    mails must not keep the plaintext code
+
+Safe to run more than once.
+
+Usage:
+    python migrate_email_outbox.py
+"""
+
+import sqlite3
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DB_PATH = BASE_DIR / "database" / "ruet.db"
+
+EMAIL_OUTBOX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS email_outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    to_addr TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    body TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',     -- 'pending', 'sending', 'sent', 'failed'
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at TEXT NOT NULL,              -- UTC ISO timestamp
+    last_error TEXT,
+    created_at TEXT NOT NULL,
+    sent_at TEXT
+);
+
+-- the sender's "what is due now" scan
+CREATE INDEX IF NOT EXISTS idx_outbox_due ON email_outbox(status, next_attempt_at);
+"""
+
+
+def migrate_email_outbox(db_path=DB_PATH):
+    """Create email_outbox and its index."""
+    con = sqlite3.connect(db_path)
+    cur = con.cursor()
+
+    try:
+        cur.executescript(EMAIL_OUTBOX_SCHEMA)
+        print("✅ Created email_outbox table and idx_outbox_due index")
+
+        con.commit()
+        print("\n✅ Migration completed successfully!")
+
+    except Exception as e:
+        print(f"❌ Error during migration: {e}")
+        con.rollback()
+    finally:
+        con.close()
+
+
+if __name__ == "__main__":
+    migrate_email_outbox()
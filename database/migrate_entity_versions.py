@@ -0,0 +1,140 @@
+"""
+Migration script to create entity_versions and the triggers that bump it.
+
+entity_versions holds a change counter per student and per hall, plus one
+'global' counter for the small directory tables (halls, departments,
+payment_accounts) whose names show up in both. Any insert, update or delete
+that can change what a student's or a hall's pages show bumps the matching
+counter, so the API can answer conditional GETs (ETag / If-None-Match) with
+304 Not Modified from a single primary-key read.
+
+    student <id>   students row, hall_dues, department_dues, library_fines
+    hall <id>      rooms, room_allocations, hall_dues, hall_monthly_fees,
+                   and the name of any student allocated to the hall or
+                   with dues in it
+    global ''      halls, departments, payment_accounts
+
+Safe to run more than once.
+
+Usage:
+    python migrate_entity_versions.py
+"""
+
+import sqlite3
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DB_PATH = BASE_DIR / "database" / "ruet.db"
+
+
+def _bump(entity_type, entity_id):
+    """Trigger statement that adds 1 to one counter, creating it if needed."""
+    return f"""
+    INSERT INTO entity_versions (entity_type, entity_id, version) VALUES ('{entity_type}', {entity_id}, 1)
+    ON CONFLICT(entity_type, entity_id) DO UPDATE SET version = version + 1;"""
+
+
+def _triggers(table, name, bumps_new, bumps_old):
+    """AFTER INSERT / UPDATE / DELETE triggers on `table` running the given bumps."""
+    insert = "".join(bumps_new)
+    update = "".join(dict.fromkeys(bumps_new + bumps_old))
+    delete = "".join(bumps_old)
+    return f"""
+CREATE TRIGGER IF NOT EXISTS trg_versions_{name}_insert
+AFTER INSERT ON {table}
+BEGIN{insert}
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_versions_{name}_update
+AFTER UPDATE ON {table}
+BEGIN{update}
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_versions_{name}_delete
+AFTER DELETE ON {table}
+BEGIN{delete}
+END;
+"""
+
+
+def _global_triggers(table):
+    return _triggers(table, table, [_bump("global", "''")], [_bump("global", "''")])
+
+
+ENTITY_VERSIONS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entity_versions (
+    entity_type TEXT NOT NULL,      -- 'student', 'hall' or 'global'
+    entity_id TEXT NOT NULL,        -- students.id / halls.id ('' for global)
+    version INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (entity_type, entity_id)
+) WITHOUT ROWID;
+""" + _triggers(
+    "students", "student",
+    [_bump("student", "NEW.id")],
+    [_bump("student", "OLD.id")],
+) + """
+-- a student's name is listed on the hall's allocation and dues pages: bump
+-- the hall they live in and every hall still listing dues of theirs (past
+-- residents included). Dropped first so re-running this script upgrades it.
+DROP TRIGGER IF EXISTS trg_versions_student_name;
+
+CREATE TRIGGER IF NOT EXISTS trg_versions_student_name
+AFTER UPDATE OF name ON students
+WHEN OLD.name IS NOT NEW.name
+BEGIN
+    INSERT INTO entity_versions (entity_type, entity_id, version)
+    SELECT 'hall', hall_id, 1 FROM (
+        SELECT hall_id FROM room_allocations WHERE student_id = NEW.id
+        UNION
+        SELECT hall_id FROM hall_dues WHERE student_id = NEW.id
+    ) WHERE true
+    ON CONFLICT(entity_type, entity_id) DO UPDATE SET version = version + 1;
+END;
+""" + _triggers(
+    "hall_dues", "hall_due",
+    [_bump("student", "NEW.student_id"), _bump("hall", "NEW.hall_id")],
+    [_bump("student", "OLD.student_id"), _bump("hall", "OLD.hall_id")],
+) + _triggers(
+    "department_dues", "dept_due",
+    [_bump("student", "NEW.student_id")],
+    [_bump("student", "OLD.student_id")],
+) + _triggers(
+    "library_fines", "library_fine",
+    [_bump("student", "NEW.student_id")],
+    [_bump("student", "OLD.student_id")],
+) + _triggers(
+    "rooms", "room",
+    [_bump("hall", "NEW.hall_id")],
+    [_bump("hall", "OLD.hall_id")],
+) + _triggers(
+    "room_allocations", "allocation",
+    [_bump("hall", "NEW.hall_id")],
+    [_bump("hall", "OLD.hall_id")],
+) + _triggers(
+    "hall_monthly_fees", "monthly_fee",
+    [_bump("hall", "NEW.hall_id")],
+    [_bump("hall", "OLD.hall_id")],
+) + _global_triggers("halls") + _global_triggers("departments") + _global_triggers("payment_accounts")
+
+
+def migrate_entity_versions(db_path=DB_PATH):
+    """Create entity_versions and its triggers."""
+    con = sqlite3.connect(db_path)
+    cur = con.cursor()
+
+    try:
+        cur.executescript(ENTITY_VERSIONS_SCHEMA)
+        print("✅ Created entity_versions table and triggers")
+
+        con.commit()
+        print("\n✅ Migration completed successfully!")
+
+    except Exception as e:
+        print(f"❌ Error during migration: {e}")
+        con.rollback()
+    finally:
+        con.close()
+
+
+if __name__ == "__main__":
+    migrate_entity_versions()
@@ -0,0 +1,49 @@
+"""
+Migration script for keyset-paged hall dues (/api/hall/dues, /api/hall/dues/search).
+
+    idx_dues_hall_month   hall_dues(hall_id, month DESC, student_id)
+        Matches the listing order exactly, so a page is an index seek to the
+        cursor followed by LIMIT rows, whatever the size of the hall's history.
+
+    idx_dues_hall         dropped: hall_id is a prefix of the new index.
+
+Safe to run more than once.
+
+Usage:
+    python migrate_hall_dues_index.py
+"""
+
+import sqlite3
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DB_PATH = BASE_DIR / "database" / "ruet.db"
+
+
+def migrate_hall_dues_index(db_path=DB_PATH):
+    """Create the hall dues listing index and drop the one it replaces."""
+    con = sqlite3.connect(db_path)
+    cur = con.cursor()
+
+    try:
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_dues_hall_month
+            ON hall_dues(hall_id, month DESC, student_id)
+        """)
+        print("✅ Created idx_dues_hall_month")
+
+        cur.execute("DROP INDEX IF EXISTS idx_dues_hall")
+        print("✅ Dropped idx_dues_hall")
+
+        con.commit()
+        print("\n✅ Migration completed successfully!")
+
+    except Exception as e:
+        print(f"❌ Error during migration: {e}")
+        con.rollback()
+    finally:
+        con.close()
+
+
+if __name__ == "__main__":
+    migrate_hall_dues_index()
@@ -0,0 +1,215 @@
+"""
+Migration script to create the hall_stats table and the triggers that keep it exact.
+
+hall_stats holds one row per hall with the numbers the hall dashboard shows
+(total rooms, allocated seats, students with unpaid dues, current monthly fee),
+so /api/hall/render is a single primary-key read instead of four aggregates.
+
+The counters are maintained by triggers on rooms, room_allocations, hall_dues
+and hall_monthly_fees, and backfilled from the existing rows when this runs.
+Safe to run more than once.
+
+Usage:
+    python migrate_hall_stats.py
+"""
+
+import sqlite3
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DB_PATH = BASE_DIR / "database" / "ruet.db"
+
+
+HALL_STATS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS hall_stats (
+    hall_id INTEGER PRIMARY KEY,
+    total_rooms INTEGER NOT NULL DEFAULT 0,
+    allocated_seats INTEGER NOT NULL DEFAULT 0,
+    unpaid_students INTEGER NOT NULL DEFAULT 0,   -- distinct students with an unpaid hall due
+    monthly_fee INTEGER NOT NULL DEFAULT 0,       -- amount of the latest hall_monthly_fees row
+    fee_month TEXT                                -- month of that row (YYYY-MM)
+);
+
+-- halls
+CREATE TRIGGER IF NOT EXISTS trg_hall_stats_hall_insert
+AFTER INSERT ON halls
+BEGIN
+    INSERT OR IGNORE INTO hall_stats (hall_id) VALUES (NEW.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_hall_stats_hall_delete
+AFTER DELETE ON halls
+BEGIN
+    DELETE FROM hall_stats WHERE hall_id = OLD.id;
+END;
+
+-- rooms -> total_rooms
+CREATE TRIGGER IF NOT EXISTS trg_hall_stats_room_insert
+AFTER INSERT ON rooms
+BEGIN
+    INSERT OR IGNORE INTO hall_stats (hall_id) VALUES (NEW.hall_id);
+    UPDATE hall_stats SET total_rooms = total_rooms + 1 WHERE hall_id = NEW.hall_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_hall_stats_room_delete
+AFTER DELETE ON rooms
+BEGIN
+    UPDATE hall_stats SET total_rooms = total_rooms - 1 WHERE hall_id = OLD.hall_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_hall_stats_room_move
+AFTER UPDATE OF hall_id ON rooms
+WHEN OLD.hall_id IS NOT NEW.hall_id
+BEGIN
+    INSERT OR IGNORE INTO hall_stats (hall_id) VALUES (NEW.hall_id);
+    UPDATE hall_stats SET total_rooms = total_rooms - 1 WHERE hall_id = OLD.hall_id;
+    UPDATE hall_stats SET total_rooms = total_rooms + 1 WHERE hall_id = NEW.hall_id;
+END;
+
+-- room_allocations -> allocated_seats
+CREATE TRIGGER IF NOT EXISTS trg_hall_stats_alloc_insert
+AFTER INSERT ON room_allocations
+BEGIN
+    INSERT OR IGNORE INTO hall_stats (hall_id) VALUES (NEW.hall_id);
+    UPDATE hall_stats SET allocated_seats = allocated_seats + 1 WHERE hall_id = NEW.hall_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_hall_stats_alloc_delete
+AFTER DELETE ON room_allocations
+BEGIN
+    UPDATE hall_stats SET allocated_seats = allocated_seats - 1 WHERE hall_id = OLD.hall_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_hall_stats_alloc_move
+AFTER UPDATE OF hall_id ON room_allocations
+WHEN OLD.hall_id IS NOT NEW.hall_id
+BEGIN
+    INSERT OR IGNORE INTO hall_stats (hall_id) VALUES (NEW.hall_id);
+    UPDATE hall_stats SET allocated_seats = allocated_seats - 1 WHERE hall_id = OLD.hall_id;
+    UPDATE hall_stats SET allocated_seats = allocated_seats + 1 WHERE hall_id = NEW.hall_id;
+END;
+
+-- hall_dues -> unpaid_students (a student counts once per hall, however many unpaid months)
+-- The "other unpaid dues" lookups must seek by student_id: "+hall_id" keeps
+-- SQLite off the hall_id indexes, which would scan the whole hall's history
+-- on every insert. Dropped first so re-running this script upgrades them.
+DROP TRIGGER IF EXISTS trg_hall_stats_due_insert;
+DROP TRIGGER IF EXISTS trg_hall_stats_due_delete;
+DROP TRIGGER IF EXISTS trg_hall_stats_due_update;
+
+CREATE TRIGGER IF NOT EXISTS trg_hall_stats_due_insert
+AFTER INSERT ON hall_dues
+WHEN NEW.status = 'unpaid'
+BEGIN
+    INSERT OR IGNORE INTO hall_stats (hall_id) VALUES (NEW.hall_id);
+    UPDATE hall_stats SET unpaid_students = unpaid_students + 1
+    WHERE hall_id = NEW.hall_id
+      AND NOT EXISTS (
+          SELECT 1 FROM hall_dues
+          WHERE student_id = NEW.student_id AND +hall_id = NEW.hall_id
+            AND status = 'unpaid' AND id <> NEW.id
+      );
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_hall_stats_due_delete
+AFTER DELETE ON hall_dues
+WHEN OLD.status = 'unpaid'
+BEGIN
+    UPDATE hall_stats SET unpaid_students = unpaid_students - 1
+    WHERE hall_id = OLD.hall_id
+      AND NOT EXISTS (
+          SELECT 1 FROM hall_dues
+          WHERE student_id = OLD.student_id AND +hall_id = OLD.hall_id AND status = 'unpaid'
+      );
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_hall_stats_due_update
+AFTER UPDATE OF status, hall_id, student_id ON hall_dues
+BEGIN
+    INSERT OR IGNORE INTO hall_stats (hall_id) VALUES (NEW.hall_id);
+    -- the old (hall, student) pair stops counting if nothing unpaid is left
+    UPDATE hall_stats SET unpaid_students = unpaid_students - 1
+    WHERE OLD.status = 'unpaid'
+      AND hall_id = OLD.hall_id
+      AND NOT EXISTS (
+          SELECT 1 FROM hall_dues
+          WHERE student_id = OLD.student_id AND +hall_id = OLD.hall_id AND status = 'unpaid'
+      );
+    -- the new pair starts counting if it wasn't counted before this update
+    UPDATE hall_stats SET unpaid_students = unpaid_students + 1
+    WHERE NEW.status = 'unpaid'
+      AND hall_id = NEW.hall_id
+      AND NOT (OLD.status = 'unpaid' AND OLD.hall_id = NEW.hall_id AND OLD.student_id = NEW.student_id)
+      AND NOT EXISTS (
+          SELECT 1 FROM hall_dues
+          WHERE student_id = NEW.student_id AND +hall_id = NEW.hall_id
+            AND status = 'unpaid' AND id <> NEW.id
+      );
+END;
+
+-- hall_monthly_fees -> monthly_fee / fee_month (latest month wins)
+CREATE TRIGGER IF NOT EXISTS trg_hall_stats_fee_insert
+AFTER INSERT ON hall_monthly_fees
+BEGIN
+    INSERT OR IGNORE INTO hall_stats (hall_id) VALUES (NEW.hall_id);
+    UPDATE hall_stats SET monthly_fee = NEW.amount, fee_month = NEW.month
+    WHERE hall_id = NEW.hall_id AND (fee_month IS NULL OR NEW.month >= fee_month);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_hall_stats_fee_update
+AFTER UPDATE ON hall_monthly_fees
+BEGIN
+    UPDATE hall_stats SET
+        monthly_fee = COALESCE((SELECT amount FROM hall_monthly_fees WHERE hall_id = hall_stats.hall_id ORDER BY month DESC LIMIT 1), 0),
+        fee_month = (SELECT MAX(month) FROM hall_monthly_fees WHERE hall_id = hall_stats.hall_id)
+    WHERE hall_id IN (OLD.hall_id, NEW.hall_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_hall_stats_fee_delete
+AFTER DELETE ON hall_monthly_fees
+BEGIN
+    UPDATE hall_stats SET
+        monthly_fee = COALESCE((SELECT amount FROM hall_monthly_fees WHERE hall_id = OLD.hall_id ORDER BY month DESC LIMIT 1), 0),
+        fee_month = (SELECT MAX(month) FROM hall_monthly_fees WHERE hall_id = OLD.hall_id)
+    WHERE hall_id = OLD.hall_id;
+END;
+"""
+
+
+BACKFILL_SQL = """
+INSERT OR REPLACE INTO hall_stats (hall_id, total_rooms, allocated_seats, unpaid_students, monthly_fee, fee_month)
+SELECT
+    h.id,
+    (SELECT COUNT(*) FROM rooms r WHERE r.hall_id = h.id),
+    (SELECT COUNT(*) FROM room_allocations ra WHERE ra.hall_id = h.id),
+    (SELECT COUNT(DISTINCT hd.student_id) FROM hall_dues hd WHERE hd.hall_id = h.id AND hd.status = 'unpaid'),
+    COALESCE((SELECT f.amount FROM hall_monthly_fees f WHERE f.hall_id = h.id ORDER BY f.month DESC LIMIT 1), 0),
+    (SELECT MAX(f.month) FROM hall_monthly_fees f WHERE f.hall_id = h.id)
+FROM halls h
+"""
+
+
+def migrate_hall_stats(db_path=DB_PATH):
+    """Create hall_stats + triggers and backfill the counters."""
+    con = sqlite3.connect(db_path)
+    cur = con.cursor()
+
+    try:
+        cur.executescript(HALL_STATS_SCHEMA)
+        print("✅ Created hall_stats table and triggers")
+
+        cur.execute(BACKFILL_SQL)
+        print(f"✅ Backfilled hall_stats for {cur.rowcount} hall(s)")
+
+        con.commit()
+        print("\n✅ Migration completed successfully!")
+
+    except Exception as e:
+        print(f"❌ Error during migration: {e}")
+        con.rollback()
+    finally:
+        con.close()
+
+
+if __name__ == "__main__":
+    migrate_hall_stats()
@@ -0,0 +1,92 @@
+"""
+Migration script for the librarian dashboard (/api/library/render).
+
+    idx_books_on_loan   books(issue_duration, issue_date) WHERE status <> 'available'
+        Partial index holding only books that are out on loan. The issued,
+        overdue and issued-today counters are one covering scan of it, and the
+        overdue list is a range seek on issue_duration. Available books (the
+        bulk of the catalogue) are not in it at all.
+
+    library_stats       single row (id = 1) with total_fine = SUM(students.library_fee)
+        Kept exact by triggers on students, so the dashboard no longer scans
+        every student to add up library fines.
+
+Safe to run more than once.
+
+Usage:
+    python migrate_library_stats.py
+"""
+
+import sqlite3
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DB_PATH = BASE_DIR / "database" / "ruet.db"
+
+
+LIBRARY_STATS_SCHEMA = """
+CREATE INDEX IF NOT EXISTS idx_books_on_loan
+ON books(issue_duration, issue_date)
+WHERE status <> 'available';
+
+CREATE TABLE IF NOT EXISTS library_stats (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    total_fine INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_library_stats_student_insert
+AFTER INSERT ON students
+WHEN COALESCE(NEW.library_fee, 0) <> 0
+BEGIN
+    UPDATE library_stats SET total_fine = total_fine + NEW.library_fee WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_library_stats_student_update
+AFTER UPDATE OF library_fee ON students
+WHEN COALESCE(NEW.library_fee, 0) <> COALESCE(OLD.library_fee, 0)
+BEGIN
+    UPDATE library_stats
+    SET total_fine = total_fine + COALESCE(NEW.library_fee, 0) - COALESCE(OLD.library_fee, 0)
+    WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_library_stats_student_delete
+AFTER DELETE ON students
+WHEN COALESCE(OLD.library_fee, 0) <> 0
+BEGIN
+    UPDATE library_stats SET total_fine = total_fine - OLD.library_fee WHERE id = 1;
+END;
+"""
+
+
+BACKFILL_SQL = """
+INSERT OR REPLACE INTO library_stats (id, total_fine)
+SELECT 1, COALESCE(SUM(library_fee), 0) FROM students
+"""
+
+
+def migrate_library_stats(db_path=DB_PATH):
+    """Create the on-loan index, library_stats + triggers, and backfill the fine total."""
+    con = sqlite3.connect(db_path)
+    cur = con.cursor()
+
+    try:
+        cur.executescript(LIBRARY_STATS_SCHEMA)
+        print("✅ Created idx_books_on_loan, library_stats table and triggers")
+
+        cur.execute(BACKFILL_SQL)
+        total = cur.execute("SELECT total_fine FROM library_stats WHERE id = 1").fetchone()[0]
+        print(f"✅ Backfilled library_stats (total_fine = {total})")
+
+        con.commit()
+        print("\n✅ Migration completed successfully!")
+
+    except Exception as e:
+        print(f"❌ Error during migration: {e}")
+        con.rollback()
+    finally:
+        con.close()
+
+
+if __name__ == "__main__":
+    migrate_library_stats()
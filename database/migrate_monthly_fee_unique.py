@@ -0,0 +1,55 @@
+"""
+Migration script to make (hall_id, month) unique in hall_monthly_fees.
+
+    idx_fees_hall_month   UNIQUE hall_monthly_fees(hall_id, month)
+        A hall has one fee per month. With the constraint in place fee
+        generation inserts with ON CONFLICT DO NOTHING instead of checking
+        for an existing row first.
+
+Duplicate (hall_id, month) rows left by the old check-then-insert code are
+removed first, keeping the oldest row of each pair (the one the dues were
+generated from). Safe to run more than once.
+
+Usage:
+    python migrate_monthly_fee_unique.py
+"""
+
+import sqlite3
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DB_PATH = BASE_DIR / "database" / "ruet.db"
+
+
+def migrate_monthly_fee_unique(db_path=DB_PATH):
+    """Drop duplicate monthly fees and add the UNIQUE(hall_id, month) index."""
+    con = sqlite3.connect(db_path)
+    cur = con.cursor()
+
+    try:
+        cur.execute("""
+            DELETE FROM hall_monthly_fees
+            WHERE id NOT IN (
+                SELECT MIN(id) FROM hall_monthly_fees GROUP BY hall_id, month
+            )
+        """)
+        print(f"✅ Removed {cur.rowcount} duplicate monthly fee(s)")
+
+        cur.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_fees_hall_month
+            ON hall_monthly_fees(hall_id, month)
+        """)
+        print("✅ Created idx_fees_hall_month")
+
+        con.commit()
+        print("\n✅ Migration completed successfully!")
+
+    except Exception as e:
+        print(f"❌ Error during migration: {e}")
+        con.rollback()
+    finally:
+        con.close()
+
+
+if __name__ == "__main__":
+    migrate_monthly_fee_unique()
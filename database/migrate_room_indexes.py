@@ -0,0 +1,53 @@
+"""
+Migration script to add the indexes behind the one-query room inventory.
+
+    idx_rooms_hall_number   rooms(hall_id, CAST(room_number AS INTEGER), room_number)
+        Rooms of a hall come out of the index already in numeric room order,
+        so ORDER BY CAST(room_number AS INTEGER) needs no temp B-tree sort.
+
+    idx_allocations_room    room_allocations(room_id, allocation_date)
+        Occupants are joined per room by index seek, oldest allocation first.
+
+Safe to run more than once.
+
+Usage:
+    python migrate_room_indexes.py
+"""
+
+import sqlite3
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DB_PATH = BASE_DIR / "database" / "ruet.db"
+
+
+def migrate_room_indexes(db_path=DB_PATH):
+    """Create the room inventory indexes."""
+    con = sqlite3.connect(db_path)
+    cur = con.cursor()
+
+    try:
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_rooms_hall_number
+            ON rooms(hall_id, CAST(room_number AS INTEGER), room_number)
+        """)
+        print("✅ Created idx_rooms_hall_number")
+
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_allocations_room
+            ON room_allocations(room_id, allocation_date)
+        """)
+        print("✅ Created idx_allocations_room")
+
+        con.commit()
+        print("\n✅ Migration completed successfully!")
+
+    except Exception as e:
+        print(f"❌ Error during migration: {e}")
+        con.rollback()
+    finally:
+        con.close()
+
+
+if __name__ == "__main__":
+    migrate_room_indexes()
@@ -2,6 +2,10 @@
 """
 Setup hall managers for all RUET halls
 Run this to initialize all RUET halls in the database
+
+A running server resolves a new hall once it is first looked up (within
+DIRECTORY_MISS_RELOAD_SECONDS); POST /api/debug/directories to refresh
+its hall directory right away.
 """
 
 import sqlite3
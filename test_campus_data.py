@@ -0,0 +1,133 @@
+"""
+Test: synthetic campus data (database/generate_campus_data.py).
+
+Generates a small campus twice with the same seed and once with another,
+then checks:
+  - the same seed gives a byte-identical database, another seed doesn't
+  - the exact number of students, with roll-derived ids and departments
+  - foreign keys hold; rooms are never over capacity and occupied_seats
+    matches the allocations
+  - the trigger-kept hall_stats / library_stats and the students' fee
+    totals agree with the rows they summarise
+  - the app runs on it: a generated student logs in and sees their dues,
+    a hall manager and the librarian get their dashboards, and the next
+    book id the library hands out is free (ids past 4 digits)
+
+Usage:
+    python test_campus_data.py
+"""
+
+import filecmp
+import re
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BASE_DIR / "backend"))
+sys.path.insert(0, str(BASE_DIR))
+
+from database.accounts_manager import DEPT_CODES  # noqa: E402
+from database.generate_campus_data import generate_campus_data  # noqa: E402
+
+STUDENTS = 3000
+SIZES = {"students": STUDENTS, "books": 12000, "floors": 2, "rooms_per_floor": 10}
+
+
+def main():
+    failures = 0
+
+    def check(ok, label):
+        nonlocal failures
+        print(f"{'✅' if ok else '❌'} {label}")
+        failures += 0 if ok else 1
+
+    with tempfile.TemporaryDirectory() as tmp:
+        first, again, other = (Path(tmp) / name for name in ("first.db", "again.db", "other.db"))
+        counts = generate_campus_data(first, seed=11, **SIZES)
+        generate_campus_data(again, seed=11, **SIZES)
+        generate_campus_data(other, seed=12, **SIZES)
+        print(f"generated in {counts.pop('seconds')} s: {counts}\n")
+
+        check(filecmp.cmp(first, again, shallow=False), "same seed: identical file")
+        check(not filecmp.cmp(first, other, shallow=False), "other seed: different data")
+
+        con = sqlite3.connect(first)
+        ids = con.execute("SELECT id, dept FROM students").fetchall()
+        check(len(ids) == STUDENTS, f"{len(ids)} students")
+        bad = [(sid, dept) for sid, dept in ids
+               if not re.fullmatch(r"\d{7}", sid) or DEPT_CODES.get(sid[2:4]) != dept]
+        check(not bad, f"roll ids match their department {bad[:3]}")
+        check(len({sid[2:4] for sid, _ in ids}) == len(DEPT_CODES), "all departments have students")
+
+        check(not con.execute("PRAGMA foreign_key_check").fetchall(), "foreign keys hold")
+        check(con.execute("""
+            SELECT COUNT(*) FROM rooms r
+            WHERE r.occupied_seats > r.capacity
+               OR r.occupied_seats <> (SELECT COUNT(*) FROM room_allocations ra WHERE ra.room_id = r.id)
+        """).fetchone()[0] == 0, "occupied_seats matches allocations, within capacity")
+
+        check(con.execute("""
+            SELECT COUNT(*) FROM hall_stats hs JOIN halls h ON h.id = hs.hall_id
+            WHERE hs.total_rooms <> (SELECT COUNT(*) FROM rooms WHERE hall_id = h.id)
+               OR hs.allocated_seats <> (SELECT COUNT(*) FROM room_allocations WHERE hall_id = h.id)
+               OR hs.unpaid_students <> (SELECT COUNT(DISTINCT student_id) FROM hall_dues
+                                         WHERE hall_id = h.id AND status = 'unpaid')
+        """).fetchone()[0] == 0, "hall_stats agrees with rooms, allocations and dues")
+        check(con.execute("SELECT total_fine FROM library_stats").fetchone()[0]
+              == con.execute("SELECT SUM(library_fee) FROM students").fetchone()[0], "library_stats total")
+        check(con.execute("""
+            SELECT COUNT(*) FROM students s
+            WHERE s.hall_fee <> (SELECT COALESCE(SUM(amount), 0) FROM hall_dues
+                                 WHERE student_id = s.id AND status = 'unpaid')
+               OR s.dept_fee <> (SELECT COALESCE(SUM(amount), 0) FROM department_dues
+                                 WHERE student_id = s.id AND status = 'unpaid')
+               OR s.library_fee <> (SELECT COALESCE(SUM(amount), 0) FROM library_fines
+                                    WHERE student_id = s.id AND status = 'unpaid')
+        """).fetchone()[0] == 0, "students' fee totals are their unpaid dues")
+
+        resident = con.execute("""
+            SELECT s.id, h.email FROM students s JOIN room_allocations ra ON ra.student_id = s.id
+            JOIN halls h ON h.id = ra.hall_id ORDER BY s.id LIMIT 1
+        """).fetchone()
+        librarian = con.execute("SELECT email FROM librarians LIMIT 1").fetchone()[0]
+        book_ids = {row[0] for row in con.execute("SELECT id FROM books")}
+        con.close()
+
+        import app as app_module
+        from database import accounts_manager
+
+        app_module.DB_PATH = first
+        accounts_manager.DB_PATH = first
+        client = app_module.app.test_client()
+        try:
+            res = client.post("/api/auth/login", json={"email": f"{resident[0]}@student.ruet.ac.bd",
+                                                       "password": "student123"})
+            check(res.status_code == 200, f"student {resident[0]} logs in: {res.status_code}")
+            auth = {"Authorization": f"Bearer {res.get_json().get('token')}"}
+            res = client.get("/api/student/hall-fees", headers=auth)
+            check(res.status_code == 200 and res.get_json(), "student sees their hall dues")
+
+            hall = app_module.hall_directory.by_email(resident[1])
+            dashboards = [
+                ("hall manager", "/api/hall/render", app_module.issue_token(
+                    "hall_manager", resident[1], hall_id=hall["id"], hall_name=hall["hall_name"])),
+                ("librarian", "/api/library/render", app_module.issue_token("librarian", librarian)),
+            ]
+            for label, url, token in dashboards:
+                res = client.get(url, headers={"Authorization": f"Bearer {token}"})
+                check(res.status_code == 200, f"{label} dashboard: {res.get_data(as_text=True)[:90]}")
+
+            res = client.get("/api/library/next-book-id", headers={"Authorization": f"Bearer {dashboards[1][2]}"})
+            next_id = res.get_json()["bookId"]
+            check(next_id not in book_ids and next_id == f"BK-{len(book_ids) + 1}", f"next book id is free: {next_id}")
+        finally:
+            app_module.outbox.stop()
+
+    print("\n✅ All checks passed" if failures == 0 else f"\n❌ {failures} check(s) failed")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
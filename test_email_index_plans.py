@@ -0,0 +1,140 @@
+"""
+Test: every auth email lookup is an index seek, not a table scan.
+
+Runs migrate_email_indexes on a scratch copy of database/ruet.db, adds
+30,000 students, then drives register, resend-otp, verify-otp and login
+(student, hall manager, department officer, librarian) through Flask's
+test client. Every statement the handlers send with LOWER(email) is
+captured and put through EXPLAIN QUERY PLAN, which must show
+SEARCH ... USING INDEX idx_<table>_email_lower.
+
+Also prints the student login lookup time with and without the index.
+
+Usage:
+    python test_email_index_plans.py
+"""
+
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import bcrypt
+
+BASE_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BASE_DIR / "backend"))
+sys.path.insert(0, str(BASE_DIR))
+
+import app as app_module  # noqa: E402
+from database import accounts_manager  # noqa: E402
+from database.migrate_email_indexes import EMAIL_TABLES, migrate_email_indexes  # noqa: E402
+
+STUDENTS = 30_000
+PASSWORD = "plan-test"
+LOOKUP = "SELECT id, name, password_hash, verified FROM students WHERE LOWER(email)=LOWER(?)"
+
+
+def prepare(db_path: Path):
+    migrate_email_indexes(db_path)
+    password_hash = bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(4)).decode()
+    con = sqlite3.connect(db_path)
+    con.executemany(
+        "INSERT INTO students (id, name, email, password_hash, verified, dept) VALUES (?, ?, ?, ?, 1, 'CSE')",
+        [(f"24{n:05d}", f"Plan Student {n}", f"24{n:05d}@student.ruet.ac.bd", password_hash) for n in range(STUDENTS)],
+    )
+    accounts = {}
+    for table in ("halls", "departments", "librarians"):
+        email = con.execute(f"SELECT email FROM {table} ORDER BY email LIMIT 1").fetchone()[0]
+        con.execute(f"UPDATE {table} SET password_hash = ? WHERE email = ?", (password_hash, email))
+        accounts[table] = email
+    con.commit()
+    con.close()
+    return accounts
+
+
+def lookup_ms(db_path: Path, email: str, runs: int = 200) -> float:
+    con = sqlite3.connect(db_path)
+    started = time.perf_counter()
+    for _ in range(runs):
+        con.execute(LOOKUP, (email,)).fetchall()
+    con.close()
+    return (time.perf_counter() - started) * 1000 / runs
+
+
+def main():
+    failures = 0
+
+    def check(ok, label):
+        nonlocal failures
+        print(f"{'✅' if ok else '❌'} {label}")
+        failures += 0 if ok else 1
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "test.db"
+        shutil.copy(BASE_DIR / "database" / "ruet.db", db_path)
+        accounts = prepare(db_path)
+        print()
+
+        app_module.DB_PATH = db_path
+        accounts_manager.DB_PATH = db_path
+        client = app_module.app.test_client()
+
+        statements = []
+        original_get_db = app_module.get_db
+
+        def tracing_get_db(*args, **kwargs):
+            con = original_get_db(*args, **kwargs)
+            con.set_trace_callback(statements.append)
+            return con
+
+        app_module.get_db = tracing_get_db
+        try:
+            new_email = "2103555@student.ruet.ac.bd"
+            calls = [
+                ("register", lambda: client.post("/api/auth/register", data={
+                    "studentId": "2103555", "email": new_email.upper(), "name": "Plan", "password": PASSWORD})),
+                ("resend-otp", lambda: client.post("/api/auth/resend-otp", json={"email": new_email})),
+                ("verify-otp", lambda: client.post("/api/auth/verify-otp", json={"email": new_email, "otp": "000000"})),
+                ("student login", lambda: client.post("/api/auth/login", json={
+                    "email": "2412345@STUDENT.ruet.ac.bd", "password": PASSWORD})),
+                ("hall login", lambda: client.post("/api/auth/login", json={
+                    "email": accounts["halls"], "password": PASSWORD})),
+                ("department login", lambda: client.post("/api/auth/login", json={
+                    "email": accounts["departments"], "password": PASSWORD})),
+                ("librarian login", lambda: client.post("/api/auth/login", json={
+                    "email": accounts["librarians"], "password": PASSWORD})),
+            ]
+            plan_con = sqlite3.connect(db_path)
+            for label, call in calls:
+                statements.clear()
+                res = call()
+                lookups = [sql for sql in statements if "LOWER(email)" in sql]
+                check(res.status_code < 500 and lookups, f"{label}: {res.status_code}, {len(lookups)} email lookup(s)")
+                for sql in lookups:
+                    plan = " / ".join(row[3] for row in plan_con.execute("EXPLAIN QUERY PLAN " + sql))
+                    seek = "USING INDEX idx_" in plan and "_email_lower" in plan and "SCAN" not in plan
+                    check(seek, f"    {plan}")
+            plan_con.close()
+        finally:
+            app_module.get_db = original_get_db
+            app_module.outbox.stop()
+
+        email = "2429999@student.ruet.ac.bd"
+        indexed = lookup_ms(db_path, email)
+        con = sqlite3.connect(db_path)
+        for table in EMAIL_TABLES:
+            con.execute(f"DROP INDEX idx_{table}_email_lower")
+        con.commit()
+        con.close()
+        scanned = lookup_ms(db_path, email)
+        print(f"\nstudent login lookup over {STUDENTS:,} extra rows: "
+              f"{scanned:.3f} ms scan -> {indexed:.3f} ms index seek")
+
+    print("\n✅ All checks passed" if failures == 0 else f"\n❌ {failures} check(s) failed")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Test: email outbox and background sender against a local SMTP stand-in.
+
+Runs the app through Flask's test client on a scratch copy of
+database/ruet.db, with SMTP pointed at an aiosmtpd server on localhost:
+
+  1. register / resend-otp return without touching SMTP (server down)
+  2. once the server is up the queued OTPs are delivered, all over one
+     reused connection
+  3. a server that stays down opens the circuit breaker, rows go back to
+     'pending' with a backoff, and delivery resumes after the cooldown
+  4. a 5xx recipient rejection marks the row 'failed' without retries
+  5. rows that reach 'sent' or 'failed' no longer keep the OTP body
+
+Requires:  pip install aiosmtpd
+
+Usage:
+    python test_email_outbox.py
+"""
+
+import os
+import re
+import shutil
+import socket
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+try:
+    from aiosmtpd.controller import Controller
+except ImportError:
+    print("⚠️ aiosmtpd is not installed (pip install aiosmtpd); skipping")
+    sys.exit(0)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+SMTP_PORT = free_port()
+os.environ.update({
+    "SMTP_HOST": "127.0.0.1",
+    "SMTP_PORT": str(SMTP_PORT),
+    "SMTP_STARTTLS": "0",
+    "SMTP_TIMEOUT": "2",
+    "MAIL_POLL_SECONDS": "0.2",
+    "MAIL_BACKOFF_BASE_SECONDS": "0.2",
+    "MAIL_BACKOFF_MAX_SECONDS": "1",
+    "MAIL_BREAKER_THRESHOLD": "2",
+    "MAIL_BREAKER_COOLDOWN_SECONDS": "1",
+})
+os.environ.pop("EMAIL_USER", None)
+os.environ.pop("EMAIL_PASS", None)
+
+BASE_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BASE_DIR / "backend"))
+sys.path.insert(0, str(BASE_DIR))
+
+import app as app_module  # noqa: E402
+from database import accounts_manager  # noqa: E402
+
+
+class Inbox:
+    """aiosmtpd handler that keeps every message and rejects reject-* recipients."""
+
+    def __init__(self):
+        self.messages = []
+        self.sessions = set()
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith("reject"):
+            return "550 5.1.1 No such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.sessions.add(id(session))
+        self.messages.append((envelope.rcpt_tos[0], envelope.content.decode("utf-8", "replace")))
+        return "250 Message accepted for delivery"
+
+
+def wait_for(check, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if check():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def outbox_rows(db):
+    import sqlite3
+    con = sqlite3.connect(db)
+    rows = con.execute("SELECT to_addr, status, attempts, last_error, body FROM email_outbox ORDER BY id").fetchall()
+    con.close()
+    return rows
+
+
+def register(client, student_id):
+    started = time.perf_counter()
+    res = client.post("/api/auth/register", data={
+        "studentId": student_id,
+        "email": f"{student_id}@student.ruet.ac.bd",
+        "name": f"Outbox Test {student_id}",
+        "password": "secret123",
+    })
+    return res, (time.perf_counter() - started) * 1000
+
+
+def main():
+    failures = 0
+
+    def check(ok, label):
+        nonlocal failures
+        print(f"{'✅' if ok else '❌'} {label}")
+        failures += 0 if ok else 1
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Path(tmp) / "test.db"
+        shutil.copy(BASE_DIR / "database" / "ruet.db", db)
+        app_module.DB_PATH = db
+        accounts_manager.DB_PATH = db
+        client = app_module.app.test_client()
+        outbox = app_module.outbox
+        inbox = Inbox()
+
+        # 1. SMTP down: the handlers still answer immediately
+        res, ms = register(client, "2103901")
+        check(res.status_code == 200, f"register with SMTP down -> {res.status_code} in {ms:.0f} ms")
+        res = client.post("/api/auth/resend-otp", json={"email": "2103901@student.ruet.ac.bd"})
+        check(res.status_code == 200, f"resend-otp with SMTP down -> {res.status_code}")
+        check(wait_for(lambda: outbox.breaker.state == "open"), "breaker opens after repeated connection failures")
+        check(wait_for(lambda: all(r[1] == "pending" for r in outbox_rows(db))), "queued rows stay pending for a retry")
+
+        # 2. server comes up: everything queued is delivered over one connection
+        controller = Controller(inbox, hostname="127.0.0.1", port=SMTP_PORT)
+        controller.start()
+        try:
+            opened_before = outbox.stats()["connections_opened"]
+            for n in range(2, 6):
+                register(client, f"21039{n:02d}")
+            check(wait_for(lambda: len(inbox.messages) == 6), f"all 6 OTP emails delivered ({len(inbox.messages)})")
+            check(all(r[1] == "sent" for r in outbox_rows(db)), "every outbox row is 'sent'")
+            opened = outbox.stats()["connections_opened"] - opened_before
+            check(opened == 1 and len(inbox.sessions) == 1, f"one SMTP connection reused ({opened} opened)")
+            check(bool(re.search(r"Your OTP is: \d{6}", inbox.messages[-1][1])), "message body carries the OTP")
+            check(all(r[4] == "" for r in outbox_rows(db)), "sent rows no longer keep the body")
+            check(outbox.breaker.state == "closed", "breaker closed again after a successful send")
+
+            # 4. permanent rejection: no retries
+            con = app_module.get_db(readonly=False)
+            app_module.enqueue_email(con.cursor(), "reject-me@student.ruet.ac.bd", "x", "x")
+            con.commit()
+            con.close()
+            outbox.wake()
+            check(wait_for(lambda: outbox_rows(db)[-1][1] == "failed"), "5xx rejection marks the row 'failed'")
+            check(outbox_rows(db)[-1][2] == 1, "rejected row was attempted once")
+            check(outbox_rows(db)[-1][4] == "", "failed row no longer keeps the body")
+        finally:
+            controller.stop()
+
+        # 3. server gone again: retry with backoff, then recover after the cooldown
+        register(client, "2103910")
+        check(wait_for(lambda: outbox.breaker.state == "open"), "breaker re-opens when the server disappears")
+        row = outbox_rows(db)[-1]
+        check(row[1] == "pending" and row[3] and row[4], f"row waits for a retry, body kept (last_error={row[3]!r})")
+
+        controller = Controller(inbox, hostname="127.0.0.1", port=SMTP_PORT)
+        controller.start()
+        try:
+            check(wait_for(lambda: outbox_rows(db)[-1][1] == "sent"), "delivered after the breaker cooldown")
+        finally:
+            controller.stop()
+            outbox.stop()
+
+        print(f"\nsender stats: {outbox.stats()}")
+
+    print("\n✅ All checks passed" if failures == 0 else f"\n❌ {failures} check(s) failed")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
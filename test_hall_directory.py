@@ -0,0 +1,109 @@
+"""
+Test: how stale the in-process hall directory can get (database/entity_directory.py).
+
+halls is only edited outside the app, so a worker's HallDirectory has to
+notice changes by itself. On a scratch copy of database/ruet.db, with
+short TTL / miss-reload intervals, checks that:
+  - a hall added by another connection resolves once the miss-reload
+    interval has passed (and not sooner)
+  - a renamed hall keeps its old name until the TTL, then only the new one
+  - invalidate() and POST /api/debug/directories make a change visible at once
+  - that endpoint refuses a remote caller without the admin token
+
+Usage:
+    python test_hall_directory.py
+"""
+
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BASE_DIR / "backend"))
+sys.path.insert(0, str(BASE_DIR))
+
+from database import entity_directory  # noqa: E402
+from database.entity_directory import HallDirectory  # noqa: E402
+
+TTL = 1.0
+MISS_RELOAD = 0.3
+
+
+def main():
+    failures = 0
+
+    def check(ok, label):
+        nonlocal failures
+        print(f"{'✅' if ok else '❌'} {label}")
+        failures += 0 if ok else 1
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Path(tmp) / "test.db"
+        shutil.copy(BASE_DIR / "database" / "ruet.db", db)
+
+        def connect():
+            con = sqlite3.connect(db)
+            con.row_factory = sqlite3.Row
+            return con
+
+        def edit(sql, params):
+            con = sqlite3.connect(db)
+            con.execute(sql, params)
+            con.commit()
+            con.close()
+
+        entity_directory.MISS_RELOAD_SECONDS = MISS_RELOAD
+        halls = HallDirectory(connect, ttl=TTL)
+        hall = halls.first()
+
+        # new hall: found by the miss reload, not before it is due
+        edit("INSERT INTO halls (email, hall_name, password_hash, total_rooms) VALUES (?, ?, '', 0)",
+             ("newhall@hall.ruet.ac.bd", "New Test Hall"))
+        check(halls.by_name("New Test Hall") is None, "new hall not seen right after the load")
+        time.sleep(MISS_RELOAD + 0.1)
+        check((halls.by_name("New Test Hall") or {}).get("email") == "newhall@hall.ruet.ac.bd",
+              f"new hall resolves after {MISS_RELOAD} s (miss reload)")
+
+        # rename: the old name resolves until the TTL runs out
+        halls.load()
+        edit("UPDATE halls SET hall_name = ? WHERE id = ?", ("Renamed Test Hall", hall["id"]))
+        check((halls.by_name(hall["hall_name"]) or {}).get("id") == hall["id"], "old name still resolves within the TTL")
+        time.sleep(TTL + 0.1)
+        check(halls.by_name(hall["hall_name"]) is None, f"old name gone after the {TTL} s TTL")
+        check((halls.by_id(hall["id"]) or {}).get("hall_name") == "Renamed Test Hall", "new name after the TTL")
+
+        # invalidate(): immediate
+        edit("UPDATE halls SET email = ? WHERE id = ?", ("moved@hall.ruet.ac.bd", hall["id"]))
+        halls.invalidate()
+        check((halls.by_id(hall["id"]) or {}).get("email") == "moved@hall.ruet.ac.bd", "invalidate(): change seen at once")
+
+        # the app's worker: POST /api/debug/directories
+        import app as app_module
+        from database import accounts_manager
+
+        app_module.DB_PATH = db
+        accounts_manager.DB_PATH = db
+        client = app_module.app.test_client()
+        try:
+            app_module.hall_directory.load()
+            edit("UPDATE halls SET hall_name = ? WHERE id = ?", ("Reloaded Test Hall", hall["id"]))
+            res = client.post("/api/debug/directories", environ_base={"REMOTE_ADDR": "10.1.2.3"})
+            check(res.status_code == 403, f"remote reload without the admin token refused: {res.status_code}")
+            check(app_module.hall_directory.by_id(hall["id"])["hall_name"] == "Renamed Test Hall",
+                  "worker still has the old snapshot")
+            res = client.post("/api/debug/directories")
+            check(res.status_code == 200, f"reload from loopback: {res.status_code}")
+            check(app_module.hall_directory.by_id(hall["id"])["hall_name"] == "Reloaded Test Hall",
+                  "worker sees the rename after the reload")
+        finally:
+            app_module.outbox.stop()
+
+    print("\n✅ All checks passed" if failures == 0 else f"\n❌ {failures} check(s) failed")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
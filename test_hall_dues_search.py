@@ -0,0 +1,93 @@
+"""
+Test: hall dues search by student id (GET /api/hall/dues?student_id=).
+
+On a scratch copy of database/ruet.db, through Flask's test client, with
+a hall manager token:
+  - a partial roll ("2203") returns every due whose student_id starts
+    with it, like the dashboard's old in-page search did
+  - a full roll returns only that student's dues
+  - the filtered result is the same paged with a small limit (cursor)
+    as in one page
+  - the prefix is a range on idx_dues_hall_month, not a scan
+
+Usage:
+    python test_hall_dues_search.py
+"""
+
+import shutil
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BASE_DIR / "backend"))
+sys.path.insert(0, str(BASE_DIR))
+
+import app as app_module  # noqa: E402
+from database import accounts_manager  # noqa: E402
+
+
+def main():
+    failures = 0
+
+    def check(ok, label):
+        nonlocal failures
+        print(f"{'✅' if ok else '❌'} {label}")
+        failures += 0 if ok else 1
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Path(tmp) / "test.db"
+        shutil.copy(BASE_DIR / "database" / "ruet.db", db)
+        app_module.DB_PATH = db
+        accounts_manager.DB_PATH = db
+        client = app_module.app.test_client()
+
+        con = sqlite3.connect(db)
+        hall_id, hall_name, email, student_id = con.execute("""
+            SELECT h.id, h.hall_name, h.email, hd.student_id
+            FROM hall_dues hd JOIN halls h ON h.id = hd.hall_id
+            GROUP BY h.id ORDER BY COUNT(*) DESC LIMIT 1
+        """).fetchone()
+        all_ids = [r[0] for r in con.execute("SELECT student_id FROM hall_dues WHERE hall_id = ?", (hall_id,))]
+        plan = con.execute("""
+            EXPLAIN QUERY PLAN SELECT id FROM hall_dues hd
+            WHERE hd.hall_id = ? AND hd.student_id >= ? AND hd.student_id < ?
+            ORDER BY hd.month DESC, hd.student_id
+        """, (hall_id, "2203", "2204")).fetchall()
+        con.close()
+
+        token = app_module.issue_token("hall_manager", email, hall_id=hall_id, hall_name=hall_name)
+        auth = {"Authorization": f"Bearer {token}"}
+
+        def search(student_id, limit=200):
+            dues, cursor = [], None
+            while True:
+                url = f"/api/hall/dues?student_id={student_id}&limit={limit}"
+                res = client.get(url + (f"&cursor={cursor}" if cursor else ""), headers=auth)
+                body = res.get_json()
+                dues += [d["student_id"] for d in body["dues"]]
+                cursor = body["next_cursor"]
+                if not cursor:
+                    return dues
+
+        try:
+            prefix = student_id[:4]
+            found = search(prefix)
+            expected = sorted(s for s in all_ids if s.startswith(prefix))
+            check(sorted(found) == expected and found, f"prefix {prefix}: {len(found)} of {len(expected)} dues")
+            found = search(student_id)
+            check(found and set(found) == {student_id}, f"full roll {student_id}: only that student ({len(found)} dues)")
+            check(search(prefix, limit=1) == search(prefix), "same result paged one by one")
+            check(search("9") == [], "no match for a prefix nobody has")
+            detail = " ".join(row[3] for row in plan)
+            check("idx_dues_hall_month" in detail and "SCAN" not in detail, f"plan: {detail}")
+        finally:
+            app_module.outbox.stop()
+
+    print("\n✅ All checks passed" if failures == 0 else f"\n❌ {failures} check(s) failed")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Test: /metrics adds up every worker process.
+
+Starts two worker processes that serve requests through the metrics hooks
+into a shared METRICS_DIR and exit (flushing their snapshot), then
+renders /metrics from this process and checks that the request counters,
+histogram counts and SQL statement counts of both workers are summed,
+that histogram buckets are cumulative and that trigger steps are not
+counted as extra statements. Collector counters of the exited workers
+still add up; their gauges no longer do.
+
+Usage:
+    python test_metrics.py
+"""
+
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BASE_DIR / "backend"))
+
+WORKER = r"""
+import sqlite3, sys
+sys.path.insert(0, sys.argv[1])
+from flask import Flask, jsonify
+import metrics
+
+app = Flask(__name__)
+metrics.init_metrics(app)
+metrics.register_collector(lambda: {"test_jobs_total": ("counter", "jobs", 7), "test_in_use": ("gauge", "busy", 5)})
+con = sqlite3.connect(":memory:", check_same_thread=False, isolation_level=None)
+con.executescript(
+    "CREATE TABLE t (x); CREATE TABLE log (x);"
+    "CREATE TRIGGER t_log AFTER INSERT ON t BEGIN INSERT INTO log VALUES (new.x); END;"
+)
+
+@app.route("/api/items/<int:n>", methods=["GET", "POST"])
+def item(n):
+    con.set_trace_callback(metrics.request_query_counter())
+    con.execute("INSERT INTO t VALUES (?)", (n,))
+    con.execute("SELECT COUNT(*) FROM log").fetchone()
+    return jsonify({"n": n}), 201 if n % 2 else 200
+
+client = app.test_client()
+for n in range(int(sys.argv[2])):
+    client.get(f"/api/items/{n}")
+client.get("/missing")
+"""
+
+
+def value(text: str, line_prefix: str) -> float:
+    match = re.search(rf"^{re.escape(line_prefix)} (\S+)$", text, re.M)
+    return float(match.group(1)) if match else -1
+
+
+def main():
+    failures = 0
+
+    def check(ok, label):
+        nonlocal failures
+        print(f"{'✅' if ok else '❌'} {label}")
+        failures += 0 if ok else 1
+
+    with tempfile.TemporaryDirectory() as metrics_dir:
+        env = {**os.environ, "METRICS_DIR": metrics_dir, "METRICS_FLUSH_SECONDS": "60"}
+        for requests in (10, 30):
+            subprocess.run([sys.executable, "-c", WORKER, str(BASE_DIR / "backend"), str(requests)],
+                           env=env, check=True)
+
+        os.environ["METRICS_DIR"] = metrics_dir
+        import metrics
+        metrics.register_collector(lambda: {"test_jobs_total": ("counter", "jobs", 7), "test_in_use": ("gauge", "busy", 5)})
+        text = metrics.render_metrics()
+
+    labels = '{endpoint="/api/items/<int:n>",method="GET"'
+    check(value(text, "ruet_metrics_processes") == 1, "only this process is still reporting")
+    check(value(text, "test_jobs_total") == 21, "collector counters summed over all three snapshots")
+    check(value(text, "test_in_use") == 5, "collector gauges only from live workers")
+    check(value(text, f'ruet_http_requests_total{labels},status="200"}}') == 20, "200s summed: 5 + 15")
+    check(value(text, f'ruet_http_requests_total{labels},status="201"}}') == 20, "201s summed: 5 + 15")
+    check(value(text, 'ruet_http_requests_total{endpoint="unmatched",method="GET",status="404"}') == 2,
+          "unmatched URLs counted under one label")
+    check(value(text, f"ruet_http_request_duration_seconds_count{labels}}}") == 40, "latency count summed")
+    check(value(text, f"ruet_http_request_db_queries_sum{labels}}}") == 80,
+          "2 statements per request (trigger step not counted)")
+    check(value(text, f'ruet_http_request_db_queries_bucket{labels},le="1"}}') == 0
+          and value(text, f'ruet_http_request_db_queries_bucket{labels},le="2"}}') == 40,
+          "query buckets are cumulative")
+    check(value(text, f'ruet_http_response_size_bytes_bucket{labels},le="+Inf"}}') == 40,
+          "response sizes recorded")
+
+    print("\n✅ All checks passed" if failures == 0 else f"\n❌ {failures} check(s) failed")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
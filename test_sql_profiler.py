@@ -0,0 +1,154 @@
+"""
+Test: SQL profiler (backend/sql_profiler.py).
+
+On a scratch copy of database/ruet.db, through Flask's test client:
+  - the profiler is off by default and get_db() hands out the plain lease
+  - /api/debug/sql-profiler only takes changes from loopback or with the
+    admin token, and rejects unknown or malformed settings
+  - turned on at runtime, a route that looks students up one by one is
+    reported as a likely N+1 and as running too many statements, with a
+    warning on the sql_profiler logger
+  - slow statements are reported with their EXPLAIN QUERY PLAN
+  - real endpoints answer the same with the profiler on as with it off
+  - leases taken straight from the pool after a request (exports,
+    accounts_manager) don't count into that request's statement counter
+
+Usage:
+    python test_sql_profiler.py
+"""
+
+import logging
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BASE_DIR / "backend"))
+sys.path.insert(0, str(BASE_DIR))
+
+import app as app_module  # noqa: E402
+import sql_profiler  # noqa: E402
+from database import accounts_manager  # noqa: E402
+
+LOOKUPS = 12
+counters = []
+
+
+@app_module.app.route("/api/test/students-one-by-one")
+def students_one_by_one():
+    con = app_module.get_db()
+    ids = [r["id"] for r in con.execute("SELECT id FROM students ORDER BY id").fetchall()]
+    names = []
+    for n in range(LOOKUPS):
+        row = con.execute("SELECT name FROM students WHERE id = ?", (ids[n % len(ids)],)).fetchone()
+        names.append(row["name"])
+    lease = type(con).__name__
+    con.close()
+    counters.append(app_module.g.metrics_queries)
+    return {"names": names, "lease": lease}
+
+
+class Captured(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+def main():
+    failures = 0
+
+    def check(ok, label):
+        nonlocal failures
+        print(f"{'✅' if ok else '❌'} {label}")
+        failures += 0 if ok else 1
+
+    captured = Captured()
+    logging.getLogger("sql_profiler").addHandler(captured)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "test.db"
+        shutil.copy(BASE_DIR / "database" / "ruet.db", db_path)
+        app_module.DB_PATH = db_path
+        accounts_manager.DB_PATH = db_path
+        client = app_module.app.test_client()
+        real_endpoints = ["/api/debug/hall-status", "/api/hall/rooms", "/api/hall/dues", "/api/library/render"]
+
+        try:
+            res = client.get("/api/test/students-one-by-one")
+            check(res.get_json()["lease"] == "PooledConnection", "disabled: plain pooled lease")
+            before = {url: client.get(url).get_data() for url in real_endpoints}
+
+            remote = {"REMOTE_ADDR": "10.1.2.3"}
+            app_module.DEBUG_ADMIN_TOKEN = "test-admin-token"
+            res = client.post("/api/debug/sql-profiler", json={"enabled": True}, environ_base=remote)
+            check(res.status_code == 403, f"remote change without the token refused: {res.status_code}")
+            res = client.post("/api/debug/sql-profiler", json={"enabled": True}, environ_base=remote,
+                              headers={"X-Debug-Token": "wrong"})
+            check(res.status_code == 403 and not sql_profiler.profiler_settings["enabled"], "wrong token refused")
+            res = client.get("/api/debug/sql-profiler", environ_base=remote)
+            check(res.status_code == 200, "remote GET stays readable")
+            res = client.post("/api/debug/sql-profiler", json={"slow_ms": 50}, environ_base=remote,
+                              headers={"X-Debug-Token": "test-admin-token"})
+            check(res.status_code == 200, f"remote change with the admin token: {res.status_code}")
+
+            res = client.post("/api/debug/sql-profiler", json={"enable": True})
+            check(res.status_code == 400, f"unknown setting rejected: {res.get_json()['message']}")
+            res = client.post("/api/debug/sql-profiler", json={"slow_ms": "fast"})
+            check(res.status_code == 400, f"bad value rejected: {res.get_json()['message']}")
+            res = client.post("/api/debug/sql-profiler", json=[1])
+            check(res.status_code == 400, "non-object body rejected")
+
+            res = client.post("/api/debug/sql-profiler", json={
+                "enabled": True, "repeat_threshold": LOOKUPS, "max_statements": LOOKUPS, "slow_ms": 1000})
+            check(res.status_code == 200 and res.get_json()["settings"]["enabled"], "enabled at runtime")
+
+            res = client.get("/api/test/students-one-by-one")
+            check(res.get_json()["lease"] == "ProfiledConnection", "enabled: profiled lease")
+            recent = client.get("/api/debug/sql-profiler").get_json()["recent"]
+            n_plus_one = [f for f in recent if f["kind"] == "n_plus_one"]
+            check(len(n_plus_one) == 1 and n_plus_one[0]["runs"] == LOOKUPS
+                  and n_plus_one[0]["sql"] == "SELECT name FROM students WHERE id = ?",
+                  f"N+1 flagged: {n_plus_one[0]['runs'] if n_plus_one else 0} runs of the per-student lookup")
+            many = [f for f in recent if f["kind"] == "many_statements"]
+            check(many and many[0]["statements"] == LOOKUPS + 1, f"statement count: {many[0]['statements'] if many else 0}")
+            check(any("likely N+1 in GET /api/test/students-one-by-one" in m for m in captured.messages),
+                  "N+1 warning logged")
+
+            client.post("/api/debug/sql-profiler", json={"slow_ms": 0, "repeat_threshold": 1000})
+            captured.messages.clear()
+            client.get("/api/test/students-one-by-one")
+            slow = [f for f in client.get("/api/debug/sql-profiler").get_json()["recent"] if f["kind"] == "slow"]
+            lookup = next((f for f in slow if "WHERE id = ?" in f["sql"]), {})
+            check(lookup.get("plan") and "USING" in lookup["plan"][0], f"slow query plan: {lookup.get('plan')}")
+            check(any(m.startswith("slow query in") and "\n    " in m for m in captured.messages),
+                  "slow query warning includes the plan")
+
+            client.post("/api/debug/sql-profiler", json={"slow_ms": 1000, "repeat_threshold": 10, "max_statements": 100})
+            for url in real_endpoints:
+                res = client.get(url)
+                check(res.status_code == 200 and res.get_data() == before[url], f"{url}: same response when profiled")
+
+            pool = app_module.get_pool(db_path)
+            client.get("/api/test/students-one-by-one")
+            counted = counters[-1].count
+            for readonly in (True, False):
+                con = pool.connection(readonly=readonly)
+                con.execute("SELECT COUNT(*) FROM students").fetchone()
+                con.close()
+            accounts_manager.invalidate_accounts_cache()
+            accounts_manager.get_accounts_stats()
+            check(counters[-1].count == counted, f"later direct leases not counted ({counters[-1].count} vs {counted})")
+        finally:
+            sql_profiler.configure_profiler(enabled=False)
+            app_module.outbox.stop()
+
+    print("\n✅ All checks passed" if failures == 0 else f"\n❌ {failures} check(s) failed")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()